@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Skeleton Parse Benchmark
+量測 generate_skeleton.py 在模組數量增加時的解析時間
+
+用途: 產生不同模組數量的合成網表,確認解析時間隨模組數近似線性成長
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from generate_skeleton import VerilogSkeletonGenerator
+
+
+def write_netlist(path: Path, num_modules: int, body_lines: int = 20):
+    """寫出含 num_modules 個模組的扁平化網表,每個模組實例化下一個模組"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('`define DATA_WIDTH 32\n')
+        for i in range(num_modules):
+            f.write(f'module cell_{i} (\n')
+            f.write('    input  wire        clk,\n')
+            f.write('    input  wire [31:0] din,\n')
+            f.write('    output reg  [31:0] dout\n')
+            f.write(');\n')
+            for j in range(body_lines):
+                f.write(f'    wire [31:0] n_{j} = din ^ {j};\n')
+            if i + 1 < num_modules:
+                f.write(f'    cell_{i + 1} u_next (.clk(clk), .din(din), .dout());\n')
+            f.write('    always @(posedge clk) dout <= din;\n')
+            f.write('endmodule\n\n')
+
+
+def run(module_counts):
+    print(f"{'modules':>10} {'size_mb':>10} {'seconds':>10} {'us/module':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in module_counts:
+            path = Path(tmp) / f'bench_{count}.v'
+            write_netlist(path, count)
+
+            generator = VerilogSkeletonGenerator(str(path))
+            start = time.perf_counter()
+            # 只量測模組擷取,階層建立另有其成本
+            with open(path, 'rb') as f:
+                generator._parse_buffer(f.read())
+            elapsed = time.perf_counter() - start
+
+            size_mb = path.stat().st_size / 1024 / 1024
+            print(f"{count:>10} {size_mb:>10.2f} {elapsed:>10.3f} {elapsed / count * 1e6:>12.1f}")
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 2000, 4000, 8000, 16000]
+    print("[INFO] 每模組耗時(us/module)應大致維持不變,代表解析為線性時間")
+    run(counts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Signal Tracer Benchmark
+比較 trace_signal.py 信號分類在預編譯前後的吞吐量(lines/second)
+
+用途: 產生約 100 萬行的合成設計,分別以舊版(每行 format + re.search 九個型別)
+與新版(每個信號一個預編譯具名群組正則)完整追蹤同一信號。
+"""
+
+import contextlib
+import io
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from trace_signal import VerilogSignalTracer
+
+
+class LegacySignalTracer(VerilogSignalTracer):
+    """舊版分類方式: 每行對每個型別 format 正則後 re.search"""
+
+    def _classify_signal(self, line: str, signal: str) -> str:
+        for sig_type, pattern in self.SIGNAL_TYPES.items():
+            regex = pattern.format(signal=re.escape(signal))
+            if re.search(regex, line):
+                return sig_type
+        return "reference"
+
+
+def write_design(path: Path, target_lines: int):
+    """每個模組約 25 行,data_bus 在宣告、賦值、讀取與端口連接中皆會出現"""
+    lines = 0
+    index = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while lines < target_lines:
+            f.write(f'module blk_{index} (\n'
+                    '    input  wire        clk,\n'
+                    '    input  wire [31:0] data_bus,\n'
+                    '    output reg  [31:0] q\n'
+                    ');\n'
+                    '    wire [31:0] data_bus_d;\n'
+                    '    reg  [31:0] acc;\n'
+                    '    assign data_bus_d = data_bus ^ acc;\n'
+                    '    always @(posedge clk) begin\n'
+                    '        acc <= acc + data_bus_d;\n'
+                    '        q <= data_bus;\n'
+                    '    end\n')
+            for j in range(10):
+                f.write(f'    wire [7:0] tmp_{j} = acc[{j}+:8];\n')
+            f.write(f'    leaf u_leaf_{index} (.data_bus(data_bus), .clk(clk));\n'
+                    'endmodule\n\n')
+            lines += 25
+            index += 1
+    return lines
+
+
+def measure(tracer_cls, path: Path, signal: str, num_lines: int):
+    tracer = tracer_cls(str(path))
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = tracer.trace(signal)
+    elapsed = time.perf_counter() - start
+    return num_lines / elapsed, elapsed, result
+
+
+def main():
+    target_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    signal = sys.argv[2] if len(sys.argv) > 2 else 'data_bus'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'bench_trace.v'
+        num_lines = write_design(path, target_lines)
+        print(f"[INFO] 合成設計: {num_lines} 行, {path.stat().st_size / 1024 / 1024:.1f} MB, 信號: {signal}")
+
+        legacy_rate, legacy_time, legacy_result = measure(LegacySignalTracer, path, signal, num_lines)
+        new_rate, new_time, new_result = measure(VerilogSignalTracer, path, signal, num_lines)
+
+    print(f"{'版本':<10} {'秒數':>10} {'lines/s':>14}")
+    print(f"{'legacy':<10} {legacy_time:>10.2f} {legacy_rate:>14,.0f}")
+    print(f"{'compiled':<10} {new_time:>10.2f} {new_rate:>14,.0f}")
+    print(f"加速: {new_rate / legacy_rate:.2f}x")
+
+    if legacy_result != new_result:
+        print("❌ 兩種分類方式的結果不一致")
+        sys.exit(1)
+    print(f"✓ 結果一致 (出現次數 {new_result['total_count']})")
+
+
+if __name__ == "__main__":
+    main()
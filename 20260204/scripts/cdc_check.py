@@ -0,0 +1,616 @@
+#!/usr/bin/env python3
+"""
+Verilog CDC Checker
+單次詞法掃描的時鐘域交叉(CDC)分析
+
+用途: 取代「逐一追蹤時鐘、再讀行範圍」的手動 CDC 流程。
+以詞法前端掃描一次整份設計,依 `always @(posedge X)` 將每個時序區塊歸入 X 的時鐘域,
+經 assign 與組合 always 傳遞各信號的來源時鐘域,找出在一個時鐘域賦值、
+卻在另一個時鐘域被讀取的暫存器,並檢查是否經過雙觸發器同步器。
+輸出附行號的 Markdown 報告(可直接交給 validate_report.py 驗證)與 JSON 結果。
+
+時鐘域以模組內的時鐘信號名稱區分;經由端口跨模組的信號,
+請以 connectivity.py 追到實際的時鐘來源。
+"""
+
+import json
+import re
+import sys
+from typing import Any, Dict, List, Optional
+
+from connectivity import segment_file
+from verilog_lexer import iter_module_tokens, sanitized_path, skip_group, statement_end
+
+
+CLOCKED_KEYWORDS = ('always', 'always_ff')
+COMB_KEYWORDS = ('always_comb', 'always_latch')
+DIRECTIONS = ('input', 'output', 'inout')
+NET_KEYWORDS = DIRECTIONS + ('wire', 'reg', 'logic')
+STATEMENT_BOUNDARY = frozenset((';', ')', ':', 'begin', 'end', 'else', 'endcase'))
+OPEN = {'(': ')', '[': ']', '{': '}'}
+RESET_NAME = re.compile(r'rst|reset|clr|clear', re.IGNORECASE)
+
+STATUS_LABELS = {
+    'unsynchronized': '❌ 未同步',
+    'single_flop': '⚠️  僅單級觸發器',
+    'synchronized': '✓ 雙觸發器同步',
+}
+
+
+class _ModuleScanner:
+    """
+    分析單一模組的 token 列表(不含 module / endmodule)
+
+    blocks: 時序 always 區塊 {clock, resets, line, end_line, assigns, reads}
+    comb: 組合邏輯相依 {net: {來源 net}},comb_lines 為其賦值行號
+    multi_bit: 以 [msb:lsb] 宣告的信號
+    """
+
+    def __init__(self, tokens):
+        self.toks = tokens
+        self.name = tokens[0][1] if tokens and tokens[0][0] == 'ident' else None
+        self.start_line = tokens[0][2] if tokens else 0
+        self.end_line = tokens[-1][2] if tokens else 0
+        self.blocks = []
+        self.comb = {}
+        self.comb_lines = {}
+        self.multi_bit = set()
+
+    def text(self, i: int) -> Optional[str]:
+        return self.toks[i][1] if i < len(self.toks) else None
+
+    def _skip_group(self, i: int) -> int:
+        return skip_group(self.toks, i)
+
+    def _statement_end(self, i: int) -> int:
+        return statement_end(self.toks, i)
+
+    def _at_statement_start(self, i: int) -> bool:
+        prev = self.text(i - 1) if i > 0 else ';'
+        if prev in STATEMENT_BOUNDARY:
+            return True
+        return prev == '*' and self.text(i - 2) == '@'
+
+    def _lhs_operator(self, j: int) -> Optional[int]:
+        """j 起(略過索引)若為 <= 或 =,回傳運算子位置"""
+        while self.text(j) == '[':
+            j = self._skip_group(j)
+        return j if self.text(j) in ('<=', '=') else None
+
+    def _idents(self, a: int, b: int) -> List[tuple]:
+        """[a, b) 中作為信號的識別字 (名稱, 行號);後接 `(` 的函數呼叫不算"""
+        return [(text, line) for i, (kind, text, line) in enumerate(self.toks[a:b], start=a)
+                if kind == 'ident' and self.text(i + 1) != '(']
+
+    def scan(self):
+        i = self._header(1)
+        while i < len(self.toks):
+            kind, text, line = self.toks[i]
+            if kind == 'keyword' and text in NET_KEYWORDS:
+                i = self._declaration(i)
+            elif kind == 'keyword' and text == 'assign':
+                i = self._assign(i + 1)
+            elif kind == 'keyword' and text in CLOCKED_KEYWORDS + COMB_KEYWORDS:
+                i = self._always(i)
+            else:
+                i += 1
+        return self
+
+    def _header(self, i: int) -> int:
+        """記錄 ANSI 標頭中以 [msb:lsb] 宣告的端口,回傳標頭之後的位置"""
+        if self.text(i) == '#' and self.text(i + 1) == '(':
+            i = self._skip_group(i + 1)
+        if self.text(i) == '(':
+            end = self._skip_group(i)
+            multi_bit = False
+            j = i + 1
+            while j < end - 1:
+                kind, text, _ = self.toks[j]
+                if kind == 'keyword' and text in DIRECTIONS:
+                    multi_bit = False
+                elif text == '[':
+                    multi_bit = True
+                    j = self._skip_group(j)
+                    continue
+                elif kind == 'ident' and multi_bit:
+                    self.multi_bit.add(text)
+                j += 1
+            i = end
+        while i < len(self.toks) and self.text(i) != ';':
+            i += 1
+        return i + 1
+
+    def _declaration(self, i: int) -> int:
+        """宣告敘述: 記錄多位元信號;`wire a = expr` 視為組合邏輯"""
+        end = self._statement_end(i)
+        multi_bit = False
+        j = i + 1
+        while j < end:
+            kind, text, line = self.toks[j]
+            if text == '[':
+                # 名稱之前的範圍是位寬,之後的是陣列維度
+                if self.toks[j - 1][0] != 'ident':
+                    multi_bit = True
+                j = self._skip_group(j)
+                continue
+            if kind == 'ident':
+                if multi_bit:
+                    self.multi_bit.add(text)
+                if self.text(j + 1) == '=':
+                    rhs_end = j + 2
+                    while rhs_end < end and self.text(rhs_end) not in (',', ';'):
+                        rhs_end = self._skip_group(rhs_end) if self.text(rhs_end) in OPEN else rhs_end + 1
+                    self._add_comb([text], self._idents(j + 2, rhs_end), line)
+                    j = rhs_end
+                    continue
+            j += 1
+        return end
+
+    def _add_comb(self, dests, sources, line: int):
+        for dest in dests:
+            self.comb.setdefault(dest, set()).update(name for name, _ in sources if name != dest)
+            self.comb_lines.setdefault(dest, []).append(line)
+
+    def _assign(self, i: int) -> int:
+        """assign a = b, c = d;"""
+        end = self._statement_end(i)
+        start = i
+        while start < end:
+            # 每個 lhs = rhs 以最外層的逗號分隔
+            eq = start
+            while eq < end and self.text(eq) != '=':
+                eq = self._skip_group(eq) if self.text(eq) == '[' else eq + 1
+            stop = eq + 1
+            while stop < end and self.text(stop) not in (',', ';'):
+                stop = self._skip_group(stop) if self.text(stop) in OPEN else stop + 1
+            dests = [name for name, _ in self._lhs_names(start, eq)]
+            if dests:
+                self._add_comb(dests, self._idents(eq + 1, stop), self.toks[start][2])
+            start = stop + 1
+        return end
+
+    def _lhs_names(self, a: int, b: int) -> List[tuple]:
+        """賦值左側的目標名稱(略過索引中的識別字)"""
+        names = []
+        j = a
+        while j < b:
+            kind, text, line = self.toks[j]
+            if text == '[':
+                j = self._skip_group(j)
+                continue
+            if kind == 'ident':
+                names.append((text, line))
+            j += 1
+        return names
+
+    def _always(self, i: int) -> int:
+        keyword, line = self.text(i), self.toks[i][2]
+        j = i + 1
+        edges = []
+        comb = keyword in COMB_KEYWORDS
+        if self.text(j) == '@':
+            j += 1
+            if self.text(j) == '*':
+                comb = True
+                j += 1
+            elif self.text(j) == '(':
+                end = self._skip_group(j)
+                for k in range(j + 1, end - 1):
+                    if self.text(k) in ('posedge', 'negedge') and self.toks[k + 1][0] == 'ident':
+                        edges.append(self.text(k + 1))
+                comb = not edges
+                j = end
+        elif not comb:
+            # 沒有事件控制(例如 always #5 clk = ~clk;)不屬於任何時鐘域
+            return self._statement_end(j)
+
+        body_end = self._statement_end(j)
+        if comb:
+            dests = set()
+            k = j
+            while k < body_end:
+                op = self._lhs_operator(k + 1) if self.toks[k][0] == 'ident' and self._at_statement_start(k) else None
+                if op is not None:
+                    dests.add(self.toks[k][1])
+                k += 1
+            sources = [(name, ln) for name, ln in self._idents(j, body_end) if name not in dests]
+            self._add_comb(sorted(dests), sources, line)
+            return body_end
+
+        resets = self._reset_signals(j, edges)
+        clock = next((edge for edge in edges if edge not in resets), edges[0])
+        assigns, reads = self._clocked_body(j, body_end, set(edges))
+        self.blocks.append({
+            "clock": clock,
+            "resets": sorted(resets),
+            "line": line,
+            "end_line": self.toks[body_end - 1][2] if body_end > j else line,
+            "assigns": assigns,
+            "reads": reads
+        })
+        return body_end
+
+    def _reset_signals(self, j: int, edges: List[str]) -> set:
+        """
+        區塊開頭 if 條件中出現的邊緣信號視為非同步重置;
+        沒有 if 時,以名稱(rst / reset / clr)判斷
+        """
+        if len(edges) < 2:
+            return set()
+        k = j
+        if self.text(k) == 'begin':
+            k += 1
+            if self.text(k) == ':':
+                k += 2
+        if self.text(k) == 'if' and self.text(k + 1) == '(':
+            cond = {name for name, _ in self._idents(k + 1, self._skip_group(k + 1))}
+            resets = cond & set(edges)
+            if resets and resets != set(edges):
+                return resets
+        return {edge for edge in edges[1:] if RESET_NAME.search(edge)} or set(edges[1:])
+
+    def _clocked_body(self, a: int, b: int, edges: set):
+        """
+        掃描時序區塊內的賦值與讀取
+
+        assigns: [{dest, line, sources, copy_of, shift}],copy_of 為單純搬移的來源
+        (`q <= d` 或 `q <= d[0]`),shift 為 `q <= {q[..], d}` 形式的移位同步器;
+        常數賦值(重置值)的 sources 為空。reads: {名稱: [行號]},不含時鐘與重置信號。
+        """
+        assigns = []
+        reads = {}
+        k = a
+        while k < b:
+            kind, text, line = self.toks[k]
+            targets = None
+            op = None
+            if kind == 'ident' and self._at_statement_start(k):
+                op = self._lhs_operator(k + 1)
+                if op is not None:
+                    targets = [(text, line)]
+                    # 索引中的識別字是讀取
+                    for name, ln in self._idents(k + 1, op):
+                        reads.setdefault(name, []).append(ln)
+            elif text == '{' and self._at_statement_start(k):
+                close = self._skip_group(k)
+                op = self._lhs_operator(close)
+                if op is not None:
+                    targets = self._lhs_names(k, close)
+            if targets is None:
+                if kind == 'ident' and text not in edges and self.text(k + 1) != '(':
+                    reads.setdefault(text, []).append(line)
+                k += 1
+                continue
+
+            stop = op + 1
+            depth = 0
+            while stop < b:
+                t = self.text(stop)
+                if t in OPEN:
+                    depth += 1
+                elif t in (')', ']', '}'):
+                    depth -= 1
+                elif t == ';' and depth <= 0:
+                    break
+                stop += 1
+            sources = [(name, ln) for name, ln in self._idents(op + 1, stop) if name not in edges]
+            for name, ln in sources:
+                reads.setdefault(name, []).append(ln)
+            names = [name for name, _ in sources]
+            for dest, dest_line in targets:
+                others = [name for name in names if name != dest]
+                assigns.append({
+                    "dest": dest,
+                    "line": dest_line,
+                    "sources": sorted(set(names)),
+                    "copy_of": names[0] if len(targets) == 1 and len(names) == 1 else None,
+                    "shift": (len(targets) == 1 and dest in names and len(set(others)) == 1
+                              and self.text(op + 1) == '{') and others[0] or None
+                })
+            k = stop + 1
+        return assigns, reads
+
+
+def _comb_domains(comb: Dict[str, set], reg_domains: Dict[str, set]) -> Dict[str, set]:
+    """
+    每個組合信號經組合邏輯可追溯到的暫存器時鐘域(遇到暫存器即停止)
+
+    以迭代的 Tarjan 演算法找出強連通元件(組合迴路),元件依反拓撲順序產生,
+    產生時其下游元件都已算好,每個元件只計算一次、成員共用同一結果。
+    重新收斂的組合邏輯不會重複走訪,很深的 assign 鏈也不受遞迴深度限制。
+    """
+    result = {}
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    for root in comb:
+        if root in index or root in reg_domains:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(comb[root]))]
+        while work:
+            node, successors = work[-1]
+            for succ in successors:
+                if succ in reg_domains or succ not in comb:
+                    continue
+                if succ not in index:
+                    index[succ] = low[succ] = len(index)
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(comb[succ])))
+                    break
+                if succ in on_stack:
+                    low[node] = min(low[node], index[succ])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] != index[node]:
+                    continue
+                members = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    members.append(member)
+                    if member == node:
+                        break
+                domains = set()
+                for member in members:
+                    for source in comb[member]:
+                        if source in reg_domains:
+                            domains |= reg_domains[source]
+                        elif source in result:
+                            domains |= result[source]
+                for member in members:
+                    result[member] = domains
+    return result
+
+
+def _analyze_module(module: _ModuleScanner) -> Dict[str, Any]:
+    """在單一模組內傳遞時鐘域並找出跨時鐘域的讀取"""
+    reg_domains = {}
+    reg_lines = {}
+    for block in module.blocks:
+        for assign in block['assigns']:
+            reg_domains.setdefault(assign['dest'], set()).add(block['clock'])
+            reg_lines.setdefault(assign['dest'], []).append(assign['line'])
+
+    comb_domains = _comb_domains(module.comb, reg_domains)
+
+    def domains_of(name: str) -> set:
+        if name in reg_domains:
+            return reg_domains[name]
+        return comb_domains.get(name, set())
+
+    # 每個暫存器的所有非常數賦值都是搬移同一個來源時,才算同步器的一級
+    copies = {}
+    for block in module.blocks:
+        for assign in block['assigns']:
+            if not assign['sources']:
+                continue
+            source = assign['copy_of'] or assign['shift']
+            kind = 'shift' if assign['shift'] else 'copy'
+            previous = copies.get(assign['dest'])
+            if source is None or (previous is not None and previous[:2] != (source, block['clock'])):
+                copies[assign['dest']] = (None, None, None)
+            elif previous is None:
+                copies[assign['dest']] = (source, block['clock'], kind)
+
+    def is_stage(dest: str, source: str, clock: str) -> Optional[str]:
+        entry = copies.get(dest)
+        return entry[2] if entry and entry[0] == source and entry[1] == clock else None
+
+    crossings = []
+    multi_domain = [
+        {"module": module.name, "signal": name, "domains": sorted(clocks), "driver_lines": reg_lines[name]}
+        for name, clocks in reg_domains.items() if len(clocks) > 1
+    ]
+    for block in module.blocks:
+        clock = block['clock']
+        for name, lines in block['reads'].items():
+            if name in block['resets']:
+                continue
+            foreign = domains_of(name) - {clock}
+            if not foreign:
+                continue
+
+            first_stages = [a['dest'] for a in block['assigns'] if name in a['sources']]
+            sync_chain = []
+            status = 'unsynchronized'
+            if first_stages and all(is_stage(dest, name, clock) for dest in first_stages):
+                first = first_stages[0]
+                sync_chain = [first]
+                if is_stage(first, name, clock) == 'shift':
+                    # q <= {q[0], d}: 位寬至少 2 的移位暫存器本身就是兩級
+                    status = 'synchronized' if first in module.multi_bit else 'single_flop'
+                else:
+                    second = next((dest for dest, (source, domain, _) in copies.items()
+                                   if source == first and domain == clock), None)
+                    status = 'synchronized' if second else 'single_flop'
+                    if second:
+                        sync_chain.append(second)
+
+            notes = []
+            if status != 'unsynchronized' and name in module.multi_bit:
+                notes.append('multi_bit')
+            if status != 'unsynchronized' and name not in reg_domains:
+                notes.append('comb_before_sync')
+            crossings.append({
+                "module": module.name,
+                "signal": name,
+                "from_domains": sorted(foreign),
+                "to_domain": clock,
+                "status": status,
+                "read_lines": sorted(set(lines)),
+                "driver_lines": sorted(set(reg_lines.get(name, module.comb_lines.get(name, [])))),
+                "block_line": block['line'],
+                "sync_chain": sync_chain,
+                "notes": notes
+            })
+
+    return {
+        "module": module.name,
+        "line_range": [module.start_line, module.end_line],
+        "domains": {
+            clock: [b['line'] for b in module.blocks if b['clock'] == clock]
+            for clock in dict.fromkeys(b['clock'] for b in module.blocks)
+        },
+        "registers": len(reg_domains),
+        "crossings": crossings,
+        "multi_domain_registers": multi_domain
+    }
+
+
+def _iter_design_modules(lex_file):
+    """在 endmodule 之後切段逐段讀取淨化鏡像 lex_file,依序產生每個模組的 token 列表"""
+    with open(lex_file, 'rb') as f:
+        for start, end, line in segment_file(lex_file):
+            f.seek(start)
+            yield from iter_module_tokens(f.read(end - start), line=line)
+
+
+def check_design(verilog_file) -> Dict[str, Any]:
+    """
+    對整份設計做 CDC 分析(單次詞法掃描),回傳 JSON 結構
+
+    淨化鏡像逐段讀取(與 connectivity.parse_design 相同),記憶體用量只與段落大小有關。
+    """
+    print(f"[INFO] CDC 分析: {verilog_file}")
+    modules = []
+    seen = set()
+    for tokens in _iter_design_modules(sanitized_path(verilog_file)):
+        scanner = _ModuleScanner(tokens)
+        if scanner.name is None or scanner.name in seen:
+            continue
+        seen.add(scanner.name)
+        modules.append(_analyze_module(scanner.scan()))
+
+    crossings = [c for m in modules for c in m['crossings']]
+    counts = {status: sum(1 for c in crossings if c['status'] == status) for status in STATUS_LABELS}
+    return {
+        "file": str(verilog_file),
+        "total_modules": len(modules),
+        "total_clocked_blocks": sum(len(lines) for m in modules for lines in m['domains'].values()),
+        "total_registers": sum(m['registers'] for m in modules),
+        "status_counts": counts,
+        "modules": modules,
+        "crossings": crossings,
+        "multi_domain_registers": [r for m in modules for r in m['multi_domain_registers']]
+    }
+
+
+def _format_lines(lines: List[int]) -> str:
+    return ', '.join(map(str, lines))
+
+
+def render_report(result: Dict[str, Any]) -> str:
+    """產生附行號的 Markdown 報告(格式符合 validate_report.py 的檢查項目)"""
+    crossings = result['crossings']
+    clocked = [m for m in result['modules'] if m['domains']]
+    out = [
+        f"# CDC 分析報告: {result['file']}",
+        "",
+        f"全檔搜尋: 以單次詞法掃描分析共 {result['total_modules']} 個模組,"
+        f"{result['total_clocked_blocks']} 個時序 always 區塊已依時鐘域分類。",
+        "",
+        "## 時鐘域",
+        "",
+        "| 模組 | 行範圍 | 時鐘域 | always 區塊 |",
+        "|------|--------|--------|-------------|",
+    ]
+    for module in clocked:
+        start, end = module['line_range']
+        for clock, lines in module['domains'].items():
+            out.append(f"| {module['module']} | 第 {start}-{end} 行 | {clock} | 第 {_format_lines(lines)} 行 |")
+
+    out += ["", "## 跨時鐘域信號", ""]
+    if not crossings:
+        out.append("✓ 已確認: 沒有在一個時鐘域賦值、在另一個時鐘域讀取的信號。")
+        out.append("")
+    order = {status: i for i, status in enumerate(STATUS_LABELS)}
+    for c in sorted(crossings, key=lambda c: (order[c['status']], c['module'], c['read_lines'][0])):
+        source = ', '.join(c['from_domains'])
+        out.append(f"### {STATUS_LABELS[c['status']]}: {c['module']}.{c['signal']} ({source} → {c['to_domain']})")
+        out.append("")
+        if c['driver_lines']:
+            out.append(f"- 驅動源: 第 {_format_lines(c['driver_lines'])} 行 ({source} 域)")
+        out.append(f"- 讀取: 第 {_format_lines(c['read_lines'])} 行,於第 {c['block_line']} 行的 "
+                   f"{c['to_domain']} 域 always 區塊,出現 {len(c['read_lines'])} 次")
+        if c['sync_chain']:
+            out.append(f"- 同步鏈: {c['signal']} → {' → '.join(c['sync_chain'])}")
+        if c['status'] == 'unsynchronized':
+            out.append("- 建議: 在目的時鐘域加入雙觸發器同步器,或改用非同步 FIFO / 握手")
+        elif c['status'] == 'single_flop':
+            out.append("- 建議: 只有一級觸發器,亞穩態未充分消除,需再加一級")
+        if 'multi_bit' in c['notes']:
+            out.append("- 注意: 多位元信號逐位元同步可能取樣到不一致的值,需格雷碼、握手或非同步 FIFO")
+        if 'comb_before_sync' in c['notes']:
+            out.append("- 注意: 同步器之前有組合邏輯,可能將毛刺送入目的時鐘域")
+        out.append("")
+
+    if result['multi_domain_registers']:
+        out += ["## 多時鐘域驅動", ""]
+        for reg in result['multi_domain_registers']:
+            out.append(f"- ❌ {reg['module']}.{reg['signal']}: 在 {', '.join(reg['domains'])} 中賦值,"
+                       f"驅動源 {len(reg['driver_lines'])} 處(第 {_format_lines(reg['driver_lines'])} 行)")
+        out.append("")
+
+    counts = result['status_counts']
+    out += [
+        "## 摘要",
+        "",
+        f"- ✓ 已確認: {result['total_clocked_blocks']} 個時序 always 區塊皆已依時鐘域分類",
+        f"- 未同步: {counts['unsynchronized']} 處",
+        f"- 僅單級觸發器: {counts['single_flop']} 處",
+        f"- 雙觸發器同步: {counts['synchronized']} 處",
+        f"- 時序暫存器: 共 {result['total_registers']} 個,驅動源分布於 "
+        f"{sum(len(m['domains']) for m in clocked)} 個 (模組, 時鐘) 時鐘域",
+        f"- 時鐘域依模組內的時鐘信號名稱區分;經端口跨模組的信號請以 connectivity.py 追蹤時鐘來源",
+    ]
+    return '\n'.join(out) + '\n'
+
+
+def main():
+    args = sys.argv[1:]
+    json_file = None
+    if '--json' in args:
+        i = args.index('--json')
+        json_file = args[i + 1]
+        del args[i:i + 2]
+
+    if len(args) < 1:
+        print("用法: python cdc_check.py <verilog_file> [report_md] [--json result.json]")
+        print("範例: python cdc_check.py soc_top.v cdc_report.md --json cdc.json")
+        sys.exit(1)
+
+    verilog_file = args[0]
+    result = check_design(verilog_file)
+    report = render_report(result)
+
+    if len(args) > 1:
+        with open(args[1], 'w', encoding='utf-8') as f:
+            f.write(report)
+        print(f"[SUCCESS] CDC 報告已儲存至: {args[1]}")
+    else:
+        print(report)
+    if json_file:
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"[SUCCESS] CDC 結果已儲存至: {json_file}")
+
+    counts = result['status_counts']
+    print(f"\n=== CDC 摘要 ===")
+    print(f"模組數量: {result['total_modules']}")
+    print(f"時序區塊: {result['total_clocked_blocks']}")
+    print(f"跨時鐘域: {len(result['crossings'])} 處 (未同步 {counts['unsynchronized']}, "
+          f"單級 {counts['single_flop']}, 雙級 {counts['synchronized']})")
+    if counts['unsynchronized'] or counts['single_flop'] or result['multi_domain_registers']:
+        print("⚠️  警告: 發現未正確同步的跨時鐘域信號!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,887 @@
+#!/usr/bin/env python3
+"""
+Verilog Connectivity Graph
+跨階層的信號連接圖與路徑查詢
+
+用途: trace_signal.py 只做文字比對,信號經過 `.port(net)` 換名之後就追不下去。
+這裡以詞法前端單次掃描整份設計,記錄每個模組的端口方向、宣告行、
+本地驅動 / 負載行號,以及每個實例的端口連接;再依骨架的頂層模組
+從頂層 net 往下展開,得到跨 N 層階層、附行號的驅動到負載完整鏈路。
+
+連接圖快取在 .v 檔旁的 .conn.db(SQLite,記錄原始檔大小與修改時間),
+建立一次之後每次查詢只讀取相連的模組,不必逐層重新搜尋。
+"""
+
+import json
+import mmap
+import os
+import re
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from generate_skeleton import VerilogSkeletonGenerator
+from skeleton_db import SkeletonDB, is_db_path
+from verilog_lexer import iter_module_tokens, sanitized_path, statement_end
+
+
+CONN_VERSION = 2
+CONN_SUFFIX = '.conn.db'
+
+DIRECTIONS = ('input', 'output', 'inout')
+DECL_KEYWORDS = frozenset(DIRECTIONS + (
+    'wire', 'reg', 'logic', 'integer', 'real', 'time', 'parameter', 'localparam',
+    'genvar', 'supply0', 'supply1', 'tri', 'wand', 'wor'
+))
+# 這些 token 之後是新敘述的開頭(用於判斷賦值左側)
+STATEMENT_BOUNDARY = frozenset((
+    ';', ')', ':', 'begin', 'end', 'else', 'initial', 'always_comb', 'always_latch',
+    'endcase', 'generate', 'endgenerate'
+))
+OPEN = {'(': ')', '[': ']', '{': '}'}
+PROCESS_KEYWORDS = ('always', 'always_ff', 'always_comb', 'always_latch', 'initial')
+# 允許多個驅動源的 net 種類(另有 inout 端口與 integer / genvar 迴圈變數)
+RESOLVED_NET_KEYWORDS = ('tri', 'wand', 'wor', 'supply0', 'supply1')
+VARIABLE_KEYWORDS = ('reg', 'logic', 'integer', 'real', 'time')
+ENDMODULE_PATTERN = re.compile(rb'\bendmodule\b')
+SEGMENT_SIZE = 8 * 1024 * 1024
+
+
+class _ModuleParser:
+    """
+    解析單一模組的 token 列表(不含 module / endmodule 關鍵字)
+
+    tokens 為 (種類, 文字, 行號);結果為 ports / directions / decls / widths /
+    params / drivers / driver_sources / loads / instances,格式見 ConnectivityGraph。
+    """
+
+    def __init__(self, tokens):
+        self.toks = tokens
+        self.ports = []
+        self.directions = {}
+        self.decls = {}
+        self.widths = {}
+        self.arrays = set()
+        self.resolved = set()
+        self.params = {}
+        self.param_order = []
+        self.drivers = {}
+        self.driver_sources = {}
+        self.loads = {}
+        self.instances = []
+        self.in_subroutine = False
+        self.generate_depth = 0
+        self.process = None
+        self.process_end = -1
+
+    def text(self, i: int) -> Optional[str]:
+        return self.toks[i][1] if i < len(self.toks) else None
+
+    def _skip_group(self, i: int, record_loads: bool = True) -> int:
+        """i 指向左括號,回傳對應右括號之後的位置;群組內的識別字記為負載"""
+        stack = []
+        while i < len(self.toks):
+            kind, text, line = self.toks[i]
+            if text in OPEN:
+                stack.append(OPEN[text])
+            elif stack and text == stack[-1]:
+                stack.pop()
+                if not stack:
+                    return i + 1
+            elif kind == 'ident' and record_loads:
+                self._use(self.loads, text, line)
+            i += 1
+        return i
+
+    def _use(self, table: Dict[str, List[int]], name: str, line: int):
+        lines = table.setdefault(name, [])
+        if not lines or lines[-1] != line:
+            lines.append(line)
+
+    def _declare(self, name: str, line: int, direction: Optional[str], width: str = ''):
+        if self.in_subroutine:
+            return
+        self.decls.setdefault(name, line)
+        if direction:
+            self.directions[name] = direction
+        # 非 ANSI 的 output [7:0] q; reg [7:0] q; 以有範圍的宣告為準
+        if width or name not in self.widths:
+            self.widths[name] = width
+
+    def _expr_text(self, a: int, b: int) -> str:
+        """tokens[a:b] 的文字,token 之間以單一空白分隔(token 本身不含空白)"""
+        return ' '.join(''.join(text.split()) for _, text, _ in self.toks[a:b])
+
+    def _select(self, j: int) -> str:
+        """tokens[j] 若為 `[`,回傳索引文字(含括號),否則為空字串"""
+        if self.text(j) != '[':
+            return ''
+        return self._expr_text(j, self._skip_group(j, record_loads=False))
+
+    def _drive(self, name: str, line: int, j: int):
+        """記錄 tokens[j] 的 name 在 line 被驅動,並歸入所屬的驅動源(always 區塊或連續賦值)"""
+        self._use(self.drivers, name, line)
+        if self.in_subroutine:
+            return
+        if j < self.process_end:
+            kind, source_line = self.process
+        else:
+            kind, source_line = 'assign', line
+        if self.generate_depth:
+            kind = 'generate ' + kind
+        select = self._select(j + 1)
+        sources = self.driver_sources.setdefault(name, [])
+        for source in sources:
+            if source[0] == kind and source[1] == source_line:
+                # 同一個 always 區塊驅動不同位元時視為驅動整個信號
+                if source[2] != select:
+                    source[2] = ''
+                return
+        sources.append([kind, source_line, select])
+
+    def _parameters(self, start: int, end: int, overridable: bool):
+        """tokens[start:end] 中以逗號分隔的 `[parameter] [type] [range] NAME = expr` 項目"""
+        depth = 0
+        item_start = start
+        for j in range(start, end + 1):
+            text = self.toks[j][1] if j < end else ','
+            if text in OPEN:
+                depth += 1
+            elif text in (')', ']', '}'):
+                depth -= 1
+            elif text == ',' and depth == 0:
+                eq = next((k for k in range(item_start, j) if self.toks[k][1] == '='), None)
+                if eq is not None and eq > item_start and self.toks[eq - 1][0] == 'ident':
+                    name = self.toks[eq - 1][1]
+                    self.params[name] = self._expr_text(eq + 1, j)
+                    if overridable and name not in self.param_order:
+                        self.param_order.append(name)
+                item_start = j + 1
+
+    def parse(self) -> Optional[str]:
+        if not self.toks or self.toks[0][0] != 'ident':
+            return None
+        name = self.toks[0][1]
+        i = self._header(1)
+        while i < len(self.toks):
+            kind, text, line = self.toks[i]
+            if kind == 'keyword':
+                if text in ('function', 'task'):
+                    self.in_subroutine = True
+                elif text in ('endfunction', 'endtask'):
+                    self.in_subroutine = False
+                elif text == 'generate':
+                    self.generate_depth += 1
+                elif text == 'endgenerate':
+                    self.generate_depth = max(0, self.generate_depth - 1)
+                elif text in PROCESS_KEYWORDS and i >= self.process_end:
+                    self._process(i)
+                elif text in DECL_KEYWORDS:
+                    i = self._declaration(i)
+                    continue
+                elif text == 'assign':
+                    i = self._assign(i + 1)
+                    continue
+                i += 1
+            elif kind == 'ident':
+                if self._is_instance(i):
+                    i = self._instance(i)
+                elif self._at_statement_start(i) and self._is_lhs(i + 1):
+                    self._drive(text, line, i)
+                    i += 1
+                else:
+                    self._use(self.loads, text, line)
+                    i += 1
+            elif text == '{' and self._at_statement_start(i):
+                end = self._skip_group(i, record_loads=False)
+                if self._is_lhs(end):
+                    for k in range(i, end):
+                        if self.toks[k][0] == 'ident':
+                            self._drive(self.toks[k][1], self.toks[k][2], k)
+                    i = end
+                else:
+                    i += 1
+            else:
+                i += 1
+        return name
+
+    def _process(self, i: int):
+        """always / initial: 記錄區塊範圍,其中的賦值都屬於同一個驅動源"""
+        j = i + 1
+        if self.text(j) == '@':
+            j += 1
+            if self.text(j) == '(':
+                j = self._skip_group(j, record_loads=False)
+            elif self.text(j) == '*':
+                j += 1
+        elif self.text(j) == '#':
+            j += 2
+        self.process = (self.text(i), self.toks[i][2])
+        self.process_end = statement_end(self.toks, j)
+
+    def _header(self, i: int) -> int:
+        """解析模組標頭的參數與端口列表,回傳標頭 `;` 之後的位置"""
+        if self.text(i) == '#' and self.text(i + 1) == '(':
+            end = self._skip_group(i + 1, record_loads=False)
+            self._parameters(i + 2, end - 1, overridable=True)
+            i = end
+        if self.text(i) != '(':
+            while i < len(self.toks) and self.text(i) != ';':
+                i += 1
+            return i + 1
+
+        end = self._skip_group(i, record_loads=False)
+        direction = None
+        width = ''
+        j = i + 1
+        while j < end - 1:
+            kind, text, line = self.toks[j]
+            if text in OPEN:
+                if text == '[' and self.toks[j - 1][0] != 'ident':
+                    width = self._select(j)
+                j = self._skip_group(j)
+                continue
+            if kind == 'keyword' and text in DIRECTIONS:
+                direction = text
+                width = ''
+            elif kind == 'keyword' and text == 'integer':
+                width = '[ 31 : 0 ]'
+            elif kind == 'ident' and self.text(j + 1) in (',', ')', '=', '['):
+                self.ports.append(text)
+                # 非 ANSI 標頭只列名稱,宣告行以模組內的 input / output 為準
+                if direction:
+                    self._declare(text, line, direction, width)
+                    if direction == 'inout':
+                        self.resolved.add(text)
+                if self.text(j + 1) == '[':
+                    self.arrays.add(text)
+            j += 1
+        while end < len(self.toks) and self.text(end) != ';':
+            end += 1
+        return end + 1
+
+    def _declaration(self, i: int) -> int:
+        """宣告敘述: 記錄名稱、方向、位寬與 `=` 初值驅動,回傳 `;` 之後的位置"""
+        keyword = self.text(i)
+        direction = keyword if keyword in DIRECTIONS else None
+        if keyword in ('parameter', 'localparam'):
+            end = i + 1
+            while end < len(self.toks) and self.text(end) != ';':
+                end = self._skip_group(end, record_loads=False) if self.text(end) in OPEN else end + 1
+            if not self.in_subroutine:
+                self._parameters(i + 1, end, overridable=keyword == 'parameter')
+        width = '[ 31 : 0 ]' if keyword == 'integer' else ''
+        j = i + 1
+        in_init = False
+        while j < len(self.toks):
+            kind, text, line = self.toks[j]
+            if text == ';':
+                return j + 1
+            if text in OPEN:
+                if text == '[' and not in_init:
+                    # 名稱之前的範圍是位寬,之後的是陣列維度
+                    if self.toks[j - 1][0] == 'ident':
+                        self.arrays.add(self.toks[j - 1][1])
+                    else:
+                        width = self._select(j)
+                j = self._skip_group(j)
+                continue
+            if text == ',':
+                in_init = False
+            elif text == '=':
+                in_init = True
+            elif kind == 'keyword' and text in RESOLVED_NET_KEYWORDS + VARIABLE_KEYWORDS:
+                keyword = text
+            elif kind == 'ident':
+                if in_init:
+                    self._use(self.loads, text, line)
+                else:
+                    self._declare(text, line, direction, width)
+                    if keyword in RESOLVED_NET_KEYWORDS + ('integer', 'genvar') or direction == 'inout':
+                        self.resolved.add(text)
+                    if self.text(j + 1) == '=' and keyword not in ('parameter', 'localparam'):
+                        # reg q = 0; 只是初值,不算另一個驅動源
+                        if keyword in VARIABLE_KEYWORDS:
+                            self._use(self.drivers, text, line)
+                        else:
+                            self._drive(text, line, j)
+            j += 1
+        return j
+
+    def _assign(self, j: int) -> int:
+        """assign a = b, c = d; 左側為驅動,右側為負載"""
+        lhs = True
+        while j < len(self.toks):
+            kind, text, line = self.toks[j]
+            if text == ';':
+                return j + 1
+            if text == '[':
+                j = self._skip_group(j)
+                continue
+            if text in ('(', '{') and not lhs:
+                j = self._skip_group(j)
+                continue
+            if text == '=':
+                lhs = False
+            elif text == ',' and not lhs:
+                lhs = True
+            elif kind == 'ident':
+                if lhs:
+                    self._drive(text, line, j)
+                else:
+                    self._use(self.loads, text, line)
+            j += 1
+        return j
+
+    def _at_statement_start(self, i: int) -> bool:
+        if i == 0:
+            return True
+        prev = self.toks[i - 1][1]
+        if prev in STATEMENT_BOUNDARY:
+            return True
+        # always @* 之後的敘述、begin : label 之後的敘述
+        if prev == '*' and i >= 2 and self.toks[i - 2][1] == '@':
+            return True
+        return i >= 3 and self.toks[i - 2][1] == ':' and self.toks[i - 3][1] == 'begin'
+
+    def _is_lhs(self, j: int) -> bool:
+        """j 起(略過索引)是否為 <= 或 ="""
+        while self.text(j) == '[':
+            j = self._skip_group(j, record_loads=False)
+        return self.text(j) in ('<=', '=')
+
+    def _is_instance(self, i: int) -> bool:
+        nxt = self.text(i + 1)
+        if nxt == '#':
+            return True
+        if i + 1 >= len(self.toks) or self.toks[i + 1][0] != 'ident':
+            return False
+        j = i + 2
+        while self.text(j) == '[':
+            j = self._skip_group(j, record_loads=False)
+        return self.text(j) == '('
+
+    def _instance(self, i: int) -> int:
+        """module_type [#(...)] inst [range] (...) [, inst2 (...)] ;"""
+        module_type = self.toks[i][1]
+        j = i + 1
+        overrides = []
+        if self.text(j) == '#':
+            j += 1
+            if self.text(j) == '(':
+                end = self._skip_group(j)
+                overrides = [[port, expr] for port, _, _, expr in self._connections(j + 1, end - 1)[0]]
+                j = end
+            else:
+                j += 1
+        while j < len(self.toks) and self.toks[j][0] == 'ident':
+            inst_name, inst_line = self.toks[j][1], self.toks[j][2]
+            j += 1
+            array = self._select(j)
+            while self.text(j) == '[':
+                j = self._skip_group(j)
+            if self.text(j) != '(':
+                break
+            end = self._skip_group(j, record_loads=False)
+            connections, wildcard = self._connections(j + 1, end - 1)
+            self.instances.append({
+                "type": module_type,
+                "name": inst_name,
+                "line": inst_line,
+                "array": array,
+                "params": overrides,
+                "connections": connections,
+                "wildcard": wildcard
+            })
+            j = end
+            if self.text(j) != ',':
+                break
+            j += 1
+        while j < len(self.toks) and self.text(j) != ';':
+            j += 1
+        return j + 1
+
+    def _connections(self, start: int, end: int):
+        """
+        解析實例括號內 [start, end) 的端口連接
+
+        回傳 ([端口, [nets], 行號, 表示式], ...) 與是否有 `.*`;
+        具名連接的端口為名稱,依位置連接的端口為索引(查詢時對應子模組端口順序)。
+        """
+        items = []
+        depth = 0
+        item_start = start
+        for j in range(start, end + 1):
+            text = self.toks[j][1] if j < end else ','
+            if text in OPEN:
+                depth += 1
+            elif text in (')', ']', '}'):
+                depth -= 1
+            elif text == ',' and depth == 0:
+                # 依位置連接的空項目 (a, , c) 也佔一個端口位置
+                if j > item_start or end > start:
+                    items.append((item_start, j))
+                item_start = j + 1
+
+        connections = []
+        wildcard = False
+        for position, (a, b) in enumerate(items):
+            line = self.toks[a][2]
+            if a == b:
+                connections.append([position, [], line, ''])
+                continue
+            if self.toks[a][1] == '.':
+                if a + 1 < b and self.toks[a + 1][1] == '*':
+                    wildcard = True
+                    continue
+                port = self.toks[a + 1][1]
+                if a + 2 < b and self.toks[a + 2][1] == '(':
+                    nets = [t for k, t, _ in self.toks[a + 3:b - 1] if k == 'ident']
+                    expr = self._expr_text(a + 3, b - 1)
+                else:
+                    nets = [port]  # .port 隱含連接同名 net
+                    expr = port
+            else:
+                port = position
+                nets = [t for k, t, _ in self.toks[a:b] if k == 'ident']
+                expr = self._expr_text(a, b)
+            connections.append([port, list(dict.fromkeys(nets)), line, expr])
+        return connections, wildcard
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "ports": self.ports,
+            "directions": self.directions,
+            "decls": self.decls,
+            "widths": self.widths,
+            "arrays": sorted(self.arrays),
+            "resolved": sorted(self.resolved),
+            "params": self.params,
+            "param_order": self.param_order,
+            "drivers": self.drivers,
+            "driver_sources": self.driver_sources,
+            "loads": self.loads,
+            "instances": self.instances
+        }
+
+
+def _parse_modules(module_tokens) -> Dict[str, Dict[str, Any]]:
+    modules = {}
+    for tokens in module_tokens:
+        parser = _ModuleParser(tokens)
+        name = parser.parse()
+        if name is not None and name not in modules:
+            modules[name] = parser.result()
+    return modules
+
+
+def _parse_range(task) -> Dict[str, Dict[str, Any]]:
+    """平行解析的工作單元: 淨化鏡像中 [start, end) 的完整模組"""
+    lex_file, start, end, line = task
+    with open(lex_file, 'rb') as f:
+        f.seek(start)
+        buf = f.read(end - start)
+    return _parse_modules(iter_module_tokens(buf, line=line))
+
+
+def segment_file(lex_file, jobs: int = 1) -> list:
+    """
+    在淨化鏡像 lex_file 的 endmodule 之後切段,回傳 [(起始偏移, 結束偏移, 起始行號)]
+
+    段數至少為 jobs * 4,且每段約 SEGMENT_SIZE;以 mmap 搜尋切點,不讀入整個檔案。
+    """
+    size = Path(lex_file).stat().st_size
+    if size == 0:
+        return [(0, 0, 1)]
+    num_chunks = max(jobs * 4, size // SEGMENT_SIZE + 1)
+    segments = []
+    start, line = 0, 1
+    with open(lex_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for k in range(1, num_chunks):
+            match = ENDMODULE_PATTERN.search(mm, max(start, size * k // num_chunks))
+            if match is None:
+                break
+            if match.end() > start:
+                segments.append((start, match.end(), line))
+                line += mm[start:match.end()].count(b'\n')
+                start = match.end()
+    segments.append((start, size, line))
+    return segments
+
+
+def parse_design(lex_file, jobs: int = 1) -> Dict[str, Dict[str, Any]]:
+    """
+    單次詞法掃描淨化鏡像 lex_file,回傳 {模組名稱: 模組連接資訊}
+
+    檔案在 endmodule 之後切段逐段讀取,記憶體用量只與段落大小有關;
+    jobs > 1 時各段由多個行程平行解析。同名模組重複定義時保留第一個(與骨架一致)。
+    """
+    tasks = [(str(lex_file), start, end, line) for start, end, line in segment_file(lex_file, jobs)]
+    modules = {}
+    if jobs > 1:
+        print(f"[INFO] 以 {jobs} 個行程平行解析 {len(tasks)} 個區段", file=sys.stderr)
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for part in pool.map(_parse_range, tasks):
+                for name, info in part.items():
+                    modules.setdefault(name, info)
+    else:
+        for task in tasks:
+            for name, info in _parse_range(task).items():
+                modules.setdefault(name, info)
+    return modules
+
+
+def load_skeleton(skeleton_file) -> Dict[str, Any]:
+    """讀取 generate_skeleton 產生的 JSON 或 SQLite 骨架"""
+    if is_db_path(skeleton_file):
+        with SkeletonDB(skeleton_file) as db:
+            return db.to_json()
+    with open(skeleton_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+CONN_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE modules (name TEXT PRIMARY KEY, data TEXT NOT NULL) WITHOUT ROWID;
+"""
+
+
+class _ModuleTable:
+    """連接圖快取中的模組表,查詢時才逐一讀取並解析需要的模組"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._loaded = {}
+
+    def get(self, name: str, default=None):
+        if name in self._loaded:
+            return self._loaded[name]
+        row = self.conn.execute('SELECT data FROM modules WHERE name = ?', (name,)).fetchone()
+        module = json.loads(row[0]) if row else None
+        self._loaded[name] = module
+        return module if module is not None else default
+
+    def __getitem__(self, name: str):
+        module = self.get(name)
+        if module is None:
+            raise KeyError(name)
+        return module
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def items(self):
+        """依序讀出所有模組(不留在快取中,記憶體用量與設計大小無關)"""
+        for name, data in self.conn.execute('SELECT name, data FROM modules'):
+            yield name, json.loads(data)
+
+    def __len__(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM modules').fetchone()[0]
+
+
+class ConnectivityGraph:
+    """
+    模組層級的連接圖
+
+    modules[名稱] 內容:
+    - ports: 標頭端口順序(依位置連接時對應用)
+    - directions / decls: 端口方向、各名稱的宣告行
+    - widths: 各名稱宣告的位寬範圍文字(例如 "[ W - 1 : 0 ]",純量為空字串);arrays 為陣列名稱
+    - params / param_order: 參數預設值表示式,以及可由實例覆寫的參數順序
+    - drivers / loads: 各名稱在模組內被賦值 / 被讀取的行號
+    - driver_sources: {名稱: [[種類, 行號, 索引]]},每個 always 區塊或連續賦值算一個驅動源;
+      resolved 為允許多個驅動源的名稱(inout、tri / wand / wor、integer / genvar)
+    - instances: [{type, name, line, array(實例陣列範圍), params: [[參數, 表示式]],
+      connections: [[端口, [nets], 行號, 表示式]], wildcard}]
+    tops 為骨架中的頂層模組(depth 0)。
+
+    快取為 .v 檔旁的 SQLite(.conn.db),每個模組一列;
+    從快取開啟時只讀取查詢路徑經過的模組,不必載入整張圖。
+    """
+
+    def __init__(self, source: Path, modules, tops: List[str], conn=None):
+        self.source = source
+        self.modules = modules
+        self.tops = tops
+        self.conn = conn
+        self._net_index = {}
+
+    @classmethod
+    def cache_path(cls, verilog_file) -> Path:
+        path = Path(verilog_file)
+        return path.with_name(path.name + CONN_SUFFIX)
+
+    @classmethod
+    def open(cls, verilog_file, skeleton_file=None, jobs: int = 1) -> 'ConnectivityGraph':
+        """開啟快取的連接圖,不存在或已過期時重新建立"""
+        source = Path(verilog_file)
+        stat = source.stat()
+        cache_file = cls.cache_path(source)
+        if cache_file.exists():
+            conn = sqlite3.connect(f"file:{cache_file}?mode=ro", uri=True)
+            try:
+                meta = {key: json.loads(value) for key, value in conn.execute('SELECT key, value FROM meta')}
+            except sqlite3.DatabaseError:
+                meta = {}
+            if (meta.get('version') == CONN_VERSION and meta.get('size') == stat.st_size
+                    and meta.get('mtime_ns') == stat.st_mtime_ns):
+                return cls(source, _ModuleTable(conn), meta['tops'], conn)
+            conn.close()
+        return cls.build(source, skeleton_file, jobs)
+
+    @classmethod
+    def build(cls, verilog_file, skeleton_file=None, jobs: int = 1) -> 'ConnectivityGraph':
+        """掃描設計建立連接圖,並嘗試寫入旁邊的 .conn.db;jobs > 1 時平行解析"""
+        source = Path(verilog_file)
+        stat = source.stat()
+        if skeleton_file:
+            skeleton = load_skeleton(skeleton_file)
+        else:
+            skeleton = VerilogSkeletonGenerator(str(source)).parse()
+
+        print(f"[INFO] 建立連接圖: {source}", file=sys.stderr)
+        modules = parse_design(sanitized_path(source), jobs)
+        # 標頭沒有可辨識的端口列表時,以骨架的端口順序補上
+        for module in skeleton['modules']:
+            info = modules.get(module['name'])
+            if info is not None and not info['ports']:
+                info['ports'] = list(module['ports'])
+        # 骨架的頂層模組中,排除在連接圖中其實被實例化者(例如帶巢狀括號的參數覆寫)
+        instantiated = {inst['type'] for info in modules.values() for inst in info['instances']}
+        tops = list(dict.fromkeys(m['name'] for m in skeleton['modules']
+                                  if m.get('depth', 0) == 0 and m['name'] not in instantiated))
+
+        cache_file = cls.cache_path(source)
+        tmp_file = cache_file.with_name(cache_file.name + '.tmp')
+        try:
+            if tmp_file.exists():
+                tmp_file.unlink()
+            conn = sqlite3.connect(str(tmp_file))
+            try:
+                conn.execute('PRAGMA journal_mode = OFF')
+                conn.execute('PRAGMA synchronous = OFF')
+                conn.executescript(CONN_SCHEMA)
+                with conn:
+                    meta = {"version": CONN_VERSION, "size": stat.st_size,
+                            "mtime_ns": stat.st_mtime_ns, "tops": tops}
+                    conn.executemany('INSERT INTO meta VALUES (?, ?)',
+                                     ((key, json.dumps(value)) for key, value in meta.items()))
+                    conn.executemany('INSERT INTO modules VALUES (?, ?)',
+                                     ((name, json.dumps(info, separators=(',', ':')))
+                                      for name, info in modules.items()))
+            finally:
+                conn.close()
+            os.replace(tmp_file, cache_file)
+        except (OSError, sqlite3.Error) as e:
+            # 目錄不可寫入時仍可使用記憶體中的連接圖
+            print(f"[WARN] 無法寫入連接圖快取 {cache_file}: {e}", file=sys.stderr)
+        return cls(source, modules, tops)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def iter_modules(self):
+        """走訪所有模組 (名稱, 連接資訊);從快取開啟時逐列讀取"""
+        return self.modules.items()
+
+    def _connections_of(self, module_name: str) -> Dict[str, List[tuple]]:
+        """
+        {net: [(實例, 子模組端口, 行號)]},每個模組只建立一次
+
+        依位置連接的端口換成子模組端口名稱;`.*` 連接子模組中沒有明確連接的同名端口。
+        """
+        index = self._net_index.get(module_name)
+        if index is not None:
+            return index
+        index = {}
+        for inst in self.modules[module_name]['instances']:
+            child = self.modules.get(inst['type'])
+            child_ports = child['ports'] if child else []
+            connected = set()
+            for port, nets, line, _ in inst['connections']:
+                if isinstance(port, int):
+                    port = child_ports[port] if port < len(child_ports) else f"[{port}]"
+                connected.add(port)
+                for net in nets:
+                    index.setdefault(net, []).append((inst, port, line))
+            if inst['wildcard']:
+                for port in child_ports:
+                    if port not in connected:
+                        index.setdefault(port, []).append((inst, port, inst['line']))
+        self._net_index[module_name] = index
+        return index
+
+    def _mentions(self, module_name: str, net: str) -> bool:
+        module = self.modules[module_name]
+        return (net in module['decls'] or net in module['drivers'] or net in module['loads']
+                or net in self._connections_of(module_name))
+
+    def trace(self, net: str, top: Optional[str] = None) -> Dict[str, Any]:
+        """
+        從頂層模組的 net 往下展開所有相連的實例端口
+
+        hops 依深度優先順序列出每一層 (階層路徑, 模組, net),附宣告行、本地驅動 / 負載行號
+        與進入該層的端口連接;drivers / loads 彙整整條鏈路上的驅動與負載位置,
+        endpoints 為連到未定義模組(黑盒或原語)的端口。
+        """
+        if top is not None:
+            if top not in self.modules:
+                raise KeyError(f"找不到模組: {top}")
+            roots = [top]
+        else:
+            roots = [name for name in self.tops if name in self.modules and self._mentions(name, net)]
+
+        result = {"net": net, "file": str(self.source), "tops": roots,
+                  "hops": [], "drivers": [], "loads": [], "endpoints": []}
+        for root in roots:
+            self._visit(root, net, result)
+        return result
+
+    def _visit(self, root: str, net: str, result):
+        """
+        從 root 的 net 以深度優先順序展開
+
+        以明確的堆疊取代遞迴,階層再深也不受 Python 遞迴深度限制;
+        ('leave', 模組) 標記在子樹走完後將模組移出目前路徑。
+        """
+        active = {root}
+        stack = [('hop', root, net, root, None, 0)]
+        while stack:
+            item = stack.pop()
+            if item[0] == 'leave':
+                active.discard(item[1])
+                continue
+            if item[0] == 'child':
+                _, inst, port, line, path, parent_net, level = item
+                child_path = f"{path}.{inst['name']}"
+                if inst['type'] not in self.modules:
+                    result['endpoints'].append({"path": child_path, "type": inst['type'],
+                                                "port": port, "line": line})
+                    continue
+                if inst['type'] in active:
+                    # 遞迴實例化: 不再往下展開
+                    continue
+                active.add(inst['type'])
+                stack.append(('leave', inst['type']))
+                child_via = {"instance": inst['name'], "port": port, "net": parent_net, "line": line}
+                item = ('hop', inst['type'], port, child_path, child_via, level + 1)
+
+            _, module_name, net, path, via, level = item
+            module = self.modules[module_name]
+            direction = module['directions'].get(net)
+            drivers = module['drivers'].get(net, [])
+            loads = module['loads'].get(net, [])
+            result['hops'].append({
+                "path": path,
+                "module": module_name,
+                "net": net,
+                "level": level,
+                "direction": direction,
+                "declared_at": module['decls'].get(net),
+                "drivers": drivers,
+                "loads": loads,
+                "via": via
+            })
+            if level == 0 and direction in ('input', 'inout'):
+                # 頂層輸入端口由設計外部驅動
+                result['drivers'].append({"path": path, "net": net, "line": module['decls'][net],
+                                          "kind": "top_input"})
+            for line in drivers:
+                result['drivers'].append({"path": path, "net": net, "line": line, "kind": "local"})
+            for line in loads:
+                result['loads'].append({"path": path, "net": net, "line": line, "kind": "local"})
+            if level == 0 and direction in ('output', 'inout'):
+                result['loads'].append({"path": path, "net": net, "line": module['decls'][net],
+                                        "kind": "top_output"})
+
+            # 反序推入,使第一個連接最先展開(與遞迴版本的順序相同)
+            for inst, port, line in reversed(self._connections_of(module_name).get(net, [])):
+                stack.append(('child', inst, port, line, path, net, level))
+
+
+def print_trace(result: Dict[str, Any]):
+    """以縮排顯示鏈路"""
+    for hop in result['hops']:
+        indent = '  ' * hop['level']
+        direction = hop['direction'] or 'net'
+        via = ''
+        if hop['via']:
+            via = f"  ← .{hop['via']['port']}({hop['via']['net']}) 第 {hop['via']['line']} 行"
+        declared = f", 第 {hop['declared_at']} 行宣告" if hop['declared_at'] else ''
+        print(f"{indent}{hop['path']} ({hop['module']}) {hop['net']} [{direction}{declared}]{via}")
+        if hop['drivers']:
+            print(f"{indent}  驅動: 第 {', '.join(map(str, hop['drivers']))} 行")
+        if hop['loads']:
+            print(f"{indent}  負載: 第 {', '.join(map(str, hop['loads']))} 行")
+    for endpoint in result['endpoints']:
+        print(f"  ⚠️  {endpoint['path']} ({endpoint['type']}) .{endpoint['port']} "
+              f"第 {endpoint['line']} 行: 未定義的模組,無法判斷方向")
+
+
+def main():
+    args = sys.argv[1:]
+    options = {}
+    for flag in ('--top', '--skeleton', '--jobs'):
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1]
+            del args[i:i + 2]
+    rebuild = '--build' in args
+    args = [a for a in args if a != '--build']
+
+    if len(args) < 1 or (len(args) < 2 and not rebuild):
+        print("用法: python connectivity.py <verilog_file> <net> [output_json] [--top MODULE] [--skeleton FILE] [--jobs N]")
+        print("      python connectivity.py <verilog_file> --build [--skeleton FILE] [--jobs N]")
+        print("範例: python connectivity.py soc_top.v data_bus path.json")
+        print("      python connectivity.py soc_top.v clk_pcie --top chip_top --skeleton skeleton.db")
+        sys.exit(1)
+
+    verilog_file = args[0]
+    jobs = int(options.get('--jobs', 1))
+    if rebuild:
+        graph = ConnectivityGraph.build(verilog_file, options.get('--skeleton'), jobs)
+        print(f"[SUCCESS] 連接圖已儲存至: {ConnectivityGraph.cache_path(verilog_file)}")
+        print(f"模組數量: {len(graph.modules)}, 頂層模組: {len(graph.tops)} 個")
+        if len(args) < 2:
+            return
+    else:
+        graph = ConnectivityGraph.open(verilog_file, options.get('--skeleton'), jobs)
+
+    net = args[1]
+    output_file = args[2] if len(args) > 2 else None
+    try:
+        with graph:
+            result = graph.trace(net, options.get('--top'))
+    except KeyError as e:
+        print(f"[ERROR] {e.args[0]}")
+        sys.exit(1)
+
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"[SUCCESS] 連接路徑已儲存至: {output_file}")
+
+    print(f"\n=== 連接路徑: {net} ===")
+    if not result['hops']:
+        print(f"[WARN] 頂層模組中找不到 {net}")
+        return
+    print_trace(result)
+    print(f"\n經過層級: {len(result['hops'])}")
+    print(f"驅動源數量: {len(result['drivers'])}")
+    print(f"負載數量: {len(result['loads'])}")
+    if len(result['drivers']) > 1:
+        print("⚠️  警告: 鏈路上有多個驅動源,可能存在衝突!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+"""
+Verilog Design Checker
+全設計的端口一致性、位寬與多重驅動檢查
+
+用途: 取代逐一信號呼叫 trace_signal.py、再人工比對宣告的檢查方式。
+以 connectivity.py 的連接圖(單次詞法掃描、可平行建立並快取於 .conn.db)
+作為宣告表: 每個模組的端口方向、宣告位寬、參數與驅動源;
+再逐一走訪每個實例連接與每個信號的驅動源,一次回報全部違規:
+
+- 端口一致性: 連接不存在的端口、依位置連接超出端口數、重複連接、輸入端口未連接
+- 位寬: 實例端口與所接表示式的位寬不符(套用實例的參數覆寫),未宣告的隱含 1 位元 net
+- 驅動: 同一信號有多個驅動源(always 區塊 / 連續賦值 / 子模組輸出)、
+  輸入端口在模組內被驅動、輸出端口沒有驅動源
+
+每個模組定義只檢查一次,位寬以模組的參數預設值計算;
+generate 區塊中的驅動源與無法求值的位寬不回報,避免誤判。
+"""
+
+import ast
+import json
+import operator
+import re
+import sys
+from typing import Any, Dict, List, Optional
+
+from connectivity import ConnectivityGraph
+
+
+NUMBER_PATTERN = re.compile(r"^(\d[\d_]*)?'[sS]?([bBoOdDhH])([0-9a-fA-F_]+)$")
+DECIMAL_PATTERN = re.compile(r'^\d[\d_]*$')
+BASES = {'b': 2, 'o': 8, 'd': 10, 'h': 16}
+# Verilog 運算子對應到 Python 語法;其他運算子(比較、三元)不求值
+OPERATORS = {'+': '+', '-': '-', '*': '*', '/': '//', '%': '%', '**': '**',
+             '<<': '<<', '>>': '>>', '<<<': '<<', '>>>': '>>', '(': '(', ')': ')', ',': ','}
+BINARY_OPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+    ast.LShift: operator.lshift, ast.RShift: operator.rshift
+}
+
+CHECKS = {
+    'unknown_port': ('error', '連接不存在的端口'),
+    'too_many_ports': ('error', '依位置連接超出端口數'),
+    'duplicate_port': ('error', '端口重複連接'),
+    'multiple_drivers': ('error', '多重驅動'),
+    'input_driven': ('error', '輸入端口在模組內被驅動'),
+    'width_mismatch': ('warning', '位寬不符'),
+    'implicit_net': ('warning', '未宣告的 net(隱含 1 位元)'),
+    'unconnected_input': ('warning', '輸入端口未連接'),
+    'undriven_output': ('warning', '輸出端口沒有驅動源'),
+}
+
+
+def _clog2(value: int) -> int:
+    return max(0, (value - 1).bit_length())
+
+
+def _eval_node(node, names: Dict[str, int]) -> int:
+    if isinstance(node, ast.Expression):
+        return _eval_node(node.body, names)
+    if isinstance(node, ast.Constant) and isinstance(node.value, int):
+        return node.value
+    if isinstance(node, ast.Name) and node.id in names:
+        return names[node.id]
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPS:
+        return BINARY_OPS[type(node.op)](_eval_node(node.left, names), _eval_node(node.right, names))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = _eval_node(node.operand, names)
+        return -value if isinstance(node.op, ast.USub) else value
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'clog2'
+            and len(node.args) == 1):
+        return _clog2(_eval_node(node.args[0], names))
+    raise ValueError('unsupported expression')
+
+
+def _group_end(tokens: List[str], i: int) -> int:
+    """tokens[i] 為左括號,回傳對應右括號之後的位置"""
+    pairs = {'(': ')', '[': ']', '{': '}'}
+    stack = []
+    while i < len(tokens):
+        if tokens[i] in pairs:
+            stack.append(pairs[tokens[i]])
+        elif stack and tokens[i] == stack[-1]:
+            stack.pop()
+            if not stack:
+                return i + 1
+        i += 1
+    return i
+
+
+def _split_top(tokens: List[str], separator: str) -> List[List[str]]:
+    """以最外層的 separator 切開 tokens"""
+    parts = [[]]
+    i = 0
+    while i < len(tokens):
+        if tokens[i] in ('(', '[', '{'):
+            end = _group_end(tokens, i)
+            parts[-1].extend(tokens[i:end])
+            i = end
+            continue
+        if tokens[i] == separator:
+            parts.append([])
+        else:
+            parts[-1].append(tokens[i])
+        i += 1
+    return parts
+
+
+class _Scope:
+    """
+    單一模組(可套用實例的參數覆寫)的參數值與宣告位寬
+
+    overrides 為已在父模組求值的 {參數: 整數或 None},None 表示無法求值。
+    """
+
+    def __init__(self, module: Dict[str, Any], overrides: Optional[Dict[str, Optional[int]]] = None):
+        self.module = module
+        self.values = dict(overrides or {})
+        self._active = set()
+
+    def param(self, name: str) -> Optional[int]:
+        if name in self.values:
+            return self.values[name]
+        expr = self.module['params'].get(name)
+        if expr is None or name in self._active:
+            return None
+        self._active.add(name)
+        value = self.eval(expr)
+        self._active.discard(name)
+        self.values[name] = value
+        return value
+
+    def eval(self, text: str) -> Optional[int]:
+        """求值常數表示式(參數、數字、四則與移位、$clog2),無法求值時回傳 None"""
+        if not text:
+            return None
+        source = []
+        names = {}
+        for token in text.split(' '):
+            if DECIMAL_PATTERN.match(token):
+                source.append(token.replace('_', ''))
+                continue
+            match = NUMBER_PATTERN.match(token)
+            if match:
+                source.append(str(int(match.group(3).replace('_', ''), BASES[match.group(2).lower()])))
+            elif token == '$clog2':
+                source.append('clog2')
+            elif token in OPERATORS:
+                source.append(OPERATORS[token])
+            elif re.match(r'^[A-Za-z_]\w*$', token):
+                value = self.param(token)
+                if value is None:
+                    return None
+                names[token] = value
+                source.append(token)
+            else:
+                return None
+        try:
+            return _eval_node(ast.parse(' '.join(source), mode='eval'), names)
+        except (SyntaxError, ValueError, ZeroDivisionError, TypeError, OverflowError, RecursionError):
+            return None
+
+    def range_width(self, text: str) -> Optional[int]:
+        """`[ msb : lsb ]`、`[ base +: w ]` 或 `[ i ]` 的位寬"""
+        inner = text.split(' ')[1:-1]
+        for op in ('+:', '-:'):
+            parts = _split_top(inner, op)
+            if len(parts) == 2:
+                return self.eval(' '.join(parts[1]))
+        parts = _split_top(inner, ':')
+        if len(parts) == 1:
+            return 1
+        if len(parts) == 2:
+            msb, lsb = self.eval(' '.join(parts[0])), self.eval(' '.join(parts[1]))
+            if msb is not None and lsb is not None:
+                return abs(msb - lsb) + 1
+        return None
+
+    def bits(self, text: str) -> Optional[tuple]:
+        """索引文字涵蓋的位元範圍 (低, 高),無法求值時回傳 None"""
+        inner = text.split(' ')[1:-1]
+        if '[' in inner:
+            return None
+        for op in ('+:', '-:'):
+            parts = _split_top(inner, op)
+            if len(parts) == 2:
+                base, width = self.eval(' '.join(parts[0])), self.eval(' '.join(parts[1]))
+                if base is None or width is None:
+                    return None
+                return (base, base + width - 1) if op == '+:' else (base - width + 1, base)
+        parts = [self.eval(' '.join(part)) for part in _split_top(inner, ':')]
+        if None in parts or len(parts) > 2:
+            return None
+        return min(parts), max(parts)
+
+    def width(self, name: str) -> Optional[int]:
+        """宣告位寬(元素位寬);未宣告或無法求值時回傳 None"""
+        declared = self.module['widths'].get(name)
+        if declared is None:
+            return None
+        return self.range_width(declared) if declared else 1
+
+    def expr_width(self, text: str) -> Optional[int]:
+        """連接表示式的位寬: 信號(含索引)、有位寬的常數、串接與複製;其他運算回傳 None"""
+        return self._operand_width(text.split(' ')) if text else None
+
+    def _operand_width(self, tokens: List[str]) -> Optional[int]:
+        if not tokens:
+            return None
+        first = tokens[0]
+        if first == '{':
+            if _group_end(tokens, 0) != len(tokens):
+                return None
+            inner = tokens[1:-1]
+            parts = _split_top(inner, ',')
+            if len(parts) == 1 and inner and inner[-1] == '}' and '{' in inner:
+                # 複製 {N{x}}
+                brace = inner.index('{')
+                count = self.eval(' '.join(inner[:brace]))
+                width = self._operand_width(inner[brace:])
+                return count * width if count is not None and width is not None else None
+            total = 0
+            for part in parts:
+                width = self._operand_width(part)
+                if width is None:
+                    return None
+                total += width
+            return total
+        match = NUMBER_PATTERN.match(first)
+        if match:
+            return int(match.group(1).replace('_', '')) if match.group(1) and len(tokens) == 1 else None
+        if not re.match(r'^[A-Za-z_]\w*$', first) or first in self.module['params']:
+            return None
+        width = self.width(first)
+        is_array = first in self.module['arrays']
+        i = 1
+        while width is not None and i < len(tokens) and tokens[i] == '[':
+            end = _group_end(tokens, i)
+            if is_array:
+                is_array = False   # 陣列索引取出元素,位寬不變
+            else:
+                width = self.range_width(' '.join(tokens[i:end]))
+            i = end
+        return width if i == len(tokens) and not is_array else None
+
+
+def _signal_selects(tokens: List[str]) -> Optional[List[tuple]]:
+    """輸出端口所接表示式中被驅動的 (信號, 索引文字);串接逐一展開,其他運算回傳 None"""
+    if not tokens:
+        return []
+    if tokens[0] == '{' and _group_end(tokens, 0) == len(tokens):
+        result = []
+        for part in _split_top(tokens[1:-1], ','):
+            selects = _signal_selects(part)
+            if selects is None:
+                return None
+            result.extend(selects)
+        return result
+    if not re.match(r'^[A-Za-z_]\w*$', tokens[0]):
+        return None
+    select = ' '.join(tokens[1:])
+    if select and (tokens[1] != '[' or _group_end(tokens, 1) != len(tokens)):
+        return None
+    return [(tokens[0], select)]
+
+
+class DesignChecker:
+    """以連接圖為宣告表,檢查全設計的實例連接與驅動源"""
+
+    def __init__(self, graph: ConnectivityGraph):
+        self.graph = graph
+        self.findings = []
+        self.interfaces = {}
+        self.undefined = {}
+        self.stats = {"modules": 0, "instances": 0, "connections": 0, "signals": 0, "sources": 0,
+                      "width_unresolved": 0}
+
+    def _report(self, check: str, module: str, line: int, message: str, **details):
+        severity, title = CHECKS[check]
+        finding = {"check": check, "severity": severity, "title": title,
+                   "module": module, "line": line, "message": message}
+        finding.update(details)
+        self.findings.append(finding)
+
+    def run(self) -> Dict[str, Any]:
+        # 第一輪只留下各模組的介面(端口、方向、位寬、參數),第二輪逐一檢查
+        for name, module in self.graph.iter_modules():
+            self.interfaces[name] = {key: module[key] for key in
+                                     ('ports', 'directions', 'widths', 'arrays', 'params', 'param_order')}
+        for name, module in self.graph.iter_modules():
+            self.stats["modules"] += 1
+            self._check_module(name, module)
+        self.findings.sort(key=lambda f: (f['module'], f['line'], f['check']))
+        return self.result()
+
+    def _child_scope(self, scope: _Scope, child: Dict[str, Any], inst: Dict[str, Any]) -> _Scope:
+        overrides = {}
+        for key, expr in inst['params']:
+            if isinstance(key, int):
+                if key >= len(child['param_order']):
+                    continue
+                key = child['param_order'][key]
+            overrides[key] = scope.eval(expr)
+        return _Scope(child, overrides)
+
+    def _check_module(self, name: str, module: Dict[str, Any]):
+        scope = _Scope(module)
+        sources = {signal: [tuple(source) for source in entries if source[0] != 'initial']
+                   for signal, entries in module['driver_sources'].items()}
+        resolved = set(module['resolved'])
+        declared = module['decls']
+
+        for inst in module['instances']:
+            self.stats["instances"] += 1
+            self.stats["connections"] += len(inst['connections'])
+            child = self.interfaces.get(inst['type'])
+            if child is None:
+                self.undefined[inst['type']] = self.undefined.get(inst['type'], 0) + 1
+                continue
+            child_scope = self._child_scope(scope, child, inst)
+            where = f"{inst['name']} ({inst['type']})"
+            connected = set()
+            for port, nets, line, expr in inst['connections']:
+                if isinstance(port, int):
+                    if port >= len(child['ports']):
+                        self._report('too_many_ports', name, line,
+                                     f"{where} 第 {port + 1} 個連接,{inst['type']} 只有 {len(child['ports'])} 個端口",
+                                     instance=inst['name'])
+                        continue
+                    port = child['ports'][port]
+                elif port not in child['ports'] and port not in child['directions']:
+                    self._report('unknown_port', name, line, f"{where} .{port} 不是 {inst['type']} 的端口",
+                                 instance=inst['name'], port=port)
+                    continue
+                if port in connected:
+                    self._report('duplicate_port', name, line, f"{where} .{port} 重複連接",
+                                 instance=inst['name'], port=port)
+                    continue
+                connected.add(port)
+                if not expr:
+                    continue   # .port() 明確不接
+                self._check_width(name, scope, child_scope, inst, port, expr, line, declared)
+                if child['directions'].get(port) == 'output':
+                    for signal, select in _signal_selects(expr.split(' ')) or []:
+                        sources.setdefault(signal, []).append(
+                            (f"instance {inst['name']}.{port}", line, select))
+
+            for port in child['ports']:
+                if port in connected:
+                    continue
+                if inst['wildcard']:
+                    # .* 連接同名 net
+                    if port in declared:
+                        self._check_width(name, scope, child_scope, inst, port, port, inst['line'], declared)
+                    if child['directions'].get(port) == 'output':
+                        sources.setdefault(port, []).append((f"instance {inst['name']}.{port}", inst['line'], ''))
+                elif child['directions'].get(port) == 'input':
+                    self._report('unconnected_input', name, inst['line'],
+                                 f"{where} 的輸入端口 {port} 未連接", instance=inst['name'], port=port)
+
+        self._check_drivers(name, module, scope, sources, resolved)
+
+    def _check_width(self, name, scope, child_scope, inst, port, expr, line, declared):
+        port_width = child_scope.width(port)
+        if inst['array']:
+            # 實例陣列的連接位寬是端口位寬的倍數或單一複製,不做比對
+            self.stats["width_unresolved"] += 1
+            return
+        tokens = expr.split(' ')
+        if len(tokens) == 1 and re.match(r'^[A-Za-z_]\w*$', expr) and expr not in declared:
+            self._report('implicit_net', name, line,
+                         f"{inst['name']} ({inst['type']}) .{port}({expr}): {expr} 未宣告,"
+                         f"隱含為 1 位元 net(端口 {port_width if port_width is not None else '?'} 位元)",
+                         instance=inst['name'], port=port, net=expr)
+            return
+        net_width = scope.expr_width(expr)
+        if port_width is None or net_width is None:
+            self.stats["width_unresolved"] += 1
+            return
+        if port_width != net_width:
+            self._report('width_mismatch', name, line,
+                         f"{inst['name']} ({inst['type']}) .{port}({expr}): 端口 {port_width} 位元,"
+                         f"連接 {net_width} 位元",
+                         instance=inst['name'], port=port, port_width=port_width, net_width=net_width)
+
+    def _check_drivers(self, name, module, scope, sources, resolved):
+        directions = module['directions']
+        for signal, entries in sources.items():
+            self.stats["signals"] += 1
+            self.stats["sources"] += len(entries)
+            lines = sorted({line for _, line, _ in entries})
+            if directions.get(signal) == 'input':
+                self._report('input_driven', name, lines[0],
+                             f"輸入端口 {signal} 被驅動,驅動源在第 {', '.join(map(str, lines))} 行",
+                             signal=signal, driver_lines=lines)
+                continue
+            if len(entries) < 2 or signal in resolved or signal in module['params']:
+                continue
+            if any(kind.startswith('generate') for kind, _, _ in entries):
+                continue
+            if self._overlapping(scope, entries):
+                kinds = ', '.join(f"{kind} 第 {line} 行" for kind, line, _ in entries)
+                self._report('multiple_drivers', name, lines[0],
+                             f"{signal} 有 {len(entries)} 個驅動源: {kinds}",
+                             signal=signal, driver_lines=lines,
+                             sources=[{"kind": kind, "line": line, "select": select}
+                                      for kind, line, select in entries])
+
+        for signal, direction in directions.items():
+            if direction == 'output' and not sources.get(signal) and signal not in module['drivers']:
+                self._report('undriven_output', name, module['decls'].get(signal, 0),
+                             f"輸出端口 {signal} 在模組內沒有驅動源", signal=signal)
+
+    @staticmethod
+    def _overlapping(scope: _Scope, entries: List[tuple]) -> bool:
+        """驅動源是否驅動到相同位元(都是可求值且互不重疊的部分選取時不算)"""
+        if any(not select for _, _, select in entries):
+            return True
+        ranges = [scope.bits(select) for _, _, select in entries]
+        if None in ranges:
+            selects = [select for _, _, select in entries]
+            return len(set(selects)) < len(selects)
+        ranges.sort()
+        return any(ranges[k][1] >= ranges[k + 1][0] for k in range(len(ranges) - 1))
+
+    def result(self) -> Dict[str, Any]:
+        counts = {check: 0 for check in CHECKS}
+        for finding in self.findings:
+            counts[finding['check']] += 1
+        return {
+            "file": str(self.graph.source),
+            "stats": self.stats,
+            "counts": counts,
+            "errors": sum(1 for f in self.findings if f['severity'] == 'error'),
+            "warnings": sum(1 for f in self.findings if f['severity'] == 'warning'),
+            "undefined_modules": dict(sorted(self.undefined.items())),
+            "findings": self.findings
+        }
+
+
+def check_design(verilog_file, skeleton_file=None, jobs: int = 1) -> Dict[str, Any]:
+    """建立(或開啟快取的)連接圖並檢查全設計"""
+    print(f"[INFO] 設計檢查: {verilog_file}")
+    with ConnectivityGraph.open(verilog_file, skeleton_file, jobs) as graph:
+        return DesignChecker(graph).run()
+
+
+def render_report(result: Dict[str, Any], limit: int = 100) -> str:
+    """產生附行號的 Markdown 報告,每類違規最多列出 limit 筆(JSON 保留全部)"""
+    stats = result['stats']
+    out = [
+        f"# 設計一致性檢查: {result['file']}",
+        "",
+        f"全檔搜尋: 以單次詞法掃描建立宣告表,共 {stats['modules']} 個模組、{stats['instances']} 個實例、"
+        f"{stats['connections']} 個端口連接。",
+        "",
+    ]
+    for check, (severity, title) in CHECKS.items():
+        findings = [f for f in result['findings'] if f['check'] == check]
+        if not findings:
+            continue
+        icon = '❌' if severity == 'error' else '⚠️ '
+        out += [f"## {icon} {title}(出現 {len(findings)} 次)", ""]
+        for finding in findings[:limit]:
+            out.append(f"- {finding['module']} 第 {finding['line']} 行: {finding['message']}")
+        if len(findings) > limit:
+            out.append(f"- ……另有 {len(findings) - limit} 筆,完整清單見 --json 輸出")
+        out.append("")
+
+    if result['undefined_modules']:
+        out += ["## 未定義的模組", "",
+                "以下模組在設計中沒有定義(黑盒或標準元件庫),其實例不做端口與位寬檢查:", ""]
+        for module_type, count in list(result['undefined_modules'].items())[:limit]:
+            out.append(f"- {module_type}: {count} 個實例")
+        out.append("")
+
+    out += [
+        "## 摘要",
+        "",
+        f"- 錯誤: {result['errors']} 處",
+        f"- 警告: {result['warnings']} 處",
+        f"- 驅動源: 共 {stats['signals']} 個信號、{stats['sources']} 個驅動源已檢查",
+        f"- 位寬無法求值而略過的連接: {stats['width_unresolved']} 個",
+    ]
+    if not result['errors'] and not result['warnings']:
+        out.append("- ✓ 已確認: 全部端口連接、位寬與驅動源皆一致")
+    else:
+        out.append(f"- ✓ 已確認: {stats['modules']} 個模組的宣告表已全部檢查")
+    return '\n'.join(out) + '\n'
+
+
+def main():
+    args = sys.argv[1:]
+    options = {}
+    for flag in ('--json', '--skeleton', '--jobs', '--limit'):
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1]
+            del args[i:i + 2]
+
+    if len(args) < 1:
+        print("用法: python design_checker.py <verilog_file> [report_md] [--json result.json] "
+              "[--skeleton FILE] [--jobs N] [--limit N]")
+        print("範例: python design_checker.py soc_top.v check_report.md --json check.json --jobs 16")
+        sys.exit(1)
+
+    result = check_design(args[0], options.get('--skeleton'), int(options.get('--jobs', 1)))
+    report = render_report(result, int(options.get('--limit', 100)))
+
+    if len(args) > 1:
+        with open(args[1], 'w', encoding='utf-8') as f:
+            f.write(report)
+        print(f"[SUCCESS] 檢查報告已儲存至: {args[1]}")
+    else:
+        print(report)
+    if '--json' in options:
+        with open(options['--json'], 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"[SUCCESS] 檢查結果已儲存至: {options['--json']}")
+
+    stats = result['stats']
+    print(f"\n=== 檢查摘要 ===")
+    print(f"模組數量: {stats['modules']}")
+    print(f"實例數量: {stats['instances']}")
+    print(f"錯誤: {result['errors']}, 警告: {result['warnings']}")
+    if result['errors']:
+        print("❌ 發現端口或驅動錯誤!")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
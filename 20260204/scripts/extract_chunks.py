@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Verilog Chunk Extractor
+以 always 區塊與模組為單位產生檢索用片段(JSONL)
+
+用途: SKILL.md Phase 2.1 的向量化切分。split_verilog.py 只能以整個模組或固定行數切分,
+這裡依結構產生兩種片段,每行一筆 JSON,可直接餵給檢索索引:
+
+- always_block: 一個 always / always_ff / always_comb / always_latch 區塊的原始碼,
+  附 line_range、所屬 module 與區塊內出現的 signals
+- module_def: 整個模組(module 到 endmodule)的原始碼,line_range 涵蓋整個模組,
+  signals 為端口名稱;有骨架時另附 hierarchy_depth。assign、實例、宣告、generate、
+  function / task 等不在 always 區塊內的內容只出現在這個片段,
+  因此每一行原始碼都至少屬於一個片段。
+
+在淨化鏡像上辨識結構(註解、字串中的 always / endmodule 不會誤判),
+片段內容則以相同偏移取自原始檔(保留註解)。檔案在 endmodule 之後切段,
+各段可由多個行程平行處理,依原始順序逐段寫出,記憶體用量只與段落大小有關。
+"""
+
+import json
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict
+
+from connectivity import load_skeleton, segment_file
+from verilog_lexer import sanitized_path, skip_group, statement_end, tokenize
+
+
+ALWAYS_KEYWORDS = ('always', 'always_ff', 'always_comb', 'always_latch')
+
+# 工作行程中的 {模組名稱: 階層深度},由 _init_worker 設定
+_depths: Dict[str, int] = {}
+
+
+def _init_worker(depths: Dict[str, int]):
+    global _depths
+    _depths = depths
+
+
+def _block_signals(tokens: list, start: int, stop: int) -> list:
+    """區塊內的信號名稱(依出現順序),不含函數呼叫與 begin : label 的標籤"""
+    names = {}
+    for k in range(start, stop):
+        kind, text = tokens[k][0], tokens[k][1]
+        if kind != 'ident' or text.startswith('\\'):
+            continue
+        if k + 1 < stop and tokens[k + 1][1] == '(':
+            continue
+        if tokens[k - 1][1] == ':' and tokens[k - 2][1] == 'begin':
+            continue
+        names[text] = None
+    return list(names)
+
+
+def _module_chunks(source: str, raw: bytes, tokens: list, start: int, end: int, lines: tuple):
+    """一個模組(tokens 不含 module / endmodule)的片段;start / end 為模組在 raw 中的範圍"""
+    if not tokens or tokens[0][0] != 'ident':
+        return
+    name = tokens[0][1]
+
+    i = 1
+    if i < len(tokens) and tokens[i][1] == '#':
+        i = skip_group(tokens, i + 1)
+    ports = []
+    if i < len(tokens) and tokens[i][1] == '(':
+        close = skip_group(tokens, i)
+        ports = [tokens[k][1] for k in range(i + 1, close - 1)
+                 if tokens[k][0] == 'ident' and tokens[k + 1][1] in (',', ')')]
+        i = close
+    while i < len(tokens) and tokens[i][1] != ';':
+        i += 1
+
+    record = {
+        "id": f"{name}:module_def:{lines[0]}",
+        "type": "module_def",
+        "file": source,
+        "module": name,
+        "line_range": list(lines),
+        "signals": ports,
+        "content": raw[start:end].decode('utf-8', errors='ignore')
+    }
+    if name in _depths:
+        record["hierarchy_depth"] = _depths[name]
+    yield record
+
+    while i < len(tokens):
+        kind, text, line, offset, _ = tokens[i]
+        if kind != 'keyword' or text not in ALWAYS_KEYWORDS:
+            i += 1
+            continue
+        j = i + 1
+        if j < len(tokens) and tokens[j][1] == '@':
+            j += 1
+            if j < len(tokens) and tokens[j][1] == '(':
+                j = skip_group(tokens, j)
+            elif j < len(tokens) and tokens[j][1] == '*':
+                j += 1
+        stop = min(statement_end(tokens, j), len(tokens))
+        last = tokens[stop - 1]
+        yield {
+            "id": f"{name}:always_block:{line}",
+            "type": "always_block",
+            "file": source,
+            "module": name,
+            "line_range": [line, last[2]],
+            "signals": _block_signals(tokens, i, stop),
+            "content": raw[offset:last[4]].decode('utf-8', errors='ignore')
+        }
+        i = stop
+
+
+def _extract_range(task) -> tuple:
+    """工作單元: [start, end) 區段內所有模組的片段,回傳 (JSONL 文字, 片段數)"""
+    source, lex_file, start, end, line = task
+    with open(lex_file, 'rb') as f:
+        f.seek(start)
+        lex = f.read(end - start)
+    with open(source, 'rb') as f:
+        f.seek(start)
+        raw = f.read(end - start)
+
+    out = []
+    tokens = None
+    module_start = module_line = 0
+    last = 0
+    for token in tokenize(lex):
+        line += lex.count(b'\n', last, token.start)
+        last = token.start
+        text = lex[token.start:token.end]
+        if tokens is None:
+            if token.kind == 'keyword' and text in (b'module', b'macromodule'):
+                tokens = []
+                module_start, module_line = token.start, line
+            continue
+        if token.kind == 'keyword' and text == b'endmodule':
+            for record in _module_chunks(source, raw, tokens, module_start, token.end, (module_line, line)):
+                out.append(json.dumps(record, ensure_ascii=False))
+            tokens = None
+            continue
+        tokens.append((token.kind, text.decode('utf-8', errors='ignore'), line, token.start, token.end))
+    return ''.join(record + '\n' for record in out), len(out)
+
+
+def extract_chunks(verilog_file, output_file, jobs: int = 1, skeleton_file=None) -> Dict[str, Any]:
+    """
+    將 verilog_file 的片段寫入 output_file(JSONL,'-' 為標準輸出)
+
+    jobs > 1 時各段平行處理,最多同時保留 2 * jobs 段的結果,依原始順序寫出。
+    """
+    source = Path(verilog_file)
+    print(f"[INFO] 擷取片段: {source}", file=sys.stderr)
+    lex_file = sanitized_path(source)
+    segments = segment_file(lex_file, jobs)
+    tasks = [(str(source), str(lex_file), start, end, line) for start, end, line in segments]
+
+    depths = {}
+    if skeleton_file:
+        for module in load_skeleton(skeleton_file)['modules']:
+            depths.setdefault(module['name'], module.get('depth', 0))
+
+    total = 0
+    out = sys.stdout if str(output_file) == '-' else open(output_file, 'w', encoding='utf-8')
+    try:
+        if jobs > 1:
+            print(f"[INFO] 以 {jobs} 個行程平行處理 {len(tasks)} 個區段", file=sys.stderr)
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                     initargs=(depths,)) as pool:
+                pending = deque()
+                for task in tasks:
+                    pending.append(pool.submit(_extract_range, task))
+                    while len(pending) > 2 * jobs or (pending and pending[0].done()):
+                        text, count = pending.popleft().result()
+                        out.write(text)
+                        total += count
+                while pending:
+                    text, count = pending.popleft().result()
+                    out.write(text)
+                    total += count
+        else:
+            _init_worker(depths)
+            for task in tasks:
+                text, count = _extract_range(task)
+                out.write(text)
+                total += count
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return {"file": str(source), "segments": len(tasks), "chunks": total}
+
+
+def main():
+    args = sys.argv[1:]
+    options = {}
+    for flag in ('--jobs', '--skeleton'):
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1]
+            del args[i:i + 2]
+
+    if len(args) < 2:
+        print("用法: python extract_chunks.py <verilog_file> <output_jsonl|-> [--jobs N] [--skeleton FILE]")
+        print("範例: python extract_chunks.py soc_top.v chunks.jsonl --jobs 16 --skeleton skeleton.db")
+        sys.exit(1)
+
+    result = extract_chunks(args[0], args[1], int(options.get('--jobs', 1)), options.get('--skeleton'))
+    target = 'stdout' if args[1] == '-' else args[1]
+    print(f"[SUCCESS] {result['chunks']} 個片段({result['segments']} 個區段)已寫入: {target}",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
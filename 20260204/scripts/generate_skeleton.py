@@ -8,34 +8,88 @@ Verilog Design Skeleton Generator
 
 import re
 import json
+import mmap
 import sys
+from collections import Counter, deque
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from skeleton_db import is_db_path, write_skeleton_db
+from verilog_lexer import sanitized_path
+
+try:
+    import resource
+except ImportError:  # Windows 沒有 resource 模組
+    resource = None
+
+# 逐塊計算換行數的區塊大小
+_SCAN_BLOCK = 16 * 1024 * 1024
+
+
+def peak_memory_mb() -> Optional[float]:
+    """回傳目前行程的峰值常駐記憶體(MB),不支援的平台回傳 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 為單位,macOS 以 byte 為單位
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return round(peak / 1024, 2)
+
+
+def _count_newlines(buf, start: int, end: int) -> int:
+    """逐塊計算 buf[start:end] 中的換行數,避免一次複製整段內容"""
+    count = 0
+    while start < end:
+        stop = min(start + _SCAN_BLOCK, end)
+        count += buf[start:stop].count(b'\n')
+        start = stop
+    return count
+
+
+def _decode(raw: bytes) -> str:
+    return raw.decode('utf-8', errors='ignore')
+
+
+class _LineCursor:
+    """記錄上次查詢的位置與行號,依序查詢時只需計算兩次查詢之間的換行"""
+    
+    def __init__(self, buf):
+        self.buf = buf
+        self.pos = 0
+        self.line = 1
+    
+    def line_at(self, pos: int) -> int:
+        if pos >= self.pos:
+            self.line += _count_newlines(self.buf, self.pos, pos)
+        else:
+            self.line -= _count_newlines(self.buf, pos, self.pos)
+        self.pos = pos
+        return self.line
 
 
 class VerilogSkeletonGenerator:
     """解析 Verilog 檔案並產生結構化階層地圖"""
     
-    def __init__(self, verilog_file: str):
+    def __init__(self, verilog_file: str, use_mmap: bool = False):
         self.file_path = Path(verilog_file)
+        self.use_mmap = use_mmap
         self.modules = []
         self.global_defines = []
         self.includes = []
+        self.peak_memory_mb = None
         
     def parse(self) -> Dict[str, Any]:
         """主解析函數"""
         print(f"[INFO] 解析檔案: {self.file_path}")
         
-        with open(self.file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            total_lines = content.count('\n') + 1
-            
-        # 提取全域定義
-        self._extract_defines(content)
-        self._extract_includes(content)
-        
-        # 提取所有模組
-        self._extract_modules(content)
+        # 在詞法淨化鏡像上解析: 註解、字串與屬性已換成空白,偏移與行號與原始檔相同
+        with open(sanitized_path(self.file_path), 'rb') as f:
+            if self.use_mmap and self.file_path.stat().st_size > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    total_lines = self._parse_buffer(mm)
+            else:
+                total_lines = self._parse_buffer(f.read())
         
         # 建立階層關係
         self._build_hierarchy()
@@ -53,57 +107,79 @@ class VerilogSkeletonGenerator:
             "modules": self.modules
         }
         
+        self.peak_memory_mb = peak_memory_mb()
         print(f"[INFO] 找到 {len(self.modules)} 個模組")
         return skeleton
     
-    def _extract_defines(self, content: str):
+    def _parse_buffer(self, buf) -> int:
+        """解析淨化後的 bytes 或 mmap 內容,回傳總行數"""
+        # 提取全域定義
+        self._extract_defines(buf)
+        self._extract_includes(buf)
+        
+        # 提取所有模組
+        self._extract_modules(buf)
+        
+        return _count_newlines(buf, 0, len(buf)) + 1
+    
+    def _extract_defines(self, buf):
         """提取 `define 宏定義"""
-        pattern = r'`define\s+(\w+)'
-        self.global_defines = list(set(re.findall(pattern, content)))
+        pattern = re.compile(rb'`define\s+(\w+)')
+        self.global_defines = list({_decode(m.group(1)) for m in pattern.finditer(buf)})
     
-    def _extract_includes(self, content: str):
+    def _extract_includes(self, buf):
         """提取 `include 檔案"""
-        pattern = r'`include\s+"([^"]+)"'
-        self.includes = list(set(re.findall(pattern, content)))
+        pattern = re.compile(rb'`include\s+"([^"]+)"')
+        self.includes = list({_decode(m.group(1)) for m in pattern.finditer(buf)})
     
-    def _extract_modules(self, content: str):
-        """提取所有 module 定義及其元數據"""
+    def _extract_modules(self, buf):
+        """
+        提取所有 module 定義及其元數據
+        
+        單次前向掃描: 行號由游標遞增計算,endmodule 從模組起點往後搜尋,
+        整體為 O(N) 而非 O(N·M)。
+        """
         # 正則: 捕獲 module 名稱與參數列表
         module_pattern = re.compile(
-            r'^\s*module\s+(\w+)\s*(?:#\s*\([^)]*\))?\s*\((.*?)\);',
+            rb'^[ \t]*module\s+(\w+)\s*(?:#\s*\([^)]*\))?\s*\((.*?)\);',
             re.MULTILINE | re.DOTALL
         )
+        endmodule_pattern = re.compile(rb'\bendmodule\b')
         
-        lines = content.split('\n')
+        cursor = _LineCursor(buf)
         
-        for match in module_pattern.finditer(content):
-            module_name = match.group(1)
-            port_section = match.group(2)
+        for match in module_pattern.finditer(buf):
+            module_name = _decode(match.group(1))
+            port_section = _decode(match.group(2))
             start_pos = match.start()
             
             # 計算起始行號
-            start_line = content[:start_pos].count('\n') + 1
+            start_line = cursor.line_at(start_pos)
             
             # 尋找對應的 endmodule(簡化版,假設格式規範)
-            end_match = re.search(
-                r'\bendmodule\b',
-                content[start_pos:]
-            )
-            end_line = start_line + content[start_pos:start_pos + end_match.end()].count('\n') if end_match else start_line + 100
+            end_match = endmodule_pattern.search(buf, start_pos)
+            if end_match:
+                end_pos = end_match.end()
+                end_line = cursor.line_at(end_pos)
+            else:
+                end_pos = start_pos + 1000
+                end_line = start_line + 100
             
             # 解析端口
             ports = self._parse_ports(port_section)
             
-            # 提取實例化的子模組
-            module_content = content[start_pos:start_pos + (end_match.end() if end_match else 1000)]
-            instances = self._extract_instances(module_content)
+            # 提取實例化的子模組(一次只保留一個模組的內容)
+            module_content = _decode(buf[start_pos:end_pos])
+            instance_counts = self._count_instances(module_content)
             
             self.modules.append({
                 "name": module_name,
                 "line_range": [start_line, end_line],
                 "ports": ports,
-                "instances": instances,
+                "instances": list(instance_counts),
+                "instance_counts": instance_counts,
                 "parent": None,  # 後續填入
+                "parents": [],
                 "depth": 0        # 後續計算
             })
     
@@ -123,67 +199,151 @@ class VerilogSkeletonGenerator:
         return ports
     
     def _extract_instances(self, module_content: str) -> List[str]:
-        """提取模組內實例化的子模組名稱"""
+        """提取模組內實例化的子模組名稱(去重,依首次出現順序)"""
+        return list(self._count_instances(module_content))
+    
+    def _count_instances(self, module_content: str) -> Dict[str, int]:
+        """統計模組內每種子模組被實例化的次數,依首次出現順序"""
         # 正則: 捕獲 module_name instance_name (...)
         instance_pattern = r'\b(\w+)\s+(?:#\s*\([^)]*\)\s*)?(\w+)\s*\('
         
-        instances = []
+        counts = Counter()
         for match in re.finditer(instance_pattern, module_content):
             module_type = match.group(1)
             # 排除 Verilog 關鍵字
-            if module_type not in ['input', 'output', 'inout', 'wire', 'reg', 'assign', 
+            if module_type not in ['module', 'input', 'output', 'inout', 'wire', 'reg', 'assign',
                                    'always', 'initial', 'begin', 'end', 'if', 'else', 'case']:
-                instances.append(module_type)
+                counts[module_type] += 1
         
-        return list(set(instances))  # 去重
+        return dict(counts)
     
     def _build_hierarchy(self):
-        """建立階層關係(根據實例化推斷父子關係)"""
-        module_dict = {m['name']: m for m in self.modules}
+        """
+        建立實例化 DAG 並計算深度,無循環時為 O(V+E)
         
-        # 建立子模組到父模組的映射
-        child_to_parent = {}
+        - parents: 所有實例化此模組的模組(依輸出順序);parent 為其中第一個,保留相容
+        - depth: 以 Kahn 拓撲順序計算的最長路徑深度,頂層為 0,
+          因此每個模組的深度都大於它的任何父模組
+        - 遞迴實例化形成的循環: 拓撲排序卡住時沿未處理的父模組回溯找到循環上的模組,
+          以它為起點繼續,回邊不參與深度計算
+        """
+        # 同名模組重複定義時共用同一個節點
+        names = list(dict.fromkeys(m['name'] for m in self.modules))
+        children = {name: {} for name in names}
         for module in self.modules:
-            for instance in module['instances']:
-                if instance in module_dict:
-                    child_to_parent[instance] = module['name']
-        
-        # 計算深度並填入父模組
-        def calc_depth(mod_name, visited=set()):
-            if mod_name in visited:
-                return 0  # 避免循環
-            visited.add(mod_name)
-            
-            parent = child_to_parent.get(mod_name)
-            if not parent:
-                return 0  # 頂層模組
-            
-            return 1 + calc_depth(parent, visited)
+            edges = children[module['name']]
+            for child, count in module['instance_counts'].items():
+                if child in children and child != module['name']:
+                    edges[child] = edges.get(child, 0) + count
+        
+        reverse = {name: [] for name in names}
+        for parent, edges in children.items():
+            for child in edges:
+                reverse[child].append(parent)
+        indegree = {name: len(reverse[name]) for name in names}
+        
+        depth = {name: 0 for name in names}
+        done = set()
+        queue = deque(name for name in names if indegree[name] == 0)
+        next_seed = 0
+        cycle_seeds = []
+        while len(done) < len(names):
+            if not queue:
+                # 剩下的模組都在循環上或位於循環之下: 沿尚未處理的父模組回溯,
+                # 第一個重複經過的模組必在循環上
+                while names[next_seed] in done:
+                    next_seed += 1
+                seed = names[next_seed]
+                walked = set()
+                while seed not in walked:
+                    walked.add(seed)
+                    seed = next(p for p in reverse[seed] if p not in done)
+                queue.append(seed)
+                cycle_seeds.append(seed)
+            name = queue.popleft()
+            if name in done:
+                continue
+            done.add(name)
+            for child in children[name]:
+                if child in done:
+                    continue  # 回邊
+                depth[child] = max(depth[child], depth[name] + 1)
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    queue.append(child)
+        
+        if cycle_seeds:
+            print(f"[WARN] 偵測到遞迴實例化循環,於下列模組打破: {', '.join(cycle_seeds)}")
         
         for module in self.modules:
-            module['parent'] = child_to_parent.get(module['name'])
-            module['depth'] = calc_depth(module['name'])
+            module['depth'] = depth[module['name']]
         
         # 排序: 深度由淺到深
         self.modules.sort(key=lambda x: x['depth'])
+        
+        parents = {name: [] for name in names}
+        for parent in dict.fromkeys(m['name'] for m in self.modules):
+            for child in children[parent]:
+                parents[child].append(parent)
+        for module in self.modules:
+            module['parents'] = parents[module['name']]
+            module['parent'] = module['parents'][0] if module['parents'] else None
+    
+    def subtree(self, root: str) -> List[str]:
+        """root 及其下所有模組,需先呼叫 parse()"""
+        return subtree_modules(self.modules, root)
+
+
+def subtree_modules(modules: List[Dict[str, Any]], root: str) -> List[str]:
+    """
+    回傳 root 及其下所有被實例化的模組名稱(廣度優先,每個模組只出現一次)
+    
+    modules 為骨架的 modules 列表;root 不存在時回傳空列表。
+    """
+    children = {}
+    for module in modules:
+        children.setdefault(module['name'], []).extend(module['instances'])
+    if root not in children:
+        return []
+    
+    seen = {root}
+    order = [root]
+    queue = deque([root])
+    while queue:
+        for child in children[queue.popleft()]:
+            if child in children and child not in seen:
+                seen.add(child)
+                order.append(child)
+                queue.append(child)
+    return order
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("用法: python generate_skeleton.py <verilog_file> [output_json]")
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    use_mmap = '--mmap' in sys.argv[1:]
+    
+    if len(args) < 1:
+        print("用法: python generate_skeleton.py <verilog_file> [output_json|output_db] [--mmap]")
         print("範例: python generate_skeleton.py soc_top.v skeleton.json")
+        print("      python generate_skeleton.py soc_top.v skeleton.db")
+        print("      --mmap  以記憶體映射方式解析,適用於數百 MB 以上的檔案")
+        print("      輸出副檔名為 .db / .sqlite 時寫入 SQLite 骨架(可用 skeleton_db.py 查詢或匯出 JSON)")
         sys.exit(1)
     
-    verilog_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else "skeleton.json"
+    verilog_file = args[0]
+    output_file = args[1] if len(args) > 1 else "skeleton.json"
     
     # 解析並產生骨架
-    generator = VerilogSkeletonGenerator(verilog_file)
+    generator = VerilogSkeletonGenerator(verilog_file, use_mmap=use_mmap)
     skeleton = generator.parse()
     
-    # 輸出 JSON
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(skeleton, f, indent=2, ensure_ascii=False)
+    if is_db_path(output_file):
+        # 輸出 SQLite,查詢時不需載入整份階層
+        write_skeleton_db(skeleton, output_file)
+    else:
+        # 輸出 JSON
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(skeleton, f, indent=2, ensure_ascii=False)
     
     print(f"[SUCCESS] 階層地圖已儲存至: {output_file}")
     
@@ -194,10 +354,17 @@ def main():
     print(f"模組數量: {skeleton['file_info']['total_modules']}")
     print(f"全域定義: {len(skeleton['global_defines'])} 個")
     print(f"Include 檔案: {len(skeleton['includes'])} 個")
+    if generator.peak_memory_mb is not None:
+        print(f"峰值記憶體: {generator.peak_memory_mb} MB")
     
     # 顯示頂層模組
     top_modules = [m['name'] for m in skeleton['modules'] if m['depth'] == 0]
     print(f"頂層模組: {', '.join(top_modules)}")
+    if skeleton['modules']:
+        print(f"最大深度: {max(m['depth'] for m in skeleton['modules'])}")
+    shared = [m['name'] for m in skeleton['modules'] if len(m['parents']) > 1]
+    if shared:
+        print(f"被多個父模組實例化: {len(shared)} 個模組")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Verilog Line Range Reader
+以行偏移索引精確讀取指定行範圍的原始碼
+
+用途: 第一次讀取時在 .v 檔旁建立 .lidx 索引檔(每 N 行記錄一次位元組偏移),
+之後任何行範圍都只需 mmap 切片,不必讀取整個檔案。
+原始檔的大小或修改時間改變時索引會自動重建。
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from pathlib import Path
+from typing import Optional
+
+
+INDEX_SUFFIX = '.lidx'
+INDEX_MAGIC = b'VLIDX001'
+# magic, 原始檔大小, 原始檔 mtime_ns, stride, 總行數
+HEADER = struct.Struct('<8sQqQQ')
+DEFAULT_STRIDE = 64
+_BUILD_BLOCK = 16 * 1024 * 1024
+
+
+class LineIndex:
+    """行偏移索引: 記錄第 1, 1+N, 1+2N ... 行的起始位元組偏移"""
+
+    def __init__(self, source: Path, stride: int, num_lines: int, offsets, index_mm=None):
+        self.source = source
+        self.stride = stride
+        self.num_lines = num_lines
+        self.offsets = offsets
+        # 從 .lidx 載入時 offsets 為 index_mm 上的 memoryview,close() 時一併釋放
+        self._index_mm = index_mm
+        self._file = None
+        self._mm = None
+
+    @classmethod
+    def index_path(cls, verilog_file) -> Path:
+        path = Path(verilog_file)
+        return path.with_name(path.name + INDEX_SUFFIX)
+
+    @classmethod
+    def open(cls, verilog_file, stride: int = DEFAULT_STRIDE) -> 'LineIndex':
+        """開啟索引,不存在或已過期時重新建立"""
+        source = Path(verilog_file)
+        index = cls._load(source)
+        if index is None:
+            index = cls.build(source, stride)
+        return index
+
+    @classmethod
+    def _load(cls, source: Path) -> Optional['LineIndex']:
+        index_file = cls.index_path(source)
+        if not index_file.exists():
+            return None
+
+        stat = source.stat()
+        with open(index_file, 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return None
+            magic, size, mtime_ns, stride, num_lines = HEADER.unpack(header)
+            if magic != INDEX_MAGIC or size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+                return None
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        offsets = memoryview(mm)[HEADER.size:].cast('Q')
+        return cls(source, stride, num_lines, offsets, mm)
+
+    @classmethod
+    def build(cls, verilog_file, stride: int = DEFAULT_STRIDE) -> 'LineIndex':
+        """掃描一次原始檔建立索引,並嘗試寫入旁邊的 .lidx 檔"""
+        source = Path(verilog_file)
+        stat = source.stat()
+        print(f"[INFO] 建立行索引: {source}", file=sys.stderr)
+
+        offsets = array('Q', [0])
+        newlines = 0
+        base = 0
+        last_byte = b''
+        with open(source, 'rb') as f:
+            while True:
+                block = f.read(_BUILD_BLOCK)
+                if not block:
+                    break
+                # 區塊中每個換行之後的位置,即下一行的起始偏移
+                line_starts = list(accumulate(len(piece) + 1 for piece in block.split(b'\n')[:-1]))
+                # 第 newlines + 2 行起算,挑出行號 ≡ 1 (mod stride) 者
+                first = (-(newlines + 1)) % stride
+                offsets.extend(base + pos for pos in line_starts[first::stride])
+                newlines += len(line_starts)
+                base += len(block)
+                last_byte = block[-1:]
+
+        # 與 readlines() 的行數一致: 檔尾沒有換行時最後一行也算一行
+        num_lines = newlines + (1 if last_byte and last_byte != b'\n' else 0)
+
+        index_file = cls.index_path(source)
+        tmp_file = index_file.with_name(index_file.name + '.tmp')
+        try:
+            with open(tmp_file, 'wb') as f:
+                f.write(HEADER.pack(INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, stride, num_lines))
+                offsets.tofile(f)
+            os.replace(tmp_file, index_file)
+        except OSError as e:
+            # 目錄不可寫入時仍可使用記憶體中的索引
+            print(f"[WARN] 無法寫入索引檔 {index_file}: {e}", file=sys.stderr)
+
+        return cls(source, stride, num_lines, offsets)
+
+    def _source_map(self):
+        if self._mm is None:
+            self._file = open(self.source, 'rb')
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mm
+
+    def line_offset(self, line: int) -> int:
+        """回傳第 line 行(1-based)的起始位元組偏移,超過檔尾時回傳檔案大小"""
+        mm = self._source_map()
+        if line > self.num_lines:
+            return len(mm)
+        slot, skip = divmod(line - 1, self.stride)
+        pos = self.offsets[slot]
+        for _ in range(skip):
+            pos = mm.find(b'\n', pos) + 1
+        return pos
+
+    def read(self, start: int, end: int) -> str:
+        """讀取第 start 到 end 行(含),行號從 1 開始"""
+        start = max(start, 1)
+        if self.num_lines == 0 or end < start or start > self.num_lines:
+            return ''
+        mm = self._source_map()
+        begin = self.line_offset(start)
+        stop = self.line_offset(min(end, self.num_lines) + 1)
+        return mm[begin:stop].decode('utf-8', errors='ignore').replace('\r\n', '\n')
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+            self._file = None
+        if self._index_mm is not None:
+            # memoryview 持有 mmap 的參照,須先釋放才能關閉映射
+            self.offsets.release()
+            self.offsets = None
+            self._index_mm.close()
+            self._index_mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_line_range(file_path: str, start: int, end: int) -> str:
+    """精確讀取指定行範圍的原始碼"""
+    with LineIndex.open(file_path) as index:
+        return index.read(start, end)
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("用法: python read_line_range.py <verilog_file> <start> [end]")
+        print("      python read_line_range.py <verilog_file> --build [stride]")
+        print("範例: python read_line_range.py soc_top.v 45000 45200")
+        sys.exit(1)
+
+    verilog_file = sys.argv[1]
+
+    if sys.argv[2] == '--build':
+        stride = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_STRIDE
+        index = LineIndex.build(verilog_file, stride)
+        print(f"[SUCCESS] 行索引已儲存至: {LineIndex.index_path(verilog_file)}")
+        print(f"總行數: {index.num_lines}")
+        return
+
+    start = int(sys.argv[2])
+    end = int(sys.argv[3]) if len(sys.argv) > 3 else start
+    sys.stdout.write(read_line_range(verilog_file, start, end))
+
+
+if __name__ == "__main__":
+    main()
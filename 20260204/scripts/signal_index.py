@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Verilog Signal Index
+trace_signal.py 的持久化信號倒排索引
+
+用途: 對同一份大型網表反覆追蹤信號時,不必每次全檔掃描。
+建立一次 .sidx 索引檔(在 .v 檔旁),記錄淨化鏡像中每個識別字出現的
+(行號, 分類) 與模組切換的行號表;查詢時以 mmap 讀取,只需毫秒等級。
+
+查詢語義與全檔掃描相同(子字串比對,`signal in line`):
+- 與某個識別字完全相同: 直接使用建立索引時算好的分類
+- 只是其他識別字的一部分: 從詞彙表找出包含它的識別字,讀回那些行重新分類
+- 含非識別字字元、可能出現在數字開頭的字組(如 10ns)之中,
+  或需要重新分類的行太多時: 回傳 None,由呼叫端改用全檔掃描
+原始檔的大小或修改時間改變、或分類規則改變時,索引視為過期。
+"""
+
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+INDEX_SUFFIX = '.sidx'
+INDEX_MAGIC = b'VSIDX001'
+# 區段依序為: meta JSON、詞彙、詞彙偏移、倒排偏移、倒排行號、倒排分類、
+# 模組切換行號、模組切換編號、數字開頭字組、每行起始偏移(最後一筆為檔案大小)
+SECTIONS = ('meta', 'vocab', 'vocab_offsets', 'posting_offsets', 'posting_lines',
+            'posting_types', 'module_lines', 'module_ids', 'numeric', 'line_offsets')
+# magic, 原始檔大小, 原始檔 mtime_ns, 總行數, 每個區段的 (偏移, 長度)
+HEADER = struct.Struct('<8sQqQ' + 'QQ' * len(SECTIONS))
+# 只以其他識別字子字串出現的行超過總行數的此比例時,全檔掃描反而較快
+MAX_RECLASSIFY_RATIO = 0.1
+
+WORD_PATTERN = re.compile(r'[A-Za-z0-9_]+')
+
+
+def classifier_fingerprint(signal_types: Dict[str, str]) -> str:
+    """分類規則的指紋,規則改變時舊索引失效"""
+    return hashlib.sha256(json.dumps(signal_types, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+# 單行分類器所實作的規則;tracer 的 SIGNAL_TYPES 與此不同時建立索引改逐字分類
+_LINE_CLASSIFIER_RULES = {
+    'input': r'^\s*input\s+.*\b{signal}\b',
+    'output': r'^\s*output\s+.*\b{signal}\b',
+    'inout': r'^\s*inout\s+.*\b{signal}\b',
+    'wire': r'^\s*wire\s+.*\b{signal}\b',
+    'reg': r'^\s*reg\s+.*\b{signal}\b',
+    'assign': r'^\s*assign\s+{signal}\s*=',
+    'always_lhs': r'^\s*{signal}\s*<=|^\s*{signal}\s*=',
+    'always_rhs': r'[^a-zA-Z_]{signal}\b(?!\s*[<=])',
+    'instance_port': r'\.\s*{signal}\s*\(',
+}
+_DECL_PREFIX = re.compile(r'\s*(input|output|inout|wire|reg)\s')
+_ASSIGN_TARGET = re.compile(r'\s*assign\s+(\w+)\s*=')
+_LHS_TARGET = re.compile(r'\s*(\w+)\s*<?=')
+_RUN = re.compile(r'\w+')
+_WRITE_AHEAD = re.compile(r'\s*[<=]')
+_PORT_TARGET = re.compile(r'\.\s*(\w+)\s*\(')
+
+
+def _classify_line(line: str) -> Dict[str, str]:
+    """
+    一次算出 ASCII 行中各識別字的分類,結果與逐字套用 _LINE_CLASSIFIER_RULES 相同
+
+    逐字分類每個識別字都要編譯一次正則,建立索引時詞彙動輒數萬個;
+    這裡依規則順序以 setdefault 保留第一個命中的型別,未出現者即為 reference。
+    """
+    kinds = {}
+    decl = _DECL_PREFIX.match(line)
+    if decl:
+        # `\b{signal}\b` 只比對完整字組,且須在關鍵字後至少一個空白之後
+        for run in _RUN.finditer(line, decl.end()):
+            kinds.setdefault(run.group(), decl.group(1))
+    target = _ASSIGN_TARGET.match(line)
+    if target:
+        kinds.setdefault(target.group(1), 'assign')
+    target = _LHS_TARGET.match(line)
+    if target:
+        kinds.setdefault(target.group(1), 'always_lhs')
+    for run in _RUN.finditer(line):
+        start, end = run.span()
+        if _WRITE_AHEAD.match(line, end):
+            continue
+        # 前一字元不是字母或底線: 完整字組(非行首),或緊接在數字之後的字尾
+        if start > 0:
+            kinds.setdefault(run.group(), 'always_rhs')
+        for pos in range(start + 1, end):
+            if line[pos - 1].isdigit():
+                kinds.setdefault(line[pos:end], 'always_rhs')
+    for target in _PORT_TARGET.finditer(line):
+        kinds.setdefault(target.group(1), 'instance_port')
+    return kinds
+
+
+def _iter_code_lines(code_path: str, start: int, end: int):
+    """以二進位讀取 [start, end) 區段的每一行,產生 (起始偏移, 行),解碼方式與 trace_signal 相同"""
+    with open(code_path, 'rb') as f:
+        f.seek(start)
+        pos = start
+        while pos < end:
+            raw = f.readline()
+            if not raw:
+                break
+            line = raw.decode('utf-8', errors='ignore')
+            if line.endswith('\r\n'):
+                line = line[:-2] + '\n'
+            yield pos, line
+            pos += len(raw)
+
+
+def _index_range(task):
+    """
+    行程池工作函數: 為一段淨化行建立倒排資料
+
+    回傳 (postings, numeric, transitions, line_starts): postings 為 {識別字: (行號, 分類編號)},
+    numeric 為數字開頭字組,transitions 為 [(行號, 模組名稱)],line_starts 為各行起始偏移。
+    """
+    tracer_cls, path, code_path, start, end, first_line, types, module_pattern = task
+    tracer = tracer_cls(path)
+    line_rules = tracer_cls.SIGNAL_TYPES == _LINE_CLASSIFIER_RULES
+    type_ids = {name: i for i, name in enumerate(types)}
+    reference = type_ids['reference']
+    postings = {}
+    numeric = set()
+    transitions = []
+    line_starts = array('Q')
+
+    for line_num, (offset, line) in enumerate(_iter_code_lines(code_path, start, end), start=first_line):
+        line_starts.append(offset)
+        if 'module' in line:
+            module_match = module_pattern.match(line)
+            if module_match:
+                transitions.append((line_num, module_match.group(1)))
+        words = set(WORD_PATTERN.findall(line))
+        if not words:
+            continue
+        # 非 ASCII 行的 \w 與 \b 含 Unicode 字元,改用 tracer 逐字分類
+        kinds = _classify_line(line) if line_rules and line.isascii() else None
+        for word in words:
+            if word[0].isdigit():
+                numeric.add(word)
+                continue
+            entry = postings.get(word)
+            if entry is None:
+                entry = postings[word] = (array('I'), bytearray())
+            entry[0].append(line_num)
+            if kinds is None:
+                entry[1].append(type_ids[tracer._classify_signal(line, word)])
+            else:
+                entry[1].append(type_ids.get(kinds.get(word), reference))
+    return postings, numeric, transitions, line_starts
+
+
+def _count_newlines(path: Path, boundaries: List[int]) -> List[int]:
+    """回傳每個位元組邊界之前的換行數"""
+    counts = []
+    total = 0
+    pos = 0
+    with open(path, 'rb') as f:
+        for boundary in boundaries:
+            while pos < boundary:
+                block = f.read(min(16 * 1024 * 1024, boundary - pos))
+                if not block:
+                    break
+                total += block.count(b'\n')
+                pos += len(block)
+            counts.append(total)
+    return counts
+
+
+class SignalIndex:
+    """mmap 載入的信號倒排索引"""
+
+    def __init__(self, source: Path, mm, fields):
+        self.source = source
+        self.num_lines = fields[3]
+        self._mm = mm
+        self._spans = {}
+        self._views = []
+        for i, name in enumerate(SECTIONS):
+            offset, length = fields[4 + 2 * i], fields[5 + 2 * i]
+            self._spans[name] = (offset, offset + length)
+
+        meta = json.loads(mm[slice(*self._spans['meta'])])
+        self.types = meta['types']
+        self.fingerprint = meta['fingerprint']
+        self.modules = meta['modules']
+        self.vocab_offsets = self._view('vocab_offsets', 'Q')
+        self.posting_offsets = self._view('posting_offsets', 'Q')
+        self.posting_lines = self._view('posting_lines', 'I')
+        self.posting_types = self._view('posting_types', 'B')
+        self.module_lines = self._view('module_lines', 'I')
+        self.module_ids = self._view('module_ids', 'I')
+        self.line_offsets = self._view('line_offsets', 'Q')
+        self._maps = {}
+
+    def _view(self, name: str, fmt: str) -> memoryview:
+        # memoryview 持有 mmap 的參照,close() 時先釋放才能關閉映射
+        view = memoryview(self._mm)[slice(*self._spans[name])].cast(fmt)
+        self._views.append(view)
+        return view
+
+    @classmethod
+    def index_path(cls, verilog_file) -> Path:
+        path = Path(verilog_file)
+        return path.with_name(path.name + INDEX_SUFFIX)
+
+    @classmethod
+    def open(cls, verilog_file, fingerprint: str) -> Optional['SignalIndex']:
+        """載入索引;不存在、已過期或分類規則不同時回傳 None"""
+        source = Path(verilog_file)
+        index_file = cls.index_path(source)
+        if not index_file.exists():
+            return None
+
+        stat = source.stat()
+        with open(index_file, 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return None
+            fields = HEADER.unpack(header)
+            magic, size, mtime_ns = fields[:3]
+            if magic != INDEX_MAGIC or size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+                return None
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        index = cls(source, mm, fields)
+        if index.fingerprint != fingerprint:
+            index.close()
+            return None
+        return index
+
+    @classmethod
+    def build(cls, verilog_file, code_path, tracer_cls, module_pattern, jobs: int = 1) -> Path:
+        """
+        掃描淨化鏡像建立索引檔,回傳索引路徑
+
+        tracer_cls 提供分類函數(_classify_signal)與分類規則(SIGNAL_TYPES);
+        jobs > 1 時以對齊行首的位元組區段平行建立,再依區段順序合併。
+        """
+        from trace_signal import _split_ranges
+
+        source = Path(verilog_file)
+        code_path = Path(code_path)
+        stat = source.stat()
+        print(f"[INFO] 建立信號索引: {source}", file=sys.stderr)
+
+        types = list(tracer_cls.SIGNAL_TYPES) + ['reference']
+        ranges = _split_ranges(source, jobs * 4) if jobs > 1 else [(0, stat.st_size)]
+        # 各區段起始行號 = 區段前的換行數 + 1
+        newlines = _count_newlines(code_path, [start for start, _ in ranges])
+        tasks = [(tracer_cls, str(source), str(code_path), start, end, newlines[i] + 1,
+                  types, module_pattern)
+                 for i, (start, end) in enumerate(ranges)]
+        if jobs > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                parts = list(pool.map(_index_range, tasks))
+        else:
+            parts = [_index_range(task) for task in tasks]
+
+        # 各區段行號遞增,依序串接後倒排列表仍為遞增
+        postings = {}
+        numeric = set()
+        transitions = []
+        line_offsets = array('Q')
+        for part_postings, part_numeric, part_transitions, part_line_starts in parts:
+            for word, (lines, kinds) in part_postings.items():
+                entry = postings.get(word)
+                if entry is None:
+                    postings[word] = (lines, kinds)
+                else:
+                    entry[0].extend(lines)
+                    entry[1].extend(kinds)
+            numeric.update(part_numeric)
+            transitions.extend(part_transitions)
+            line_offsets.extend(part_line_starts)
+        line_offsets.append(stat.st_size)
+
+        vocab = bytearray()
+        vocab_offsets = array('Q')
+        posting_offsets = array('Q', [0])
+        posting_lines = array('I')
+        posting_types = bytearray()
+        for word in sorted(postings):
+            vocab_offsets.append(len(vocab))
+            # 每個字後接換行,子字串搜尋不會跨越兩個字
+            vocab += word.encode('ascii') + b'\n'
+            lines, kinds = postings[word]
+            posting_lines.extend(lines)
+            posting_types += kinds
+            posting_offsets.append(len(posting_lines))
+        vocab_offsets.append(len(vocab))
+
+        module_names = list(dict.fromkeys(name for _, name in transitions))
+        module_ids = {name: i for i, name in enumerate(module_names)}
+        meta = {
+            "types": types,
+            "fingerprint": classifier_fingerprint(tracer_cls.SIGNAL_TYPES),
+            "modules": module_names,
+        }
+        # 與 readlines() 的行數一致: 檔尾沒有換行時最後一行也算一行
+        num_lines = len(line_offsets) - 1
+
+        payloads = {
+            'meta': json.dumps(meta, ensure_ascii=False).encode('utf-8'),
+            'vocab': bytes(vocab),
+            'vocab_offsets': vocab_offsets.tobytes(),
+            'posting_offsets': posting_offsets.tobytes(),
+            'posting_lines': posting_lines.tobytes(),
+            'posting_types': bytes(posting_types),
+            'module_lines': array('I', (line for line, _ in transitions)).tobytes(),
+            'module_ids': array('I', (module_ids[name] for _, name in transitions)).tobytes(),
+            'numeric': ''.join(word + '\n' for word in sorted(numeric)).encode('ascii'),
+            'line_offsets': line_offsets.tobytes(),
+        }
+
+        # 各區段對齊 8 位元組,載入時可直接以 memoryview.cast 使用
+        layout = []
+        offset = HEADER.size
+        for name in SECTIONS:
+            offset = (offset + 7) // 8 * 8
+            layout.extend([offset, len(payloads[name])])
+            offset += len(payloads[name])
+
+        index_file = cls.index_path(source)
+        tmp_file = index_file.with_name(index_file.name + '.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(HEADER.pack(INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, num_lines, *layout))
+            for i, name in enumerate(SECTIONS):
+                f.write(b'\0' * (layout[2 * i] - f.tell()))
+                f.write(payloads[name])
+        os.replace(tmp_file, index_file)
+        print(f"[INFO] 索引詞彙 {len(postings)} 個, 出現 {len(posting_lines)} 筆", file=sys.stderr)
+        return index_file
+
+    def _words_containing(self, sig: bytes) -> List[int]:
+        """詞彙表中包含 sig 的所有字編號,直接在 mmap 上以 find 搜尋"""
+        vocab_start, vocab_end = self._spans['vocab']
+        word_ids = []
+        pos = self._mm.find(sig, vocab_start, vocab_end)
+        while pos >= 0:
+            word_id = bisect.bisect_right(self.vocab_offsets, pos - vocab_start) - 1
+            word_ids.append(word_id)
+            # 同一個字只算一次,從下一個字開始繼續搜尋
+            pos = self._mm.find(sig, vocab_start + self.vocab_offsets[word_id + 1], vocab_end)
+        return word_ids
+
+    def module_at(self, line: int) -> Optional[str]:
+        """第 line 行所在的模組(該行或之前最後一個 module 宣告),之前沒有則為 None"""
+        slot = bisect.bisect_right(self.module_lines, line) - 1
+        if slot < 0:
+            return None
+        return self.modules[self.module_ids[slot]]
+
+    def lookup(self, signal: str, classify: Callable, code_path) -> Optional[List[Dict]]:
+        """
+        回傳與全檔掃描相同格式的出現位置列表;無法以索引回答時回傳 None
+
+        classify(line, signal) 用於只以其他識別字子字串出現的行。
+        """
+        if not WORD_PATTERN.fullmatch(signal):
+            return None
+        sig = signal.encode('ascii')
+        if self._mm.find(sig, *self._spans['numeric']) >= 0:
+            return None
+
+        exact = None
+        longer = []
+        for word_id in self._words_containing(sig):
+            word_len = self.vocab_offsets[word_id + 1] - self.vocab_offsets[word_id] - 1
+            if word_len == len(sig):
+                exact = word_id
+            else:
+                longer.append(word_id)
+
+        found = {}
+        if exact is not None:
+            begin, end = self.posting_offsets[exact], self.posting_offsets[exact + 1]
+            for line, kind in zip(self.posting_lines[begin:end], self.posting_types[begin:end]):
+                found[line] = self.types[kind]
+        substring_lines = set()
+        for word_id in longer:
+            begin, end = self.posting_offsets[word_id], self.posting_offsets[word_id + 1]
+            substring_lines.update(self.posting_lines[begin:end])
+        substring_lines.difference_update(found)
+        if len(substring_lines) > self.num_lines * MAX_RECLASSIFY_RATIO:
+            return None
+
+        for line in substring_lines:
+            found[line] = classify(self._read_line(code_path, line), signal)
+
+        occurrences = []
+        slot = -1
+        module = None
+        for line in sorted(found):
+            # 行號遞增,模組切換表只需往前走
+            while slot + 1 < len(self.module_lines) and self.module_lines[slot + 1] <= line:
+                slot += 1
+                module = self.modules[self.module_ids[slot]]
+            occurrences.append({
+                "line": line,
+                "type": found[line],
+                "module": module,
+                "context": self._read_line(self.source, line).strip()
+            })
+        return occurrences
+
+    def _read_line(self, path, line: int) -> str:
+        """讀取原始檔或淨化鏡像的第 line 行(兩者換行位置相同,共用行偏移)"""
+        mm = self._maps.get(path)
+        if mm is None:
+            with open(path, 'rb') as f:
+                mm = self._maps[path] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        raw = mm[self.line_offsets[line - 1]:self.line_offsets[line]]
+        return raw.decode('utf-8', errors='ignore').replace('\r\n', '\n')
+
+    def close(self):
+        for mm in self._maps.values():
+            mm.close()
+        self._maps = {}
+        for view in self._views:
+            view.release()
+        self._views = []
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
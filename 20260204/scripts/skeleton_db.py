@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Verilog Skeleton Database
+以 SQLite 儲存階層地圖,並提供按需查詢的延遲載入讀取器
+
+用途: 大型設計的 skeleton.json 動輒數百 MB,每次查詢都得整份 json.load。
+改存成 SQLite 後,模組名稱、父模組、深度與實例化子模組皆有索引,
+查詢單一模組的端口 / 實例 / 行號範圍只需讀取相關的幾個頁面。
+需要 JSON 時可隨時匯出,格式與 generate_skeleton.py 的 JSON 輸出相同。
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+SCHEMA_VERSION = 2
+DB_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+SCHEMA = """
+CREATE TABLE file_info (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE defines (name TEXT PRIMARY KEY);
+CREATE TABLE includes (path TEXT PRIMARY KEY);
+CREATE TABLE modules (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    start_line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL,
+    parent TEXT,
+    depth INTEGER NOT NULL,
+    ports TEXT NOT NULL,
+    parents TEXT NOT NULL
+);
+CREATE TABLE instances (
+    module_id INTEGER NOT NULL,
+    pos INTEGER NOT NULL,
+    child TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (module_id, pos)
+) WITHOUT ROWID;
+CREATE INDEX modules_name ON modules (name);
+CREATE INDEX modules_parent ON modules (parent);
+CREATE INDEX modules_depth ON modules (depth);
+CREATE INDEX instances_child ON instances (child);
+"""
+
+
+def is_db_path(path) -> bool:
+    """依副檔名判斷輸出是否為 SQLite 骨架"""
+    return Path(path).suffix.lower() in DB_SUFFIXES
+
+
+def write_skeleton_db(skeleton: Dict[str, Any], db_path) -> None:
+    """
+    將 generate_skeleton 產生的骨架寫入 SQLite
+
+    先寫入暫存檔再以 os.replace 取代,讀取中的舊資料庫不會看到半成品。
+    """
+    db_path = Path(db_path)
+    tmp_path = db_path.with_name(db_path.name + '.tmp')
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    conn = sqlite3.connect(str(tmp_path))
+    try:
+        # 一次性批次寫入,不需要日誌與逐筆同步
+        conn.execute('PRAGMA journal_mode = OFF')
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.executescript(SCHEMA)
+        with conn:
+            info = dict(skeleton['file_info'], schema_version=SCHEMA_VERSION)
+            conn.executemany('INSERT INTO file_info VALUES (?, ?)',
+                             ((key, json.dumps(value)) for key, value in info.items()))
+            conn.executemany('INSERT OR IGNORE INTO defines VALUES (?)',
+                             ((name,) for name in skeleton['global_defines']))
+            conn.executemany('INSERT OR IGNORE INTO includes VALUES (?)',
+                             ((path,) for path in skeleton['includes']))
+            for module_id, module in enumerate(skeleton['modules'], start=1):
+                start_line, end_line = module['line_range']
+                # 端口與父模組列表只會整組讀取,以緊湊 JSON 存在模組列中
+                conn.execute('INSERT INTO modules VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                             (module_id, module['name'], start_line, end_line,
+                              module.get('parent'), module.get('depth', 0),
+                              json.dumps(module['ports'], separators=(',', ':')),
+                              json.dumps(module.get('parents', []), separators=(',', ':'))))
+                counts = module.get('instance_counts', {})
+                conn.executemany('INSERT INTO instances VALUES (?, ?, ?, ?)',
+                                 ((module_id, pos, child, counts.get(child, 1))
+                                  for pos, child in enumerate(module['instances'])))
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+
+
+class SkeletonDB:
+    """
+    SQLite 骨架的唯讀查詢介面
+
+    每個方法只查詢所需的列,不會載入整份階層。
+    模組以 generate_skeleton 的 JSON 格式回傳(name / line_range / ports /
+    instances / parent / depth)。同名模組重複定義時,module() 回傳第一個。
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        if not self.db_path.exists():
+            raise FileNotFoundError(f"找不到骨架資料庫: {self.db_path}")
+        self.conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def file_info(self) -> Dict[str, Any]:
+        rows = self.conn.execute('SELECT key, value FROM file_info')
+        info = {key: json.loads(value) for key, value in rows}
+        info.pop('schema_version', None)
+        return info
+
+    def global_defines(self) -> List[str]:
+        return [name for (name,) in self.conn.execute('SELECT name FROM defines ORDER BY rowid')]
+
+    def includes(self) -> List[str]:
+        return [path for (path,) in self.conn.execute('SELECT path FROM includes ORDER BY rowid')]
+
+    def module_names(self) -> List[str]:
+        return [name for (name,) in self.conn.execute('SELECT name FROM modules ORDER BY id')]
+
+    def _module_id(self, name: str) -> Optional[int]:
+        row = self.conn.execute('SELECT id FROM modules WHERE name = ? ORDER BY id LIMIT 1',
+                                (name,)).fetchone()
+        return row[0] if row else None
+
+    def line_range(self, name: str) -> Optional[List[int]]:
+        row = self.conn.execute(
+            'SELECT start_line, end_line FROM modules WHERE name = ? ORDER BY id LIMIT 1', (name,)
+        ).fetchone()
+        return list(row) if row else None
+
+    def ports(self, name: str) -> Optional[List[str]]:
+        row = self.conn.execute('SELECT ports FROM modules WHERE name = ? ORDER BY id LIMIT 1',
+                                (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def instances(self, name: str) -> Optional[List[str]]:
+        module_id = self._module_id(name)
+        if module_id is None:
+            return None
+        return list(self._instance_counts(module_id))
+
+    def _instance_counts(self, module_id: int) -> Dict[str, int]:
+        rows = self.conn.execute('SELECT child, count FROM instances WHERE module_id = ? ORDER BY pos',
+                                 (module_id,))
+        return dict(rows.fetchall())
+
+    def _row_to_module(self, row) -> Dict[str, Any]:
+        module_id, name, start_line, end_line, parent, depth, ports, parents = row
+        instance_counts = self._instance_counts(module_id)
+        return {
+            "name": name,
+            "line_range": [start_line, end_line],
+            "ports": json.loads(ports),
+            "instances": list(instance_counts),
+            "instance_counts": instance_counts,
+            "parent": parent,
+            "parents": json.loads(parents),
+            "depth": depth
+        }
+
+    def module(self, name: str) -> Optional[Dict[str, Any]]:
+        """查詢單一模組,不存在時回傳 None"""
+        row = self.conn.execute('SELECT * FROM modules WHERE name = ? ORDER BY id LIMIT 1',
+                                (name,)).fetchone()
+        return self._row_to_module(row) if row else None
+
+    def children(self, parent: str) -> List[str]:
+        """指定模組直接實例化的已定義模組"""
+        rows = self.conn.execute(
+            'SELECT i.child FROM modules m JOIN instances i ON i.module_id = m.id '
+            'WHERE m.name = ? AND EXISTS (SELECT 1 FROM modules c WHERE c.name = i.child) '
+            'ORDER BY m.id, i.pos', (parent,)
+        )
+        return list(dict.fromkeys(child for (child,) in rows))
+
+    def instantiated_by(self, child: str) -> List[str]:
+        """實例化了指定模組的所有模組"""
+        rows = self.conn.execute(
+            'SELECT m.name FROM instances i JOIN modules m ON m.id = i.module_id '
+            'WHERE i.child = ? ORDER BY m.id', (child,)
+        )
+        return list(dict.fromkeys(name for (name,) in rows))
+
+    def subtree(self, root: str) -> List[str]:
+        """root 及其下所有被實例化的模組(遞迴 CTE,UNION 去重因此遇到循環也會終止)"""
+        rows = self.conn.execute(
+            'WITH RECURSIVE sub(name) AS ('
+            '  SELECT name FROM modules WHERE name = ?'
+            '  UNION'
+            '  SELECT i.child FROM sub'
+            '  JOIN modules m ON m.name = sub.name'
+            '  JOIN instances i ON i.module_id = m.id'
+            '  WHERE EXISTS (SELECT 1 FROM modules c WHERE c.name = i.child)'
+            ') SELECT name FROM sub', (root,)
+        )
+        return [name for (name,) in rows]
+
+    def modules_at_depth(self, depth: int) -> List[str]:
+        rows = self.conn.execute('SELECT name FROM modules WHERE depth = ? ORDER BY id', (depth,))
+        return [name for (name,) in rows]
+
+    def iter_modules(self) -> Iterator[Dict[str, Any]]:
+        """依原本順序逐一產生模組,一次只持有一個模組"""
+        for row in self.conn.execute('SELECT * FROM modules ORDER BY id'):
+            yield self._row_to_module(row)
+
+    def to_json(self) -> Dict[str, Any]:
+        """還原成 generate_skeleton 的 JSON 結構"""
+        return {
+            "file_info": self.file_info(),
+            "global_defines": self.global_defines(),
+            "includes": self.includes(),
+            "modules": list(self.iter_modules())
+        }
+
+    def export_json(self, output_file, indent: Optional[int] = 2) -> None:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_json(), f, indent=indent, ensure_ascii=False)
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("用法: python skeleton_db.py <skeleton.db> module <module_name>")
+        print("      python skeleton_db.py <skeleton.db> subtree <module_name>")
+        print("      python skeleton_db.py <skeleton.db> info")
+        print("      python skeleton_db.py <skeleton.db> export <output_json>")
+        print("      python skeleton_db.py <skeleton.json> import <output_db>")
+        print("範例: python skeleton_db.py skeleton.db module cpu_core")
+        sys.exit(1)
+
+    source, command = sys.argv[1], sys.argv[2]
+
+    if command == 'import':
+        if len(sys.argv) < 4:
+            print("[ERROR] 請指定輸出的資料庫路徑")
+            sys.exit(1)
+        with open(source, 'r', encoding='utf-8') as f:
+            skeleton = json.load(f)
+        write_skeleton_db(skeleton, sys.argv[3])
+        print(f"[SUCCESS] 骨架資料庫已儲存至: {sys.argv[3]}")
+        return
+
+    with SkeletonDB(source) as db:
+        if command == 'module' and len(sys.argv) > 3:
+            module = db.module(sys.argv[3])
+            if module is None:
+                print(f"[ERROR] 找不到模組: {sys.argv[3]}")
+                sys.exit(1)
+            print(json.dumps(module, indent=2, ensure_ascii=False))
+        elif command == 'subtree' and len(sys.argv) > 3:
+            names = db.subtree(sys.argv[3])
+            if not names:
+                print(f"[ERROR] 找不到模組: {sys.argv[3]}")
+                sys.exit(1)
+            print('\n'.join(names))
+        elif command == 'info':
+            print(json.dumps(db.file_info(), indent=2, ensure_ascii=False))
+        elif command == 'export' and len(sys.argv) > 3:
+            db.export_json(sys.argv[3])
+            print(f"[SUCCESS] 階層地圖已匯出至: {sys.argv[3]}")
+        else:
+            print(f"[ERROR] 未知的指令: {' '.join(sys.argv[2:])}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
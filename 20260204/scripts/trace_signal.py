@@ -9,9 +9,64 @@ Verilog Signal Tracer
 import re
 import sys
 import json
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Any
 
+from signal_index import SignalIndex, classifier_fingerprint
+from verilog_lexer import sanitized_path
+
+
+MODULE_PATTERN = re.compile(r'^\s*module\s+(\w+)')
+
+
+@lru_cache(maxsize=4096)
+def _compile_classifier(signal: str, signal_types: str) -> 're.Pattern':
+    """
+    將分類規則編譯成單一具名群組正則,每組規則的每個信號只編譯一次
+    
+    signal_types 為 SIGNAL_TYPES 依序的 [型別, 樣式] 列表的 JSON 字串
+    (字串的雜湊值會被快取,每次查快取不必重新雜湊整份規則)。
+    
+    每個分支都錨定在行首(未錨定的型別加上 `.*?` 前綴),
+    以 match() 依序嘗試分支,結果與逐一 re.search 取第一個命中的型別相同。
+    """
+    branches = []
+    for sig_type, pattern in json.loads(signal_types):
+        regex = pattern.format(signal=re.escape(signal))
+        if not regex.startswith('^'):
+            regex = '.*?' + regex
+        # always_lhs 含有 `|`,需以群組包住
+        branches.append(f'(?P<{sig_type}>(?:{regex}))')
+    return re.compile('|'.join(branches))
+
+
+class _SignalFinder:
+    """
+    以單一正則找出一行中包含的所有目標信號(子字串比對,與 `signal in line` 一致)
+    
+    正則以零寬度前瞻在每個位置嘗試比對,候選依長度由長到短排列,
+    因此每個位置取得最長的命中;被較長信號包含的較短信號由 contained 補上。
+    """
+    
+    def __init__(self, signals: List[str]):
+        ordered = sorted(set(signals), key=len, reverse=True)
+        self.pattern = re.compile('(?=(' + '|'.join(re.escape(s) for s in ordered) + '))')
+        self.contained = {
+            long: [short for short in ordered if short != long and short in long]
+            for long in ordered
+        }
+    
+    def find(self, line: str) -> set:
+        found = set()
+        for match in self.pattern.finditer(line):
+            hit = match.group(1)
+            if hit not in found:
+                found.add(hit)
+                found.update(self.contained[hit])
+        return found
+
 
 class VerilogSignalTracer:
     """信號追蹤與分類器"""
@@ -28,57 +83,143 @@ class VerilogSignalTracer:
         'instance_port': r'\.\s*{signal}\s*\(',                # 端口連接
     }
     
-    def __init__(self, verilog_file: str):
+    def __init__(self, verilog_file: str, jobs: int = 1, use_index: bool = True):
         self.file_path = Path(verilog_file)
+        self.jobs = jobs
+        self.use_index = use_index
+        # _compile_classifier 的快取鍵;與 .sidx 指紋同樣取自本類別的 SIGNAL_TYPES
+        self._signal_rules = json.dumps(list(self.SIGNAL_TYPES.items()))
         
     def trace(self, signal_name: str) -> Dict[str, Any]:
         """追蹤指定信號的所有出現位置"""
         print(f"[INFO] 追蹤信號: {signal_name} 於檔案: {self.file_path}")
+        return self._trace_signals([signal_name])[signal_name]
+    
+    def trace_many(self, signals: List[str]) -> Dict[str, Dict[str, Any]]:
+        """單次掃描追蹤多個信號,回傳 {信號名稱: 與 trace() 相同格式的結果}"""
+        print(f"[INFO] 追蹤 {len(signals)} 個信號 於檔案: {self.file_path}")
+        return self._trace_signals(signals)
+    
+    def _trace_signals(self, signals: List[str]) -> Dict[str, Dict[str, Any]]:
+        signals = list(dict.fromkeys(signals))  # 去重並保留順序
+        if not signals:
+            return {}
         
-        occurrences = []
-        current_module = None
+        # 比對與分類都在詞法淨化鏡像上進行,註解與字串中的名稱不算出現
+        code_path = sanitized_path(self.file_path)
+        occurrences = self._lookup_index(signals, code_path)
+        # 索引無法回答的信號才全檔掃描
+        pending = [signal for signal in signals if signal not in occurrences]
+        if pending and self.jobs > 1:
+            occurrences.update(self._scan_parallel(pending, code_path))
+        elif pending:
+            size = self.file_path.stat().st_size
+            scanned, _, _ = self._scan_lines(
+                _iter_line_pairs(str(self.file_path), str(code_path), 0, size), pending
+            )
+            occurrences.update(scanned)
+        
+        # 組裝結果
+        return {
+            signal: {
+                "signal": signal,
+                "file": str(self.file_path),
+                "total_count": len(occurrences[signal]),
+                "occurrences": occurrences[signal],
+                "summary": self._generate_summary(occurrences[signal])
+            }
+            for signal in signals
+        }
+    
+    def _lookup_index(self, signals: List[str], code_path: Path) -> Dict[str, List[Dict]]:
+        """以最新的 .sidx 索引回答信號查詢,索引不存在、過期或無法回答的信號不在結果中"""
+        if not self.use_index:
+            return {}
+        index = SignalIndex.open(self.file_path, classifier_fingerprint(self.SIGNAL_TYPES))
+        if index is None:
+            return {}
+        
+        occurrences = {}
+        with index:
+            for signal in signals:
+                found = index.lookup(signal, self._classify_signal, code_path)
+                if found is not None:
+                    occurrences[signal] = found
+        print(f"[INFO] 由信號索引回答 {len(occurrences)}/{len(signals)} 個信號")
+        return occurrences
+    
+    def build_index(self) -> Path:
+        """建立(或重建)原始檔旁的 .sidx 信號索引,jobs > 1 時平行建立"""
+        return SignalIndex.build(self.file_path, sanitized_path(self.file_path),
+                                 type(self), MODULE_PATTERN, jobs=self.jobs)
+    
+    def _scan_lines(self, lines, signals: List[str]):
+        """
+        掃描一段連續的行
         
-        with open(self.file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
+        lines 為 (原始行, 淨化行) 配對: 比對與分類使用淨化行,context 取原始行。
+        回傳 (各信號出現位置, 行數, 最後所在模組)。行號從該段的第 1 行起算;
+        在該段出現第一個 module 宣告之前的行,module 為 None。
+        """
+        finder = _SignalFinder(signals)
+        occurrences = {signal: [] for signal in signals}
+        current_module = None
+        line_num = 0
         
-        for line_num, line in enumerate(lines, start=1):
+        for line_num, (line, code) in enumerate(lines, start=1):
             # 追蹤當前所在模組
-            module_match = re.match(r'^\s*module\s+(\w+)', line)
-            if module_match:
-                current_module = module_match.group(1)
+            if 'module' in code:
+                module_match = MODULE_PATTERN.match(code)
+                if module_match:
+                    current_module = module_match.group(1)
             
-            # 檢查該行是否包含目標信號
-            if signal_name not in line:
-                continue
-            
-            # 分類信號類型
-            signal_type = self._classify_signal(line, signal_name)
-            
-            if signal_type:
-                occurrences.append({
-                    "line": line_num,
-                    "type": signal_type,
-                    "module": current_module,
-                    "context": line.strip()
-                })
+            # 找出該行包含的目標信號
+            for signal_name in finder.find(code):
+                # 分類信號類型
+                signal_type = self._classify_signal(code, signal_name)
+                
+                if signal_type:
+                    occurrences[signal_name].append({
+                        "line": line_num,
+                        "type": signal_type,
+                        "module": current_module,
+                        "context": line.strip()
+                    })
         
-        # 組裝結果
-        result = {
-            "signal": signal_name,
-            "file": str(self.file_path),
-            "total_count": len(occurrences),
-            "occurrences": occurrences,
-            "summary": self._generate_summary(occurrences)
-        }
+        return occurrences, line_num, current_module
+    
+    def _scan_parallel(self, signals: List[str], code_path: Path) -> Dict[str, List[Dict]]:
+        """將檔案切成對齊行首的位元組區段,以行程池平行掃描後依行號合併"""
+        ranges = _split_ranges(self.file_path, self.jobs * 4)
+        print(f"[INFO] 以 {self.jobs} 個行程平行掃描 {len(ranges)} 個區段")
+        
+        # 淨化鏡像與原始檔等長、換行位置相同,同一組位元組區段可同時套用在兩者
+        tasks = [(type(self), str(self.file_path), str(code_path), start, end, signals)
+                 for start, end in ranges]
+        occurrences = {signal: [] for signal in signals}
+        line_offset = 0
+        last_module = None
+        
+        with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+            # map 依區段順序回傳,可依序累加行號並承接前一區段的模組
+            for chunk_occ, num_lines, chunk_module in pool.map(_scan_range, tasks):
+                for signal, occs in chunk_occ.items():
+                    for occ in occs:
+                        occ['line'] += line_offset
+                        if occ['module'] is None:
+                            occ['module'] = last_module
+                    occurrences[signal].extend(occs)
+                line_offset += num_lines
+                if chunk_module is not None:
+                    last_module = chunk_module
         
-        return result
+        return occurrences
     
     def _classify_signal(self, line: str, signal: str) -> str:
         """判斷信號在該行的使用類型"""
-        for sig_type, pattern in self.SIGNAL_TYPES.items():
-            regex = pattern.format(signal=re.escape(signal))
-            if re.search(regex, line):
-                return sig_type
+        match = _compile_classifier(signal, self._signal_rules).match(line)
+        if match:
+            return match.lastgroup
         
         # 如果沒有匹配到特定類型,歸類為 reference
         return "reference"
@@ -106,18 +247,95 @@ class VerilogSignalTracer:
         }
 
 
+def _split_ranges(file_path: Path, num_chunks: int) -> List[tuple]:
+    """將檔案切成約 num_chunks 個位元組區段,每個邊界都對齊到行首"""
+    size = file_path.stat().st_size
+    boundaries = [0]
+    with open(file_path, 'rb') as f:
+        for i in range(1, num_chunks):
+            target = size * i // num_chunks
+            if target <= boundaries[-1]:
+                continue
+            # 從 target - 1 讀到行尾: 若 target 本身就是行首則邊界不變
+            f.seek(target - 1)
+            f.readline()
+            boundary = f.tell()
+            if boundaries[-1] < boundary < size:
+                boundaries.append(boundary)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _iter_range_lines(path: str, start: int, end: int):
+    """以二進位讀取 [start, end) 區段的每一行,解碼方式與文字模式一致"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        pos = start
+        while pos < end:
+            raw = f.readline()
+            if not raw:
+                break
+            pos += len(raw)
+            line = raw.decode('utf-8', errors='ignore')
+            if line.endswith('\r\n'):
+                line = line[:-2] + '\n'
+            yield line
+
+
+def _iter_line_pairs(path: str, code_path: str, start: int, end: int):
+    """逐行產生 [start, end) 區段的 (原始行, 淨化行)"""
+    return zip(_iter_range_lines(path, start, end), _iter_range_lines(code_path, start, end))
+
+
+def _scan_range(task):
+    """行程池工作函數: 掃描單一區段"""
+    tracer_cls, path, code_path, start, end, signals = task
+    tracer = tracer_cls(path)
+    return tracer._scan_lines(_iter_line_pairs(path, code_path, start, end), signals)
+
+
+def _usage():
+    print("用法: python trace_signal.py <verilog_file> <signal_name> [output_json] [--jobs N] [--no-index]")
+    print("      python trace_signal.py <verilog_file> --many <sig1,sig2,...|@signals.txt> [output_json] [--jobs N] [--no-index]")
+    print("      python trace_signal.py <verilog_file> --build-index [--jobs N]")
+    print("範例: python trace_signal.py soc_top.v data_bus result.json")
+    print("      python trace_signal.py soc_top.v --many clk_100mhz,clk_200mhz,async_rst cdc.json --jobs 32")
+    print("      python trace_signal.py soc_top.v --build-index --jobs 8   # 之後的查詢直接讀取索引")
+    sys.exit(1)
+
+
 def main():
-    if len(sys.argv) < 3:
-        print("用法: python trace_signal.py <verilog_file> <signal_name> [output_json]")
-        print("範例: python trace_signal.py soc_top.v data_bus result.json")
-        sys.exit(1)
+    args = sys.argv[1:]
+    jobs = 1
+    if '--jobs' in args:
+        i = args.index('--jobs')
+        value = args[i + 1] if i + 1 < len(args) else ''
+        if not value.isdecimal() or int(value) < 1:
+            print(f"[ERROR] --jobs 需要正整數,收到: {value or '(無)'}")
+            _usage()
+        jobs = int(value)
+        del args[i:i + 2]
+    use_index = '--no-index' not in args
+    args = [a for a in args if a != '--no-index']
+    
+    if len(args) == 2 and args[1] == '--build-index':
+        index_file = VerilogSignalTracer(args[0], jobs=jobs).build_index()
+        print(f"[SUCCESS] 信號索引已儲存至: {index_file}")
+        return
+    
+    if len(args) >= 3 and args[1] == '--many':
+        return main_many(args[0], args[2].split(','), args[3] if len(args) > 3 else None, jobs,
+                         use_index)
+    
+    if len(args) < 2:
+        _usage()
     
-    verilog_file = sys.argv[1]
-    signal_name = sys.argv[2]
-    output_file = sys.argv[3] if len(sys.argv) > 3 else None
+    verilog_file = args[0]
+    signal_name = args[1]
+    output_file = args[2] if len(args) > 2 else None
     
     # 追蹤信號
-    tracer = VerilogSignalTracer(verilog_file)
+    tracer = VerilogSignalTracer(verilog_file, jobs=jobs, use_index=use_index)
     result = tracer.trace(signal_name)
     
     # 輸出結果
@@ -144,5 +362,31 @@ def main():
         print(f"  {sig_type}: {count}")
 
 
+def main_many(verilog_file: str, signals: List[str], output_file: str = None, jobs: int = 1,
+              use_index: bool = True):
+    """--many 模式: 單次掃描追蹤多個信號"""
+    # @檔名 表示從檔案讀取信號清單(每行一個)
+    if len(signals) == 1 and signals[0].startswith('@'):
+        with open(signals[0][1:], 'r', encoding='utf-8') as f:
+            signals = [line.strip() for line in f if line.strip()]
+    signals = [s for s in signals if s]
+    
+    tracer = VerilogSignalTracer(verilog_file, jobs=jobs, use_index=use_index)
+    results = tracer.trace_many(signals)
+    
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"[SUCCESS] 追蹤結果已儲存至: {output_file}")
+    else:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    
+    print(f"\n=== 追蹤摘要 ===")
+    print(f"{'信號名稱':<30} {'出現次數':>8} {'驅動源':>6}")
+    for signal, result in results.items():
+        warn = "  ⚠️  多驅動" if result['summary']['has_multiple_drivers'] else ""
+        print(f"{signal:<30} {result['total_count']:>8} {result['summary']['driver_count']:>6}{warn}")
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Verilog Lexer
+generate_skeleton.py / trace_signal.py / split_verilog.py 共用的詞法前端
+
+用途: 以單次詞法掃描處理註解、字串、屬性 (* ... *) 與編譯指令,提供兩種輸出:
+- tokenize(): (種類, 起始偏移, 結束偏移) 的 token 串流
+- 淨化鏡像(sanitized mirror): 與原始檔等長的位元組,註解 / 字串 / 屬性的內容
+  換成空白但保留換行,編譯指令與 `include "..." 原樣保留。
+  因為偏移與行號完全一致,各工具可直接在鏡像上套用原本的正則,
+  `module` 寫在註解裡或 endmodule 出現在字串中都不會再誤判;
+  需要原始文字(例如追蹤結果的 context、切分後的程式碼)時再以相同偏移回到原始檔。
+
+鏡像快取在 .v 檔旁的 .lex 檔(另有 .lex.json 記錄原始檔大小與修改時間),
+原始檔改變時自動重建,因此完整分析只需一次詞法掃描。
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+
+LEX_VERSION = 1
+LEX_SUFFIX = '.lex'
+META_SUFFIX = '.lex.json'
+_BLOCK_SIZE = 16 * 1024 * 1024
+
+# 淨化用: 只比對需要遮蔽(或必須原樣保留)的片段。
+# keep 為 `include 路徑與跳脫識別字,原樣保留;attr 以前瞻排除 @(*)。
+# 開頭的字元類前瞻讓大部分位置只需一次比較就能跳過(約快 5 倍)
+_SANITIZE_PATTERN = re.compile(rb'''
+  (?=[`\\/"(])
+  (?:
+    (?P<keep>`include\s+"[^"\n]*"|\\\S+)
+  | (?P<line>//[^\n]*)
+  | (?P<block>/\*.*?(?:\*/|\Z))
+  | (?P<string>"(?:\\[^\n]|[^"\\\n])*"?)
+  | (?P<attr>\(\*(?!\s*\)).*?(?:\*\)|\Z))
+  )
+''', re.DOTALL | re.VERBOSE)
+
+_TOKEN_PATTERN = re.compile(rb'''
+    (?P<space>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<attribute>\(\*(?!\s*\)).*?(?:\*\)|\Z))
+  | (?P<string>"(?:\\[^\n]|[^"\\\n])*"?)
+  | (?P<directive>`[A-Za-z_]\w*)
+  | (?P<ident>[A-Za-z_][\w$]*|\\\S+)
+  | (?P<system>\$[A-Za-z_][\w$]*)
+  | (?P<number>(?:\d[\d_]*)?'[sS]?[bBoOdDhH]\s*[\da-fA-FxXzZ?_]+|\d[\d_]*(?:\.\d[\d_]*)?(?:[eE][+-]?\d+)?)
+  | (?P<op><<<|>>>|===|!==|<=|>=|==|!=|&&|\|\||<<|>>|\*\*|->|\+:|-:|[^\w\s])
+''', re.DOTALL | re.VERBOSE)
+
+KEYWORDS = frozenset(
+    b'module endmodule macromodule input output inout wire reg logic integer real time '
+    b'parameter localparam defparam assign always always_ff always_comb always_latch '
+    b'initial begin end if else case casex casez endcase default for while repeat forever '
+    b'function endfunction task endtask generate endgenerate genvar posedge negedge or and '
+    b'not signed unsigned supply0 supply1 tri wand wor'.split()
+)
+
+GROUPS = {'(': ')', '[': ']', '{': '}'}
+
+# 除換行外全部換成空白
+_BLANK = bytes(10 if b == 10 else 32 for b in range(256))
+
+
+class Token(NamedTuple):
+    kind: str   # keyword / ident / directive / system / number / string / comment / attribute / op
+    start: int
+    end: int
+
+
+def tokenize(buf, pos: int = 0, endpos: Optional[int] = None) -> Iterator[Token]:
+    """
+    產生 buf[pos:endpos] 的 token 串流(略過空白)
+
+    buf 可為 bytes 或 mmap;識別字若為 Verilog 關鍵字,種類為 keyword。
+    """
+    if endpos is None:
+        endpos = len(buf)
+    for match in _TOKEN_PATTERN.finditer(buf, pos, endpos):
+        kind = match.lastgroup
+        if kind == 'space':
+            continue
+        if kind == 'ident' and match.group() in KEYWORDS:
+            kind = 'keyword'
+        yield Token(kind, match.start(), match.end())
+
+
+def iter_module_tokens(buf, pos: int = 0, endpos: Optional[int] = None, line: int = 1) -> Iterator[list]:
+    """
+    單次走訪 buf[pos:endpos](淨化後的內容)的 token,逐一產生每個模組的 token 列表
+
+    列表元素為 (種類, 文字, 行號),不含 module / endmodule 關鍵字本身,
+    第一個元素通常是模組名稱;一次只保留一個模組的 token。line 為 pos 所在的行號。
+    """
+    tokens = None
+    last = pos
+    for token in tokenize(buf, pos, endpos):
+        line += buf.count(b'\n', last, token.start)
+        last = token.start
+        text = buf[token.start:token.end]
+        if tokens is None:
+            if token.kind == 'keyword' and text in (b'module', b'macromodule'):
+                tokens = []
+            continue
+        if token.kind == 'keyword' and text == b'endmodule':
+            yield tokens
+            tokens = None
+            continue
+        tokens.append((token.kind, text.decode('utf-8', errors='ignore'), line))
+
+
+def skip_group(tokens: list, i: int) -> int:
+    """tokens[i] 為左括號,回傳對應右括號之後的位置"""
+    stack = []
+    while i < len(tokens):
+        text = tokens[i][1]
+        if text in GROUPS:
+            stack.append(GROUPS[text])
+        elif stack and text == stack[-1]:
+            stack.pop()
+            if not stack:
+                return i + 1
+        i += 1
+    return i
+
+
+def statement_end(tokens: list, i: int) -> int:
+    """回傳從 tokens[i] 開始的單一敘述(含 begin/end、if/else、case 區塊)之後的位置"""
+    if i >= len(tokens):
+        return i
+    text = tokens[i][1]
+    if text in ('begin', 'case', 'casex', 'casez', 'fork'):
+        close = {'begin': 'end', 'fork': 'join'}.get(text, 'endcase')
+        opens = (text,) if close != 'endcase' else ('case', 'casex', 'casez')
+        depth = 0
+        while i < len(tokens):
+            if tokens[i][1] in opens:
+                depth += 1
+            elif tokens[i][1] == close:
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+            i += 1
+        return i
+    if text in ('if', 'for', 'while', 'repeat'):
+        j = i + 1
+        if j < len(tokens) and tokens[j][1] == '(':
+            j = skip_group(tokens, j)
+        j = statement_end(tokens, j)
+        if text == 'if' and j < len(tokens) and tokens[j][1] == 'else':
+            j = statement_end(tokens, j + 1)
+        return j
+    if text == 'forever':
+        return statement_end(tokens, i + 1)
+    depth = 0
+    while i < len(tokens):
+        text = tokens[i][1]
+        if text in GROUPS:
+            depth += 1
+        elif text in (')', ']', '}'):
+            depth -= 1
+        elif text == ';' and depth <= 0:
+            return i + 1
+        i += 1
+    return i
+
+
+def _sanitize_block(block: bytes, state: Optional[str]):
+    """
+    淨化一個以換行結尾的區塊
+
+    state 為上一區塊結束時尚未關閉的 'block' 註解或 'attr' 屬性,回傳 (淨化結果, 新 state)。
+    字串(不支援跨行續接)、單行註解與跳脫識別字都不會跨行,因此只有這兩種需要跨區塊延續。
+    """
+    parts = []
+    pos = 0
+    if state is not None:
+        close = b'*/' if state == 'block' else b'*)'
+        end = block.find(close)
+        if end < 0:
+            return block.translate(_BLANK), state
+        pos = end + 2
+        parts.append(block[:pos].translate(_BLANK))
+        state = None
+
+    for match in _SANITIZE_PATTERN.finditer(block, pos):
+        parts.append(block[pos:match.start()])
+        text = match.group()
+        kind = match.lastgroup
+        if kind == 'keep':
+            parts.append(text)
+        else:
+            parts.append(text.translate(_BLANK))
+            if kind == 'block' and (len(text) < 4 or not text.endswith(b'*/')):
+                state = 'block'
+            elif kind == 'attr' and (len(text) < 4 or not text.endswith(b'*)')):
+                state = 'attr'
+        pos = match.end()
+    parts.append(block[pos:])
+    return b''.join(parts), state
+
+
+def sanitize(data: bytes) -> bytes:
+    """回傳 data 的淨化鏡像(長度相同,換行位置相同)"""
+    return _sanitize_block(data, None)[0]
+
+
+def _forced_cut(data: bytes, state: Optional[str]) -> int:
+    """
+    在沒有換行的過長資料中找安全切點,回傳切點位置(0 表示找不到)
+
+    切點緊接在註解 / 字串 / 屬性 / 保留片段之外的 `;` 之後,或落在延續到資料結尾的
+    區塊註解 / 屬性之內(交給 state 延續,不拆開 */ 與 *)),
+    因此分段淨化的結果與整段一起淨化相同。
+    """
+    pos = 0
+    if state is not None:
+        end = data.find(b'*/' if state == 'block' else b'*)')
+        if end < 0:
+            return len(data) - 1 if data.endswith(b'*') else len(data)
+        pos = end + 2
+    cut = 0
+    for match in _SANITIZE_PATTERN.finditer(data, pos):
+        semi = data.rfind(b';', pos, match.start())
+        if semi >= 0:
+            cut = semi + 1
+        pos = match.end()
+        if pos == len(data) and match.lastgroup in ('block', 'attr'):
+            inside = len(data) - 1 if data.endswith(b'*') else len(data)
+            # 屬性須已出現非空白內容,否則可能是 @(* ) 而不是屬性
+            if inside >= match.start() + 2 and (match.lastgroup == 'block'
+                                                or data[match.start() + 2:inside].strip()):
+                return inside
+    semi = data.rfind(b';', pos)
+    if semi >= 0:
+        cut = semi + 1
+    return cut
+
+
+def _line_cut(data: bytes) -> int:
+    """
+    最後一個可安全切開的換行之後的位置(0 表示沒有)
+
+    `include 與路徑、@(* 與 ) 之間可以換行,在其後的換行切開會讓兩半各自比對失敗,
+    這時改在該片段所在行之前的換行切開。
+    """
+    cut = data.rfind(b'\n') + 1
+    while cut:
+        end = cut
+        while end and data[end - 1] in b' \t\r\n\f\v':
+            end -= 1
+        if data.endswith(b'(*', 0, end):
+            start = end - 2
+        elif data.endswith(b'`include', 0, end):
+            start = end - len(b'`include')
+        else:
+            break
+        cut = data.rfind(b'\n', 0, start) + 1
+    return cut
+
+
+def sanitize_file(source, target) -> None:
+    """
+    逐塊淨化 source 寫入 target,每塊在換行處切開,記憶體用量與檔案大小無關
+
+    整塊都沒有換行時(例如攤平成單行的網表)以 _forced_cut 在安全位置強制切開,
+    不會無限累積;只有單一字串或單行註解本身超過一塊時才需要繼續累積。
+    """
+    state = None
+    carry = b''
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        while True:
+            data = src.read(_BLOCK_SIZE)
+            if not data:
+                break
+            data = carry + data
+            cut = _line_cut(data)
+            if cut == 0 and len(data) >= _BLOCK_SIZE:
+                cut = _forced_cut(data, state)
+            if cut == 0:
+                carry = data
+                continue
+            carry = data[cut:]
+            out, state = _sanitize_block(data[:cut], state)
+            dst.write(out)
+        if carry:
+            out, state = _sanitize_block(carry, state)
+            dst.write(out)
+
+
+def _cache_paths(verilog_file: Path, in_temp: bool = False):
+    if in_temp:
+        # 原始檔目錄不可寫入時改存到暫存目錄,以絕對路徑的雜湊區分
+        digest = hashlib.sha1(str(verilog_file.resolve()).encode('utf-8')).hexdigest()[:16]
+        base = Path(tempfile.gettempdir()) / 'verilog_lex' / f"{digest}_{verilog_file.name}"
+    else:
+        base = verilog_file
+    return base.with_name(base.name + LEX_SUFFIX), base.with_name(base.name + META_SUFFIX)
+
+
+def _is_fresh(meta_file: Path, lex_file: Path, stat) -> bool:
+    try:
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (meta.get('version') == LEX_VERSION and meta.get('size') == stat.st_size
+            and meta.get('mtime_ns') == stat.st_mtime_ns
+            and lex_file.exists() and lex_file.stat().st_size == stat.st_size)
+
+
+def sanitized_path(verilog_file) -> Path:
+    """
+    回傳 verilog_file 淨化鏡像的快取路徑,不存在或已過期時重新建立
+
+    快取優先放在原始檔旁,目錄不可寫入時改用暫存目錄。
+    """
+    source = Path(verilog_file)
+    stat = source.stat()
+    for in_temp in (False, True):
+        lex_file, meta_file = _cache_paths(source, in_temp)
+        if _is_fresh(meta_file, lex_file, stat):
+            return lex_file
+
+    print(f"[INFO] 詞法掃描: {source}", file=sys.stderr)
+    last_error = None
+    for in_temp in (False, True):
+        lex_file, meta_file = _cache_paths(source, in_temp)
+        try:
+            lex_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = lex_file.with_name(lex_file.name + '.tmp')
+            sanitize_file(source, tmp_file)
+            os.replace(tmp_file, lex_file)
+            tmp_meta = meta_file.with_name(meta_file.name + '.tmp')
+            with open(tmp_meta, 'w', encoding='utf-8') as f:
+                json.dump({"version": LEX_VERSION, "size": stat.st_size,
+                           "mtime_ns": stat.st_mtime_ns}, f)
+            os.replace(tmp_meta, meta_file)
+            return lex_file
+        except OSError as e:
+            last_error = e
+    raise OSError(f"無法寫入詞法快取: {last_error}")
+
+
+def read_sanitized(verilog_file) -> bytes:
+    """讀取(必要時建立)verilog_file 的淨化鏡像"""
+    with open(sanitized_path(verilog_file), 'rb') as f:
+        return f.read()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("用法: python verilog_lexer.py <verilog_file> [--tokens N]")
+        print("範例: python verilog_lexer.py soc_top.v            # 建立 .lex 快取")
+        print("      python verilog_lexer.py soc_top.v --tokens 50 # 顯示前 50 個 token")
+        sys.exit(1)
+
+    verilog_file = sys.argv[1]
+    lex_file = sanitized_path(verilog_file)
+    print(f"[SUCCESS] 淨化鏡像: {lex_file}")
+
+    if '--tokens' in sys.argv:
+        i = sys.argv.index('--tokens')
+        limit = int(sys.argv[i + 1]) if i + 1 < len(sys.argv) else 50
+        with open(verilog_file, 'rb') as f:
+            data = f.read()
+        for count, token in enumerate(tokenize(data)):
+            if count >= limit:
+                break
+            text = data[token.start:token.end].decode('utf-8', errors='ignore')
+            print(f"{token.start:>10} {token.kind:<10} {text[:60]!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""cdc_check 組合邏輯時鐘域傳遞的回歸測試"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from cdc_check import check_design  # noqa: E402
+
+
+def _crossings(tmp_path, body: str) -> list:
+    source = tmp_path / 'design.v'
+    source.write_text(body)
+    return [(c['signal'], c['from_domains'], c['to_domain'], c['status'])
+            for c in check_design(source)['crossings']]
+
+
+def test_reconvergent_ladder_is_linear(tmp_path):
+    # x/y 互相重新收斂 40 層: 逐路徑走訪需要 2^40 步
+    lines = ["module top(input clka, input clkb, input a, input b, output reg q);",
+             "reg ra, rb;",
+             "always @(posedge clka) begin ra <= a; rb <= b; end",
+             "assign x0 = ra;",
+             "assign y0 = rb;"]
+    for i in range(40):
+        lines.append(f"assign x{i + 1} = x{i} ^ y{i};")
+        lines.append(f"assign y{i + 1} = x{i} & y{i};")
+    lines += ["always @(posedge clkb) q <= x40;", "endmodule", ""]
+    assert _crossings(tmp_path, "\n".join(lines)) == [('x40', ['clka'], 'clkb', 'single_flop')]
+
+
+def test_deep_assign_chain(tmp_path):
+    lines = ["module top(input clka, input clkb, input a, output reg q);",
+             "reg r;",
+             "always @(posedge clka) r <= a;",
+             "assign x0 = r;"]
+    lines += [f"assign x{i + 1} = x{i};" for i in range(3000)]
+    lines += ["always @(posedge clkb) q <= x3000;", "endmodule", ""]
+    assert _crossings(tmp_path, "\n".join(lines)) == [('x3000', ['clka'], 'clkb', 'single_flop')]
+
+
+def test_combinational_loop_collects_all_domains(tmp_path):
+    body = """
+module lp(input clka, input clkb, input a, input en, output reg q);
+reg ra, rb;
+always @(posedge clka) ra <= a;
+always @(posedge clkb) rb <= en;
+assign l1 = l2 | ra;
+assign l2 = l1 & l3;
+assign l3 = l2 ^ rb;
+always @(posedge clkb) q <= l1;
+endmodule
+"""
+    assert _crossings(tmp_path, body) == [('l1', ['clka'], 'clkb', 'single_flop')]
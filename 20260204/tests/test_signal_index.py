@@ -0,0 +1,121 @@
+"""signal_index (.sidx) 快速路徑與全檔掃描結果一致性的回歸測試"""
+
+import os
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from signal_index import SignalIndex, classifier_fingerprint  # noqa: E402
+from trace_signal import VerilogSignalTracer  # noqa: E402
+
+
+DESIGN = """\
+// data in a comment is not an occurrence
+module core #(parameter W = 8) (
+  input clk, rst_n,
+  input [W-1:0] data, data_in,
+  output reg [W-1:0] q,
+  inout  pad
+);
+  wire [W-1:0] x1data, data_w;
+  reg r1q, q2;
+  assign data_w = data ^ x1data;
+  assign x1data = 8'hff & data_in;
+  always @(posedge clk or negedge rst_n) begin
+    if (!rst_n) q <= 0;
+    else q <= #10ns data_w + x1data;
+    r1q <= q;
+    q2 = r1q == q;
+    $display("data = %h", data);
+  end
+  sub u_sub (.clk(clk), .data (data_w), .q(q2), .\\bus$x (pad));
+endmodule
+
+module sub(input clk, input [7:0] data, output q);
+  assign q = |data; // 數據 comment
+  wire \\數據 ;
+  assign 數據_w = data;
+  wire w2data = w2data_n + data;
+endmodule
+""" + "// padding\n" * 100
+
+
+def _trace_all(tracer, signals):
+    return {signal: tracer.trace(signal) for signal in signals}
+
+
+def _index_usable(source, tracer_cls=VerilogSignalTracer) -> bool:
+    index = SignalIndex.open(source, classifier_fingerprint(tracer_cls.SIGNAL_TYPES))
+    if index is None:
+        return False
+    index.close()
+    return True
+
+
+def _signals(text: str) -> list:
+    words = set(re.findall(r'[A-Za-z0-9_]+', text))
+    # 也查詢只以其他識別字子字串出現的名稱(例如 data 之於 x1data、w2data)
+    words |= {'dat', 'ata', 'ns', 'q2', '1q', 'w', 'x'}
+    return sorted(words)
+
+
+def test_index_matches_scan(tmp_path):
+    source = tmp_path / 'design.v'
+    source.write_text(DESIGN, encoding='utf-8')
+    signals = _signals(DESIGN)
+
+    expected = _trace_all(VerilogSignalTracer(source, use_index=False), signals)
+    VerilogSignalTracer(source).build_index()
+
+    index = SignalIndex.open(source, classifier_fingerprint(VerilogSignalTracer.SIGNAL_TYPES))
+    assert index is not None
+    with index:
+        # data: 完整字組 + x1data 等行重新分類; ata: 只以子字串出現;
+        # ns: 出現在數字開頭的 10ns 之中,須退回全檔掃描
+        tracer = VerilogSignalTracer(source)
+        assert index.lookup('data', tracer._classify_signal, source) is not None
+        assert index.lookup('ata', tracer._classify_signal, source) is not None
+        assert index.lookup('ns', tracer._classify_signal, source) is None
+
+    assert _trace_all(VerilogSignalTracer(source), signals) == expected
+    assert VerilogSignalTracer(source).trace_many(signals) == expected
+
+
+def test_parallel_index_matches_scan(tmp_path):
+    source = tmp_path / 'design.v'
+    source.write_text(DESIGN * 5, encoding='utf-8')
+    signals = _signals(DESIGN)
+
+    expected = VerilogSignalTracer(source, use_index=False).trace_many(signals)
+    VerilogSignalTracer(source, jobs=3).build_index()
+    assert VerilogSignalTracer(source).trace_many(signals) == expected
+
+
+def test_stale_index_is_ignored_until_rebuilt(tmp_path):
+    source = tmp_path / 'design.v'
+    source.write_text(DESIGN, encoding='utf-8')
+    VerilogSignalTracer(source).build_index()
+    assert _index_usable(source)
+
+    # 大小不變但修改時間改變,同樣視為過期
+    source.write_text(DESIGN.replace('data_in', 'datb_in'), encoding='utf-8')
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert not _index_usable(source)
+    fresh = VerilogSignalTracer(source, use_index=False).trace_many(['data_in', 'datb_in'])
+    assert fresh['data_in']['total_count'] == 0
+    assert VerilogSignalTracer(source).trace_many(['data_in', 'datb_in']) == fresh
+
+    VerilogSignalTracer(source).build_index()
+    assert _index_usable(source)
+    assert VerilogSignalTracer(source).trace_many(['data_in', 'datb_in']) == fresh
+
+    # 分類規則不同的 tracer 不使用此索引
+    class CustomTracer(VerilogSignalTracer):
+        SIGNAL_TYPES = {'driver': r'^\s*assign\s+{signal}\s*='}
+
+    assert not _index_usable(source, CustomTracer)
+    assert (CustomTracer(source).trace('datb_in')
+            == CustomTracer(source, use_index=False).trace('datb_in'))
@@ -0,0 +1,77 @@
+"""verilog_lexer 逐塊淨化(sanitize_file)與整段淨化(sanitize)一致性的回歸測試"""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+import verilog_lexer  # noqa: E402
+from verilog_lexer import sanitize, sanitize_file  # noqa: E402
+
+
+CASES = [
+    # 註解
+    b"wire a; // endmodule in a comment\nwire b; /* multi\nline ; comment */ wire c;\n",
+    b"/* unterminated block comment ; ; ;",
+    b"a = b /* star * inside **/ ; c = d;/**/e;/*/ still comment */\n",
+    # 字串
+    b'$display("a; b // not a comment /* nor this */");\nx = "unterminated; string\ny = 1;\n',
+    b'$display("escaped \\" quote; still string"); z = 2;',
+    # 屬性與 @(*)
+    b"(* keep = 1; full_case *) reg r;\n(* multi\nline ; attr *) wire w;\n",
+    b"always @(*) begin a = b; end\nalways @( * ) c = d;\nalways @(*\n) e = f;\n",
+    b"(* unterminated attribute ; ; ;",
+    # `include 路徑與跳脫識別字
+    b'`include "dir/file;with//odd/*chars*/.vh"\n`include "a.vh" wire x;\n',
+    b"wire \\bus[0]; ; wire \\a//b ; assign \\x/*y = \\p(*q ;\n",
+    # 沒有換行的單行網表
+    b"module m(a,b); input a; output b; /* c ; d */ assign b = a; (* k *) wire w; endmodule " * 20,
+    b"x;" * 200,
+    b"",
+    b";",
+    b"*/ ; *) ; /",
+]
+
+FRAGMENTS = [b"wire a;", b"assign b = c;", b";", b" ", b"\n", b"/*", b"*/", b"*", b"/", b"//",
+             b"(*", b"*)", b"@(*)", b"@( * )", b"(* k = 1 *)", b'"', b'"str; // x"', b"\\",
+             b"\\esc ", b"\\a;b ", b'`include "x.vh"', b"`include", b"(", b")", b"endmodule",
+             b"begin", b"end"]
+
+
+def _check(tmp_path, data: bytes, block_size: int):
+    source = tmp_path / 'design.v'
+    target = tmp_path / 'design.v.lex'
+    source.write_bytes(data)
+    sanitize_file(source, target)
+    assert target.read_bytes() == sanitize(data), (block_size, data)
+
+
+@pytest.mark.parametrize('block_size', [1, 2, 3, 4, 5, 7, 11, 16, 64])
+@pytest.mark.parametrize('data', CASES)
+def test_blockwise_matches_whole(tmp_path, monkeypatch, block_size, data):
+    monkeypatch.setattr(verilog_lexer, '_BLOCK_SIZE', block_size)
+    _check(tmp_path, data, block_size)
+
+
+def test_blockwise_matches_whole_fuzz(tmp_path, monkeypatch):
+    rng = random.Random(20260204)
+    for _ in range(1500):
+        block_size = rng.randint(1, 24)
+        monkeypatch.setattr(verilog_lexer, '_BLOCK_SIZE', block_size)
+        fragments = rng.choices(FRAGMENTS, k=rng.randint(0, 40))
+        # 約一半的案例不含換行,走強制切點
+        if rng.random() < 0.5:
+            fragments = [f for f in fragments if f != b"\n"]
+        _check(tmp_path, b"".join(fragments), block_size)
+
+
+def test_sanitize_keeps_layout():
+    data = b'wire a; // c\n/* x\ny */ "s"\n(* k *) @(*) `include "f.vh" \\e;\n'
+    out = sanitize(data)
+    assert len(out) == len(data)
+    assert [i for i, b in enumerate(out) if b == 10] == [i for i, b in enumerate(data) if b == 10]
+    assert b'// c' not in out and b'"s"' not in out and b'(* k *)' not in out
+    assert b'@(*)' in out and b'`include "f.vh"' in out and b'\\e;' in out
@@ -1,16 +1,7 @@
-import re
-from rank_bm25 import BM25Okapi
+from ngram_search import BM25Index, get_char_ngrams
 
-# 1. 定義 n-gram 分詞器 (字元級)
-def get_char_ngrams(text, n=3):
-    """
-    將文字轉換為長度為 n 的字元序列。
-    例如: "Apple" -> ["App", "ppl", "ple"]
-    """
-    # 清理非字母數字字元並轉小寫
-    text = re.sub(r'[^\w\s]', '', text).lower()
-    # 產生 n-grams
-    return [text[i:i+n] for i in range(len(text) - n + 1)]
+# 1. 字元級 n-gram 分詞器: get_char_ngrams(text, n=3)
+#    例如: "Apple" -> ["app", "ppl", "ple"]
 
 # 2. 原始資料 (模擬資料庫)
 # 包含欄位：id, part_name, description
@@ -30,8 +21,8 @@ for data in dataset:
     tokens = get_char_ngrams(combined_text, n=3)
     corpus.append(tokens)
 
-# 4. 初始化 BM25 
-bm25 = BM25Okapi(corpus)
+# 4. 初始化 BM25 (倒排索引,計分與 rank_bm25 的 BM25Okapi 相同)
+bm25 = BM25Index(corpus)
 
 # 5. 執行搜尋
 def search(query, top_n=2):
@@ -40,21 +31,18 @@ def search(query, top_n=2):
     # 搜尋詞也必須進行相同的 n-gram 處理
     query_tokens = get_char_ngrams(query, n=3)
     
-    # 取得各筆資料的分數
-    scores = bm25.get_scores(query_tokens)
+    # 只為含查詢 n-gram 的資料計分,以 heap 取分數大於 0 的前 top_n 筆
+    results = bm25.top_k(query_tokens, top_n)
     
-    # 根據分數排序並回傳結果
-    results = sorted(zip(range(len(dataset)), scores), key=lambda x: x[1], reverse=True)
-    
-    for idx, score in results[:top_n]:
-        if score > 0:
-            match = dataset[idx]
-            print(f"【命中】 ID: {match['id']}")
-            print(f" 欄位名稱: {match['name']}")
-            print(f" 詳細內容: {match['desc']}")
-            print(f" 相關得分: {score:.4f}\n")
-        else:
-            print("查無相關資料。")
+    for idx, score in results:
+        match = dataset[idx]
+        print(f"【命中】 ID: {match['id']}")
+        print(f" 欄位名稱: {match['name']}")
+        print(f" 詳細內容: {match['desc']}")
+        print(f" 相關得分: {score:.4f}\n")
+    # 與原本逐筆判斷分數相同: 前 top_n 名中每個未命中的名次各印一次
+    for _ in range(min(top_n, len(dataset)) - len(results)):
+        print("查無相關資料。")
 
 # 測試：輸入稍微打錯的關鍵字 (例如把 Resistor 打成 Resister)
 search("Resister 10k")
@@ -0,0 +1,188 @@
+"""
+BM25 Benchmark
+比較原型(BM25Okapi.get_scores + 全部分數排序)、ngram_search 倒排索引
+與 sparse_bm25 批次稀疏矩陣計分的查詢速度
+
+用途: 產生合成零件目錄(name + desc,與 BM25_Test.py 的 dataset 相同欄位)
+與帶錯字 / 片段的查詢,量測建立時間、每次查詢延遲與 QPS,並確認兩者的前 k 名逐筆相同。
+未安裝 rank_bm25 時,以相同公式、相同累加順序的逐文件全掃描作為基準。
+安裝 numpy / scipy 時另測 sparse-batch(全部查詢一次批次計分),
+其分數只有浮點累加順序的差異,以容許誤差比對。
+
+用法: python bench_bm25.py [文件數] [查詢數] [top_k]
+"""
+
+import random
+import sys
+import time
+
+from ngram_search import BM25Index, get_char_ngrams
+
+try:
+    from rank_bm25 import BM25Okapi
+except ImportError:
+    BM25Okapi = None
+
+try:
+    from sparse_bm25 import SparseBM25
+except ImportError:
+    SparseBM25 = None
+
+
+CATEGORIES = ['Resistor', 'Capacitor', 'Transistor', 'Diode', 'Inductor', 'Connector',
+              'Relay', 'Fuse', 'Crystal', 'Regulator', 'MOSFET', 'Oscillator']
+WORDS = ['Electronic', 'component', 'Power', 'filter', 'Signal', 'amplifier', 'Small',
+         'precision', 'low', 'noise', 'high', 'voltage', 'SMD', 'through', 'hole', 'automotive']
+
+
+class FullScanBM25:
+    """rank_bm25.BM25Okapi 的純 Python 等價實作: 每次查詢為全部文件計分"""
+
+    def __init__(self, corpus, k1=1.5, b=0.75, epsilon=0.25):
+        import math
+        self.k1, self.b = k1, b
+        self.doc_freqs = []
+        self.doc_len = []
+        nd = {}
+        for document in corpus:
+            self.doc_len.append(len(document))
+            frequencies = {}
+            for word in document:
+                frequencies[word] = frequencies.get(word, 0) + 1
+            self.doc_freqs.append(frequencies)
+            for word in frequencies:
+                nd[word] = nd.get(word, 0) + 1
+        self.corpus_size = len(self.doc_len)
+        self.avgdl = sum(self.doc_len) / self.corpus_size
+        self.idf = {}
+        idf_sum = 0
+        negative = []
+        for word, freq in nd.items():
+            idf = math.log(self.corpus_size - freq + 0.5) - math.log(freq + 0.5)
+            self.idf[word] = idf
+            idf_sum += idf
+            if idf < 0:
+                negative.append(word)
+        eps = epsilon * (idf_sum / len(self.idf))
+        for word in negative:
+            self.idf[word] = eps
+
+    def get_scores(self, query):
+        scores = [0.0] * self.corpus_size
+        for q in query:
+            idf = self.idf.get(q) or 0
+            for doc, (freqs, length) in enumerate(zip(self.doc_freqs, self.doc_len)):
+                tf = freqs.get(q) or 0
+                scores[doc] += idf * (tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / self.avgdl)))
+        return scores
+
+
+def make_catalog(num_docs, rng):
+    dataset = []
+    for i in range(num_docs):
+        category = rng.choice(CATEGORIES)
+        value = f"{rng.choice([1, 2.2, 4.7, 10, 22, 47, 100, 220, 470])}{rng.choice(['', 'k', 'M', 'u', 'n', 'p'])}"
+        code = f"{category[:3].upper()}-{rng.randint(0, 9999):04d}-{rng.choice('ABCDEFGH')}"
+        desc = ' '.join(rng.sample(WORDS, 3)) + f" {code}"
+        dataset.append({"id": i + 1, "name": f"{category} {value}", "desc": desc})
+    return dataset
+
+
+def make_queries(dataset, num_queries, rng):
+    """一半是帶一個錯字的名稱,一半是零件編號片段"""
+    queries = []
+    for _ in range(num_queries):
+        record = rng.choice(dataset)
+        if rng.random() < 0.5:
+            text = record['name']
+            pos = rng.randrange(len(text))
+            queries.append(text[:pos] + rng.choice('aeiou') + text[pos + 1:])
+        else:
+            code = record['desc'].split()[-1]
+            queries.append(code[rng.randrange(3):])
+    return queries
+
+
+def measure(search, queries):
+    start = time.perf_counter()
+    results = [search(query) for query in queries]
+    return time.perf_counter() - start, results
+
+
+def same_ranking(expected, actual, tolerance=1e-9):
+    """前 k 名分數在容許誤差內相同;文件不同時只允許是同分互換"""
+    if len(expected) != len(actual):
+        return False
+    for (doc_a, score_a), (doc_b, score_b) in zip(expected, actual):
+        if abs(score_a - score_b) > tolerance * max(1.0, abs(score_a)):
+            return False
+    scores = {doc: score for doc, score in expected}
+    cutoff = expected[-1][1] if expected else 0
+    return all(doc in scores or abs(score - cutoff) <= tolerance * max(1.0, abs(cutoff))
+               for doc, score in actual)
+
+
+def main():
+    num_docs = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    num_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    top_k = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    rng = random.Random(0)
+    dataset = make_catalog(num_docs, rng)
+    queries = [get_char_ngrams(q) for q in make_queries(dataset, num_queries, rng)]
+    corpus = [get_char_ngrams(f"{d['name']} {d['desc']}") for d in dataset]
+    print(f"[INFO] 合成目錄: {num_docs} 筆, 查詢: {num_queries} 個, top_k: {top_k}")
+
+    baseline_cls = BM25Okapi or FullScanBM25
+    if BM25Okapi is None:
+        print("[WARN] 未安裝 rank_bm25,以等價的純 Python 全掃描作為基準")
+
+    start = time.perf_counter()
+    baseline = baseline_cls(corpus)
+    baseline_build = time.perf_counter() - start
+    start = time.perf_counter()
+    index = BM25Index(corpus)
+    index_build = time.perf_counter() - start
+
+    def baseline_search(query):
+        # 原型的做法: 全部文件計分後完整排序
+        results = sorted(zip(range(num_docs), baseline.get_scores(query)), key=lambda x: x[1], reverse=True)
+        return [(doc, float(score)) for doc, score in results[:top_k] if score > 0]
+
+    baseline_time, expected = measure(baseline_search, queries)
+    index_time, actual = measure(lambda query: index.top_k(query, top_k), queries)
+
+    rows = [('full-scan', baseline_build, baseline_time), ('inverted', index_build, index_time)]
+    batched = None
+    if SparseBM25 is not None:
+        start = time.perf_counter()
+        sparse_index = SparseBM25(index)
+        sparse_build = index_build + time.perf_counter() - start
+        start = time.perf_counter()
+        batched = sparse_index.search_batch(queries, top_k)
+        rows.append(('sparse-batch', sparse_build, time.perf_counter() - start))
+    else:
+        print("[WARN] 未安裝 numpy / scipy,略過 sparse-batch")
+
+    print(f"{'版本':<12} {'建立秒數':>10} {'ms/查詢':>10} {'QPS':>10}")
+    for name, build, elapsed in rows:
+        print(f"{name:<12} {build:>10.2f} {elapsed / num_queries * 1000:>10.3f} {num_queries / elapsed:>10,.0f}")
+    for name, _, elapsed in rows[1:]:
+        print(f"{name} 查詢加速: {baseline_time / elapsed:.1f}x")
+
+    if expected != actual:
+        mismatched = sum(1 for a, b in zip(expected, actual) if a != b)
+        print(f"❌ {mismatched} 個查詢的前 {top_k} 名不一致")
+        sys.exit(1)
+    print(f"✓ 全部 {num_queries} 個查詢的前 {top_k} 名與分數完全一致")
+
+    if batched is not None:
+        mismatched = sum(1 for a, b in zip(expected, batched) if not same_ranking(a, b))
+        if mismatched:
+            print(f"❌ sparse-batch: {mismatched} 個查詢的前 {top_k} 名不一致")
+            sys.exit(1)
+        print(f"✓ sparse-batch: 全部 {num_queries} 個查詢的前 {top_k} 名在浮點誤差內一致")
+
+
+if __name__ == "__main__":
+    main()
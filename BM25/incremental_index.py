@@ -0,0 +1,285 @@
+"""
+可增刪的 N-gram BM25 索引 (分段 + 墓碑)
+
+BM25Index 建好後不可變,目錄新增一個零件就得整個重建。這裡改為 Lucene / LSM 式的分段結構:
+
+- 新文件寫入開放中的緩衝區段,累積 buffer_size 筆後封存,再開新的緩衝區段
+- 刪除只在文件所在區段標記墓碑(tombstone),postings 留到合併時才清除;
+  更新 = 刪除舊版 + 新增新版
+- 封存時,最後 merge_factor 個同一層級的區段合併成一個(層級依存活文件數的
+  merge_factor 對數);墓碑超過一半的區段單獨重寫;force_merge() 合併全部區段
+
+集合統計(存活文件數、總長度與各 n-gram 的文件頻率 df)在每次增刪時更新,
+avgdl 與 IDF 在查詢時由目前的統計算出,與對存活文件重建 BM25Index 的計分相同;
+負 IDF 所需的平均 IDF 只在查詢用到時計算,並快取到下一次異動。
+區段內的文件長度正規化項也在查詢時計算,avgdl 變動不需重算任何區段。
+
+所有異動與查詢都在同一把鎖下進行,查詢看到的一定是某次異動完成前或完成後的狀態,
+不會看到只套用一半的更新或合併。
+"""
+
+import heapq
+import math
+import threading
+from array import array
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+
+class _Segment:
+    """
+    一個區段: 區段內文件編號 0..n-1 依加入順序排列
+
+    seqs / keys / doc_len / terms[文件]: 全域加入序號、外部鍵、長度與不重複的 n-gram
+    postings[n-gram] / tfs[n-gram]: 含該 n-gram 的區段內文件編號與詞頻
+    deleted: 已刪除(墓碑)的區段內文件編號
+    """
+
+    def __init__(self):
+        self.seqs = array('Q')
+        self.keys: List[Hashable] = []
+        self.doc_len = array('I')
+        self.terms: List[Tuple[str, ...]] = []
+        self.postings: Dict[str, array] = {}
+        self.tfs: Dict[str, array] = {}
+        self.deleted = set()
+
+    def __len__(self):
+        return len(self.seqs)
+
+    @property
+    def live(self) -> int:
+        return len(self.seqs) - len(self.deleted)
+
+    def append(self, seq: int, key: Hashable, length: int, frequencies: Dict[str, int]) -> int:
+        doc = len(self.seqs)
+        self.seqs.append(seq)
+        self.keys.append(key)
+        self.doc_len.append(length)
+        self.terms.append(tuple(frequencies))
+        for gram, freq in frequencies.items():
+            docs = self.postings.get(gram)
+            if docs is None:
+                docs = self.postings[gram] = array('I')
+                self.tfs[gram] = array('I')
+            docs.append(doc)
+            self.tfs[gram].append(freq)
+        return doc
+
+
+class IncrementalBM25Index:
+    """
+    支援新增、更新、刪除的 BM25 索引,文件以外部鍵(例如零件 id)識別
+
+    計分參數與 BM25Index 相同;top_k 回傳 [(鍵, 分數)],同分時較早加入者在前。
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25,
+                 buffer_size: int = 1000, merge_factor: int = 10):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.buffer_size = buffer_size
+        self.merge_factor = merge_factor
+
+        self._segments: List[_Segment] = []
+        self._buffer = _Segment()
+        self._locations: Dict[Hashable, Tuple[_Segment, int]] = {}
+        self._df: Dict[str, int] = {}
+        self._total = 0
+        self._next_seq = 0
+        self._mean_idf = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._locations)
+
+    def __contains__(self, key):
+        return key in self._locations
+
+    @property
+    def corpus_size(self) -> int:
+        return len(self._locations)
+
+    @property
+    def avgdl(self) -> float:
+        return self._total / len(self._locations) if self._locations else 0.0
+
+    @property
+    def num_segments(self) -> int:
+        return len(self._segments) + (1 if len(self._buffer) else 0)
+
+    # ------------------------------------------------------------------
+    # 異動
+
+    def add(self, key: Hashable, document: Sequence[str]):
+        """新增文件;鍵已存在時拋出 KeyError(請改用 update)"""
+        with self._lock:
+            if key in self._locations:
+                raise KeyError(f"文件已存在: {key!r}")
+            self._insert(key, document)
+
+    def update(self, key: Hashable, document: Sequence[str]):
+        """以新內容取代既有文件"""
+        with self._lock:
+            self._remove(key)
+            self._insert(key, document)
+
+    def delete(self, key: Hashable):
+        """刪除文件;鍵不存在時拋出 KeyError"""
+        with self._lock:
+            self._remove(key)
+
+    def force_merge(self):
+        """將所有區段(含緩衝區段)合併為一個並清除墓碑"""
+        with self._lock:
+            segments = self._segments + ([self._buffer] if len(self._buffer) else [])
+            merged = self._merge(segments)
+            self._segments = [merged] if len(merged) else []
+            self._buffer = _Segment()
+
+    def _insert(self, key: Hashable, document: Sequence[str]):
+        frequencies = {}
+        for gram in document:
+            frequencies[gram] = frequencies.get(gram, 0) + 1
+        doc = self._buffer.append(self._next_seq, key, len(document), frequencies)
+        self._locations[key] = (self._buffer, doc)
+        self._next_seq += 1
+        self._total += len(document)
+        for gram in frequencies:
+            self._df[gram] = self._df.get(gram, 0) + 1
+        self._mean_idf = None
+
+        if len(self._buffer) >= self.buffer_size:
+            self._segments.append(self._buffer)
+            self._buffer = _Segment()
+            self._maybe_merge()
+
+    def _remove(self, key: Hashable):
+        segment, doc = self._locations.pop(key)
+        segment.deleted.add(doc)
+        self._total -= segment.doc_len[doc]
+        for gram in segment.terms[doc]:
+            freq = self._df[gram] - 1
+            if freq:
+                self._df[gram] = freq
+            else:
+                del self._df[gram]
+        self._mean_idf = None
+
+    # ------------------------------------------------------------------
+    # 區段合併
+
+    def _level(self, segment: _Segment) -> int:
+        """
+        floor(log_merge_factor(存活文件數 / buffer_size))
+
+        以整數除法計算: 浮點對數在整數次方處可能少 1(math.log(1000, 10) 為 2.999...),
+        同大小的區段會落在不同層級而不再合併。
+        """
+        level = 0
+        live = segment.live // self.buffer_size
+        while live >= self.merge_factor:
+            live //= self.merge_factor
+            level += 1
+        return level
+
+    def _maybe_merge(self):
+        """墓碑過半的區段單獨重寫;最後 merge_factor 個區段同層級時合併,可連鎖進位"""
+        segments = []
+        for segment in self._segments:
+            if len(segment.deleted) * 2 >= len(segment):
+                segment = self._merge([segment])
+            if len(segment):
+                segments.append(segment)
+        self._segments = segments
+
+        while len(self._segments) >= self.merge_factor:
+            tail = self._segments[-self.merge_factor:]
+            if len({self._level(segment) for segment in tail}) != 1:
+                break
+            merged = self._merge(tail)
+            self._segments[-self.merge_factor:] = [merged] if len(merged) else []
+
+    def _merge(self, segments: List[_Segment]) -> _Segment:
+        """依序合併 segments 的存活文件,postings 直接串接(文件編號重新對應)"""
+        merged = _Segment()
+        for segment in segments:
+            remap = {}
+            for doc, seq in enumerate(segment.seqs):
+                if doc in segment.deleted:
+                    continue
+                new = remap[doc] = len(merged.seqs)
+                merged.seqs.append(seq)
+                merged.keys.append(segment.keys[doc])
+                merged.doc_len.append(segment.doc_len[doc])
+                merged.terms.append(segment.terms[doc])
+                self._locations[segment.keys[doc]] = (merged, new)
+            for gram, docs in segment.postings.items():
+                tfs = segment.tfs[gram]
+                target_docs = merged.postings.get(gram)
+                for doc, tf in zip(docs, tfs):
+                    new = remap.get(doc)
+                    if new is None:
+                        continue
+                    if target_docs is None:
+                        target_docs = merged.postings[gram] = array('I')
+                        merged.tfs[gram] = array('I')
+                    target_docs.append(new)
+                    merged.tfs[gram].append(tf)
+        return merged
+
+    # ------------------------------------------------------------------
+    # 查詢
+
+    def _idf(self, freq: int) -> float:
+        """與 BM25Okapi 相同的 IDF;負值以 epsilon * 全部 n-gram 的平均 IDF 取代"""
+        n = len(self._locations)
+        value = math.log(n - freq + 0.5) - math.log(freq + 0.5)
+        if value >= 0:
+            return value
+        if self._mean_idf is None:
+            idf_sum = 0
+            for df in self._df.values():
+                idf_sum += math.log(n - df + 0.5) - math.log(df + 0.5)
+            self._mean_idf = idf_sum / len(self._df)
+        return self.epsilon * self._mean_idf
+
+    def _accumulate(self, query: Sequence[str]) -> Dict[int, list]:
+        """只為含查詢 n-gram 的存活文件計分,回傳 {加入序號: [分數, 鍵]}"""
+        scores = {}
+        if not self._locations:
+            return scores
+        k1, b = self.k1, self.b
+        k1_plus = k1 + 1
+        avgdl = self.avgdl
+        segments = self._segments + [self._buffer]
+        for gram in query:
+            freq = self._df.get(gram)
+            if not freq:
+                continue
+            idf = self._idf(freq)
+            if not idf:
+                continue
+            for segment in segments:
+                docs = segment.postings.get(gram)
+                if docs is None:
+                    continue
+                deleted, seqs, doc_len, keys = segment.deleted, segment.seqs, segment.doc_len, segment.keys
+                for doc, tf in zip(docs, segment.tfs[gram]):
+                    if doc in deleted:
+                        continue
+                    score = idf * (tf * k1_plus / (tf + k1 * (1 - b + b * doc_len[doc] / avgdl)))
+                    entry = scores.get(seqs[doc])
+                    if entry is None:
+                        scores[seqs[doc]] = [score, keys[doc]]
+                    else:
+                        entry[0] += score
+        return scores
+
+    def top_k(self, query: Sequence[str], k: int) -> List[Tuple[Hashable, float]]:
+        """分數大於 0 的前 k 名 [(鍵, 分數)]"""
+        with self._lock:
+            scores = self._accumulate(query)
+        best = heapq.nlargest(k, ((seq, entry) for seq, entry in scores.items() if entry[0] > 0),
+                              key=lambda item: (item[1][0], -item[0]))
+        return [(entry[1], entry[0]) for _, entry in best]
@@ -0,0 +1,215 @@
+"""
+BM25 索引檔 (mmap)
+
+ngram_search.BM25Index 每次行程啟動都要從語料重建,目錄很大時啟動需要數分鐘,
+每個 worker 也各自持有一份。這裡把索引存成單一檔案的扁平陣列:
+
+    header | vocab_offsets | vocab | postings_offsets | postings | tfs | idf | norms | doc_len
+
+- vocab: 依 UTF-8 位元組排序後串接的 n-gram,詞彙編號即排序位置,查詢時二分搜尋
+- postings_offsets[t] ~ postings_offsets[t + 1]: 詞彙 t 在 postings / tfs 中的範圍
+- idf / norms: 建立時算好的 float64,載入時不重算
+
+MappedBM25Index 以 mmap 開啟,不解析任何內容,啟動時間與檔案大小無關;
+多個行程開啟同一檔案時共用 page cache 中的同一份實體記憶體。
+查詢沿用 BM25Index 的計分程式,分數與原索引逐位元相同。
+
+用法:
+    python index_store.py build <dataset.json|.jsonl> <index.bm25> [--n 3]
+    python index_store.py search <index.bm25> <query> [top_n] [--dataset FILE]
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+from ngram_search import BM25Index, get_char_ngrams
+
+
+INDEX_MAGIC = b'BM25IX01'
+# magic, little-endian, n-gram 長度, 文件數, 詞彙數, vocab 位元組數, postings 數, k1, b, epsilon, avgdl
+HEADER = struct.Struct('<8sBxxxIQQQQdddd')
+
+
+def _layout(num_terms: int, vocab_size: int, num_postings: int, corpus_size: int) -> dict:
+    """各區段的 {名稱: (typecode, 起始偏移, 元素數)},每段起點對齊 8 位元組"""
+    sections = (('vocab_offsets', 'Q', num_terms + 1), ('vocab', 'B', vocab_size),
+                ('postings_offsets', 'Q', num_terms + 1), ('postings', 'I', num_postings),
+                ('tfs', 'I', num_postings), ('idf', 'd', num_terms),
+                ('norms', 'd', corpus_size), ('doc_len', 'I', corpus_size))
+    layout = {}
+    offset = HEADER.size
+    for name, code, count in sections:
+        offset = (offset + 7) & ~7
+        layout[name] = (code, offset, count)
+        offset += array(code).itemsize * count
+    return layout
+
+
+def save_index(index: BM25Index, path, n: int = 3):
+    """
+    將 index 寫成索引檔;n 為建立時的 n-gram 長度,查詢端以此切分查詢
+
+    先寫入暫存檔再以 os.replace 取代,已開啟舊檔的行程不受影響。
+    """
+    vocab_offsets = array('Q', [0])
+    vocab = bytearray()
+    postings_offsets = array('Q', [0])
+    postings = array('I')
+    tfs = array('I')
+    idf = array('d')
+    for gram in sorted(index.vocab):
+        term = index.vocab[gram]
+        vocab += gram.encode('utf-8')
+        vocab_offsets.append(len(vocab))
+        postings.extend(index.postings[term])
+        tfs.extend(index.tfs[term])
+        postings_offsets.append(len(postings))
+        idf.append(index.idf[term])
+
+    data = {'vocab_offsets': vocab_offsets, 'vocab': vocab, 'postings_offsets': postings_offsets,
+            'postings': postings, 'tfs': tfs, 'idf': idf,
+            'norms': array('d', index.norms), 'doc_len': array('I', index.doc_len)}
+    layout = _layout(len(idf), len(vocab), len(postings), index.corpus_size)
+
+    path = Path(path)
+    tmp_file = path.with_name(path.name + '.tmp')
+    with open(tmp_file, 'wb') as f:
+        f.write(HEADER.pack(INDEX_MAGIC, sys.byteorder == 'little', n, index.corpus_size, len(idf),
+                            len(vocab), len(postings), index.k1, index.b, index.epsilon, index.avgdl))
+        for name, (_, offset, _) in layout.items():
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(data[name])
+    os.replace(tmp_file, path)
+
+
+class _SortedVocab:
+    """排序後 n-gram 的二分搜尋,提供 BM25Index 查詢所用的 vocab.get"""
+
+    def __init__(self, mm, offsets, start: int):
+        self._mm = mm
+        self._offsets = offsets
+        self._start = start
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, term: int) -> bytes:
+        return self._mm[self._start + self._offsets[term]:self._start + self._offsets[term + 1]]
+
+    def get(self, gram: str, default=None):
+        key = gram.encode('utf-8')
+        term = bisect_left(self, key)
+        return term if term < len(self) and self[term] == key else default
+
+
+class _Slices:
+    """以 offsets 切分的扁平陣列,slices[t] 為 data[offsets[t]:offsets[t + 1]]"""
+
+    def __init__(self, data, offsets):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, term: int):
+        return self._data[self._offsets[term]:self._offsets[term + 1]]
+
+
+class MappedBM25Index(BM25Index):
+    """以 mmap 開啟的唯讀 BM25Index,陣列皆為檔案上的 memoryview"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < HEADER.size:
+            self._mm.close()
+            raise ValueError(f"不是 BM25 索引檔: {path}")
+        (magic, little, self.n, self.corpus_size, num_terms, vocab_size, num_postings,
+         self.k1, self.b, self.epsilon, self.avgdl) = HEADER.unpack_from(self._mm)
+        if magic != INDEX_MAGIC:
+            self._mm.close()
+            raise ValueError(f"不是 BM25 索引檔: {path}")
+        if bool(little) != (sys.byteorder == 'little'):
+            self._mm.close()
+            raise ValueError(f"索引檔的位元組順序與本機不同,請重新建立: {path}")
+
+        layout = _layout(num_terms, vocab_size, num_postings, self.corpus_size)
+        view = memoryview(self._mm)
+        self._views = {}
+        for name, (code, offset, count) in layout.items():
+            self._views[name] = view[offset:offset + array(code).itemsize * count].cast(code)
+        view.release()
+
+        self.vocab = _SortedVocab(self._mm, self._views['vocab_offsets'], layout['vocab'][1])
+        self.postings = _Slices(self._views['postings'], self._views['postings_offsets'])
+        self.tfs = _Slices(self._views['tfs'], self._views['postings_offsets'])
+        self.idf = self._views['idf']
+        self.norms = self._views['norms']
+        self.doc_len = self._views['doc_len']
+
+    def close(self):
+        if self._mm is not None:
+            self.vocab = self.postings = self.tfs = self.idf = self.norms = self.doc_len = None
+            for view in self._views.values():
+                view.release()
+            self._views = {}
+            self._mm.close()
+            self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_dataset(path) -> list:
+    """JSON 陣列或 JSONL 的零件資料,每筆含 name 與 desc"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if str(path).endswith('.jsonl'):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+def main():
+    args = sys.argv[1:]
+    options = {}
+    for flag in ('--n', '--dataset'):
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1]
+            del args[i:i + 2]
+
+    if len(args) >= 3 and args[0] == 'build':
+        n = int(options.get('--n', 3))
+        dataset = load_dataset(args[1])
+        index = BM25Index(get_char_ngrams(f"{d['name']} {d['desc']}", n) for d in dataset)
+        save_index(index, args[2], n)
+        print(f"[SUCCESS] {index.corpus_size} 筆、{len(index.vocab)} 個 n-gram 已寫入: {args[2]}")
+    elif len(args) >= 3 and args[0] == 'search':
+        top_n = int(args[3]) if len(args) > 3 else 10
+        dataset = load_dataset(options['--dataset']) if '--dataset' in options else None
+        with MappedBM25Index(args[1]) as index:
+            results = index.top_k(get_char_ngrams(args[2], index.n), top_n)
+            for doc, score in results:
+                label = f"{dataset[doc]['name']} | {dataset[doc]['desc']}" if dataset else f"文件 {doc}"
+                print(f"{score:8.4f}  {label}")
+            if not results:
+                print("查無相關資料。")
+    else:
+        print("用法: python index_store.py build <dataset.json|.jsonl> <index.bm25> [--n 3]")
+        print("      python index_store.py search <index.bm25> <query> [top_n] [--dataset FILE]")
+        print("範例: python index_store.py search parts.bm25 'Resister 10k' 5 --dataset parts.json")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+N-gram BM25 搜尋引擎
+
+BM25_Test.py 原型的正式版: rank_bm25 的 BM25Okapi.get_scores 每次查詢都為全部文件計分,
+再將全部分數排序取前幾名,查詢成本與資料量成正比。這裡改為 n-gram → postings 的倒排索引,
+預先計算 IDF 與每份文件的長度正規化項,查詢時只為與查詢共享 n-gram 的文件計分,
+再以 heap 取前 k 名。
+
+計分與 rank_bm25.BM25Okapi 相同(k1=1.5, b=0.75, epsilon=0.25,負 IDF 以
+epsilon * 平均 IDF 取代),且每份文件依查詢 n-gram 的順序累加,分數逐位元相同。
+"""
+
+import heapq
+import math
+import re
+from array import array
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+
+def get_char_ngrams(text: str, n: int = 3) -> List[str]:
+    """
+    將文字轉換為長度為 n 的字元序列。
+    例如: "Apple" -> ["app", "ppl", "ple"]
+    """
+    # 清理非字母數字字元並轉小寫
+    text = re.sub(r'[^\w\s]', '', text).lower()
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+
+class BM25Index:
+    """
+    BM25Okapi 的倒排索引版本
+
+    vocab: n-gram → 詞彙編號;postings[詞彙] / tfs[詞彙]: 含該 n-gram 的文件編號與詞頻
+    idf[詞彙]: 預先計算的 IDF;norms[文件]: k1 * (1 - b + b * 文件長度 / avgdl)
+    """
+
+    def __init__(self, corpus: Iterable[Sequence[str]], k1: float = 1.5, b: float = 0.75,
+                 epsilon: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.vocab: Dict[str, int] = {}
+        self.postings: List[array] = []
+        self.tfs: List[array] = []
+        self.doc_len = array('I')
+
+        total = 0
+        for doc_id, document in enumerate(corpus):
+            frequencies = {}
+            for gram in document:
+                frequencies[gram] = frequencies.get(gram, 0) + 1
+            self.doc_len.append(len(document))
+            total += len(document)
+            for gram, freq in frequencies.items():
+                term = self.vocab.get(gram)
+                if term is None:
+                    term = self.vocab[gram] = len(self.vocab)
+                    self.postings.append(array('I'))
+                    self.tfs.append(array('I'))
+                self.postings[term].append(doc_id)
+                self.tfs[term].append(freq)
+
+        self.corpus_size = len(self.doc_len)
+        if self.corpus_size == 0:
+            raise ValueError("語料庫不可為空")
+        self.avgdl = total / self.corpus_size
+        self.idf = self._calc_idf()
+        self.norms = [k1 * (1 - b + b * length / self.avgdl) for length in self.doc_len]
+
+    def _calc_idf(self) -> List[float]:
+        """與 BM25Okapi 相同: 依詞彙首次出現順序累加平均 IDF,負 IDF 以 epsilon * 平均 IDF 取代"""
+        idf = []
+        idf_sum = 0
+        for docs in self.postings:
+            freq = len(docs)
+            value = math.log(self.corpus_size - freq + 0.5) - math.log(freq + 0.5)
+            idf.append(value)
+            idf_sum += value
+        eps = self.epsilon * (idf_sum / len(idf)) if idf else 0
+        return [eps if value < 0 else value for value in idf]
+
+    def _accumulate(self, query: Sequence[str]) -> Dict[int, float]:
+        """只為含查詢 n-gram 的文件計分,回傳 {文件編號: 分數}"""
+        scores: Dict[int, float] = {}
+        k1_plus = self.k1 + 1
+        norms = self.norms
+        for gram in query:
+            term = self.vocab.get(gram)
+            if term is None or not self.idf[term]:
+                continue
+            idf = self.idf[term]
+            get = scores.get
+            for doc, tf in zip(self.postings[term], self.tfs[term]):
+                scores[doc] = get(doc, 0.0) + idf * (tf * k1_plus / (tf + norms[doc]))
+        return scores
+
+    def get_scores(self, query: Sequence[str]) -> List[float]:
+        """與 BM25Okapi.get_scores 相同的完整分數列表(未命中的文件為 0)"""
+        scores = [0.0] * self.corpus_size
+        for doc, score in self._accumulate(query).items():
+            scores[doc] = score
+        return scores
+
+    def top_k(self, query: Sequence[str], k: int) -> List[Tuple[int, float]]:
+        """
+        分數大於 0 的前 k 名 [(文件編號, 分數)]
+
+        同分時文件編號小者在前,與對全部分數做穩定排序的結果相同。
+        """
+        scores = self._accumulate(query)
+        return heapq.nlargest(k, ((doc, score) for doc, score in scores.items() if score > 0),
+                              key=lambda item: (item[1], -item[0]))
+
+
+class NgramSearchEngine:
+    """以字元 n-gram 建立 BM25Index 的文字搜尋"""
+
+    def __init__(self, texts: Iterable[str], n: int = 3, **params):
+        self.n = n
+        self.index = BM25Index((get_char_ngrams(text, n) for text in texts), **params)
+
+    def search(self, query: str, top_n: int = 10) -> List[Tuple[int, float]]:
+        return self.index.top_k(get_char_ngrams(query, self.n), top_n)
@@ -0,0 +1,102 @@
+"""
+稀疏矩陣 BM25 計分後端 (NumPy / SciPy)
+
+查詢服務每秒要為數千個零件編號模糊查詢計分,逐查詢的 Python 迴圈(ngram_search.BM25Index)
+在這個量級下太慢。這裡把 BM25Index 的 postings 轉成 CSR 稀疏矩陣 W(n-gram × 文件),
+每個非零元素預先存放該 n-gram 在該文件的 BM25 權重
+idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * 文件長度 / avgdl))。
+一批查詢組成查詢矩陣 Q(查詢 × n-gram,值為 n-gram 在查詢中的次數),
+分數即為一次稀疏矩陣乘法 Q @ W,每列再以 argpartition 取前 k 名。
+
+分數與 BM25Index 相同公式,只有浮點累加順序不同(差異在 1e-12 等級),
+接近同分的名次可能互換。需要 numpy 與 scipy。
+"""
+
+from typing import List, Sequence, Tuple
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError as e:  # ngram_search 本身不需要這兩個套件
+    raise ImportError("sparse_bm25 需要 numpy 與 scipy,請執行: pip install numpy scipy") from e
+
+from ngram_search import BM25Index, get_char_ngrams
+
+
+class SparseBM25:
+    """以 CSR 權重矩陣批次計分的 BM25Index"""
+
+    def __init__(self, index: BM25Index, batch_size: int = 256):
+        self.vocab = index.vocab
+        self.corpus_size = index.corpus_size
+        self.batch_size = batch_size
+
+        lengths = np.fromiter((len(docs) for docs in index.postings), dtype=np.int64,
+                              count=len(index.postings))
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        docs = np.concatenate([np.frombuffer(p, dtype=np.uint32) for p in index.postings]) \
+            if index.postings else np.zeros(0, dtype=np.uint32)
+        tfs = np.concatenate([np.frombuffer(t, dtype=np.uint32) for t in index.tfs]).astype(np.float64) \
+            if index.tfs else np.zeros(0)
+        idf = np.repeat(np.asarray(index.idf, dtype=np.float64), lengths)
+        norms = np.asarray(index.norms, dtype=np.float64)
+        weights = idf * (tfs * (index.k1 + 1) / (tfs + norms[docs]))
+        self.weights = sparse.csr_matrix((weights, docs.astype(np.int32), indptr),
+                                         shape=(len(lengths), self.corpus_size))
+
+    @classmethod
+    def from_corpus(cls, corpus, **params) -> 'SparseBM25':
+        return cls(BM25Index(corpus, **params))
+
+    def _query_matrix(self, queries: Sequence[Sequence[str]]):
+        """查詢 × n-gram 的次數矩陣;不在詞彙中的 n-gram 略過"""
+        indptr = [0]
+        indices = []
+        data = []
+        for query in queries:
+            counts = {}
+            for gram in query:
+                term = self.vocab.get(gram)
+                if term is not None:
+                    counts[term] = counts.get(term, 0) + 1
+            indices.extend(counts)
+            data.extend(counts.values())
+            indptr.append(len(indices))
+        return sparse.csr_matrix((np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int32),
+                                  np.asarray(indptr, dtype=np.int64)),
+                                 shape=(len(queries), self.weights.shape[0]))
+
+    def get_scores(self, query: Sequence[str]):
+        """單一查詢的完整分數向量(numpy 陣列)"""
+        return np.asarray((self._query_matrix([query]) @ self.weights).todense()).ravel()
+
+    def search_batch(self, queries: Sequence[Sequence[str]], k: int) -> List[List[Tuple[int, float]]]:
+        """
+        每個查詢分數大於 0 的前 k 名 [(文件編號, 分數)],分數高者在前,同分時文件編號小者在前
+
+        查詢以 batch_size 為單位組成矩陣,避免一次產生過大的結果矩陣。
+        """
+        results = []
+        for start in range(0, len(queries), self.batch_size):
+            scores = (self._query_matrix(queries[start:start + self.batch_size]) @ self.weights).tocsr()
+            for row in range(scores.shape[0]):
+                lo, hi = scores.indptr[row], scores.indptr[row + 1]
+                values = scores.data[lo:hi]
+                docs = scores.indices[lo:hi]
+                positive = values > 0
+                values, docs = values[positive], docs[positive]
+                if len(values) > k:
+                    keep = np.argpartition(-values, k - 1)[:k]
+                    values, docs = values[keep], docs[keep]
+                order = np.lexsort((docs, -values))
+                results.append([(int(docs[i]), float(values[i])) for i in order])
+        return results
+
+    def top_k(self, query: Sequence[str], k: int) -> List[Tuple[int, float]]:
+        return self.search_batch([query], k)[0]
+
+    def search_texts(self, texts: Sequence[str], k: int, n: int = 3) -> List[List[Tuple[int, float]]]:
+        """以字元 n-gram 切分文字查詢後批次搜尋"""
+        return self.search_batch([get_char_ngrams(text, n) for text in texts], k)
+
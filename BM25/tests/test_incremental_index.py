@@ -0,0 +1,92 @@
+"""incremental_index.IncrementalBM25Index 與對存活文件重建的 BM25Index 一致性的回歸測試"""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_bm25 import make_catalog, make_queries, same_ranking  # noqa: E402
+from incremental_index import IncrementalBM25Index, _Segment  # noqa: E402
+from ngram_search import BM25Index, get_char_ngrams  # noqa: E402
+
+
+def _document(record):
+    return get_char_ngrams(f"{record['name']} {record['desc']}", 3)
+
+
+def _assert_matches_rebuild(index, live, queries):
+    """live 為 {鍵: 文件},依加入順序排列(更新過的文件排在最後)"""
+    assert len(index) == len(live)
+    assert all(key in index for key in live)
+    keys = list(live)
+    rebuilt = BM25Index(live.values(), k1=index.k1, b=index.b, epsilon=index.epsilon)
+    assert index.avgdl == pytest.approx(rebuilt.avgdl)
+    for query in queries:
+        expected = [(keys[doc], score) for doc, score in rebuilt.top_k(query, 10)]
+        assert same_ranking(expected, index.top_k(query, 10))
+
+
+@pytest.mark.parametrize('buffer_size, merge_factor', [(1, 2), (7, 3), (50, 10)])
+def test_random_updates_match_rebuild(buffer_size, merge_factor):
+    rng = random.Random(buffer_size)
+    catalog = make_catalog(600, rng)
+    queries = [get_char_ngrams(text, 3) for text in make_queries(catalog, 40, rng)]
+    index = IncrementalBM25Index(buffer_size=buffer_size, merge_factor=merge_factor)
+    live = {}
+    next_key = 0
+
+    for step in range(1, 801):
+        action = rng.random()
+        if action < 0.6 or len(live) < 5:
+            key = f"P{next_key}"
+            next_key += 1
+            live[key] = _document(rng.choice(catalog))
+            index.add(key, live[key])
+        elif action < 0.8:
+            key = rng.choice(list(live))
+            del live[key]
+            live[key] = _document(rng.choice(catalog))
+            index.update(key, live[key])
+        else:
+            key = rng.choice(list(live))
+            del live[key]
+            index.delete(key)
+        if step % 200 == 0:
+            _assert_matches_rebuild(index, live, queries)
+
+    index.force_merge()
+    assert index.num_segments == 1
+    _assert_matches_rebuild(index, live, queries)
+
+    for key in list(live)[::2]:
+        del live[key]
+        index.delete(key)
+    _assert_matches_rebuild(index, live, queries)
+
+
+def test_errors_and_empty_index():
+    index = IncrementalBM25Index(buffer_size=2)
+    assert index.top_k(['abc'], 5) == []
+    index.add('a', ['abc', 'bcd'])
+    with pytest.raises(KeyError):
+        index.add('a', ['xyz'])
+    with pytest.raises(KeyError):
+        index.delete('missing')
+    index.delete('a')
+    index.force_merge()
+    assert len(index) == 0 and index.num_segments == 0
+    assert index.top_k(['abc'], 5) == []
+
+
+@pytest.mark.parametrize('buffer_size, merge_factor', [(1, 10), (1, 3), (7, 10), (1000, 10)])
+def test_level_at_exact_powers(buffer_size, merge_factor):
+    index = IncrementalBM25Index(buffer_size=buffer_size, merge_factor=merge_factor)
+    segment = _Segment()
+    for level in range(7):
+        size = buffer_size * merge_factor ** level
+        for count, expected in ((size - 1, max(level - 1, 0)), (size, level), (size + 1, level)):
+            segment.seqs = range(count)
+            assert index._level(segment) == expected, (count, expected)
@@ -0,0 +1,61 @@
+"""index_store 索引檔(save_index / MappedBM25Index)往返一致性的回歸測試"""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_bm25 import make_catalog, make_queries  # noqa: E402
+from index_store import MappedBM25Index, save_index  # noqa: E402
+from ngram_search import BM25Index, get_char_ngrams  # noqa: E402
+
+
+def test_mapped_index_matches_original(tmp_path):
+    rng = random.Random(24)
+    dataset = make_catalog(400, rng)
+    # 非 ASCII 的 n-gram: UTF-8 位元組順序與字串順序不同時仍須找得到
+    dataset += [{"name": "電阻 10kΩ", "desc": "精密 低雜訊 RES-0001-A"},
+                {"name": "電容 47µF", "desc": "濾波 CAP-0002-B"}]
+    texts = [f"{d['name']} {d['desc']}" for d in dataset]
+    index = BM25Index(get_char_ngrams(text, 3) for text in texts)
+    path = tmp_path / 'parts.bm25'
+    save_index(index, path, 3)
+
+    queries = make_queries(dataset, 200, rng) + ['電阻', '47µF', 'zzzz', '', 'Ω']
+    with MappedBM25Index(path) as mapped:
+        assert (mapped.n, mapped.corpus_size, mapped.avgdl) == (3, index.corpus_size, index.avgdl)
+        assert (mapped.k1, mapped.b, mapped.epsilon) == (index.k1, index.b, index.epsilon)
+        assert len(mapped.vocab) == len(index.vocab)
+        for gram, term in index.vocab.items():
+            other = mapped.vocab.get(gram)
+            assert list(mapped.postings[other]) == list(index.postings[term])
+            assert list(mapped.tfs[other]) == list(index.tfs[term])
+            assert mapped.idf[other] == index.idf[term]
+        for text in queries:
+            query = get_char_ngrams(text, 3)
+            assert mapped.get_scores(query) == index.get_scores(query)
+            assert mapped.top_k(query, 10) == index.top_k(query, 10)
+    assert mapped.idf is None
+
+
+def test_overwrite_keeps_open_index(tmp_path):
+    path = tmp_path / 'parts.bm25'
+    save_index(BM25Index([['abc', 'bcd'], ['xyz'], ['qqq']]), path)
+    with MappedBM25Index(path) as old:
+        save_index(BM25Index([['xyz'], ['xyz', 'abc'], ['rrr'], ['sss']]), path)
+        assert old.corpus_size == 3 and old.top_k(['abc'], 5)[0][0] == 0
+        with MappedBM25Index(path) as new:
+            assert new.corpus_size == 4 and new.top_k(['abc'], 5)[0][0] == 1
+
+
+def test_rejects_other_files(tmp_path):
+    short = tmp_path / 'short.bm25'
+    short.write_bytes(b'BM25')
+    other = tmp_path / 'other.bm25'
+    other.write_bytes(b'\0' * 4096)
+    for path in (short, other):
+        with pytest.raises(ValueError):
+            MappedBM25Index(path)
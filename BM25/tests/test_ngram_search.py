@@ -0,0 +1,57 @@
+"""ngram_search.BM25Index 與 rank_bm25.BM25Okapi 計分 / 排名一致性的回歸測試"""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_bm25 import make_catalog, make_queries  # noqa: E402
+from ngram_search import BM25Index, NgramSearchEngine, get_char_ngrams  # noqa: E402
+
+BM25Okapi = pytest.importorskip('rank_bm25').BM25Okapi
+
+
+def _corpus(dataset):
+    return [get_char_ngrams(f"{d['name']} {d['desc']}", 3) for d in dataset]
+
+
+def _okapi_top_k(okapi, query, k):
+    """原型的作法: 全部分數穩定排序後取分數大於 0 的前 k 名"""
+    scores = okapi.get_scores(query)
+    ranked = sorted(((doc, score) for doc, score in enumerate(scores) if score > 0),
+                    key=lambda item: item[1], reverse=True)
+    return ranked[:k]
+
+
+@pytest.mark.parametrize('num_docs', [1, 4, 300])
+def test_top_k_matches_okapi(num_docs):
+    rng = random.Random(num_docs)
+    dataset = make_catalog(num_docs, rng)
+    corpus = _corpus(dataset)
+    index = BM25Index(corpus)
+    okapi = BM25Okapi(corpus)
+
+    queries = [get_char_ngrams(text, 3) for text in make_queries(dataset, 100, rng)]
+    queries += [[], ['zzz'], get_char_ngrams('resistor resistor', 3)]
+    for query in queries:
+        assert index.get_scores(query) == list(okapi.get_scores(query))
+        for k in (1, 5, num_docs + 1):
+            assert index.top_k(query, k) == _okapi_top_k(okapi, query, k)
+
+
+def test_ties_keep_document_order():
+    corpus = [['abc', 'qqq'], ['abc', 'xyz'], ['def', 'ghi'], ['abc', 'xyz'], ['jkl'], ['mno']]
+    index = BM25Index(corpus)
+    assert [doc for doc, _ in index.top_k(['xyz'], 2)] == [1, 3]
+    assert index.top_k(['xyz'], 3) == _okapi_top_k(BM25Okapi(corpus), ['xyz'], 3)
+
+
+def test_search_engine_and_empty_corpus():
+    engine = NgramSearchEngine(['Resistor 10k', 'Capacitor 47uF', 'Resistor 1k',
+                                'Transistor NPN', 'Diode 1N4148', 'Crystal 25MHz'])
+    assert {doc for doc, _ in engine.search('resistr', 2)} == {0, 2}
+    with pytest.raises(ValueError):
+        BM25Index([])
@@ -0,0 +1,46 @@
+"""sparse_bm25.SparseBM25 批次計分與 BM25Index 一致性的回歸測試"""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+pytest.importorskip('numpy')
+pytest.importorskip('scipy')
+
+from bench_bm25 import make_catalog, make_queries, same_ranking  # noqa: E402
+from ngram_search import BM25Index, get_char_ngrams  # noqa: E402
+from sparse_bm25 import SparseBM25  # noqa: E402
+
+
+def _setup(num_docs, seed):
+    rng = random.Random(seed)
+    dataset = make_catalog(num_docs, rng)
+    index = BM25Index(get_char_ngrams(f"{d['name']} {d['desc']}", 3) for d in dataset)
+    texts = make_queries(dataset, 200, rng) + ['', 'zzzz', 'resistor resistor']
+    return index, texts
+
+
+@pytest.mark.parametrize('batch_size', [1, 7, 256])
+def test_search_batch_matches_index(batch_size):
+    index, texts = _setup(500, batch_size)
+    sparse = SparseBM25(index, batch_size=batch_size)
+    queries = [get_char_ngrams(text, 3) for text in texts]
+    for k in (1, 10):
+        results = sparse.search_batch(queries, k)
+        assert len(results) == len(queries)
+        for query, actual in zip(queries, results):
+            assert same_ranking(index.top_k(query, k), actual)
+    assert sparse.search_texts(texts, 10) == sparse.search_batch(queries, 10)
+
+
+def test_scores_match_within_tolerance():
+    index, texts = _setup(200, 1)
+    sparse = SparseBM25(index)
+    for text in texts:
+        query = get_char_ngrams(text, 3)
+        assert sparse.get_scores(query) == pytest.approx(index.get_scores(query), rel=1e-9, abs=1e-12)
+        assert same_ranking(index.top_k(query, 5), sparse.top_k(query, 5))
@@ -2,19 +2,80 @@
 """
 Batch process Verilog files with design_report CLI tool.
 """
+import contextlib
+import hashlib
+import importlib.util
+import io
+import runpy
+import signal
 import subprocess
 import sys
 import os
+import traceback
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor,
+                                as_completed, wait)
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 
 
-def run_design_report(verilog_file, cli_path="script/cli.py"):
+DEFAULT_TIMEOUT = 300  # 5 minutes
+CACHE_DIR_NAME = ".report_cache"
+
+
+CLI_VERSION_ENV = "DESIGN_REPORT_VERSION"
+
+
+def cli_fingerprint(cli_path):
+    """
+    Identify the design_report implementation for cache keys.
+    
+    Cached reports are invalidated when any of these change:
+    - the CLI path
+    - the contents or relative path of any .py file in the CLI's directory
+      tree (cli.py and the analysis modules it imports from there;
+      __pycache__ and hidden directories are skipped)
+    - the DESIGN_REPORT_VERSION environment variable, for analysis code
+      that lives outside that directory (e.g. an installed package)
+    """
+    digest = hashlib.sha256(str(cli_path).encode('utf-8'))
+    digest.update(os.environ.get(CLI_VERSION_ENV, "").encode('utf-8'))
+    cli_dir = Path(cli_path).resolve().parent
+    if os.path.isfile(cli_path):
+        sources = sorted(
+            path for path in cli_dir.rglob("*.py")
+            if not any(part == "__pycache__" or part.startswith(".")
+                       for part in path.relative_to(cli_dir).parts[:-1])
+        )
+        for path in sources:
+            digest.update(str(path.relative_to(cli_dir)).encode('utf-8') + b'\0')
+            with open(path, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def report_cache_key(verilog_file, fingerprint):
+    """
+    Content-addressed cache key: chunk file name and contents plus CLI fingerprint.
+    
+    The report names the file it was run on, so chunks with the same
+    contents but different names do not share a cached report.
+    """
+    digest = hashlib.sha256(fingerprint.encode('utf-8'))
+    digest.update(os.path.basename(verilog_file).encode('utf-8') + b'\0')
+    with open(verilog_file, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def run_design_report(verilog_file, cli_path="script/cli.py", timeout=DEFAULT_TIMEOUT):
     """
     Run design_report on a single Verilog file.
     
     Args:
         verilog_file: Path to the Verilog file
         cli_path: Path to the CLI script (default: script/cli.py)
+        timeout: Per-file timeout in seconds (default: 300)
     
     Returns:
         Tuple of (returncode, stdout, stderr)
@@ -27,61 +88,303 @@ def run_design_report(verilog_file, cli_path="script/cli.py"):
             cmd,
             capture_output=True,
             text=True,
-            timeout=300  # 5 minute timeout
+            timeout=timeout
         )
         return result.returncode, result.stdout, result.stderr
     except subprocess.TimeoutExpired:
-        return -1, "", "Error: Command timed out after 5 minutes"
+        return -1, "", f"Error: Command timed out after {timeout} seconds"
     except Exception as e:
         return -1, "", f"Error: {str(e)}"
 
 
-def batch_process_files(file_list, cli_path="script/cli.py", output_dir=None):
+class DesignReportTimeout(BaseException):
+    """
+    Raised inside an in-process worker when design_report exceeds its timeout.
+    
+    Derives from BaseException so that a CLI's own ``except Exception``
+    handlers cannot swallow the timeout and keep running.
+    """
+
+
+# State of an in-process worker: the CLI module loaded once per process.
+_worker_cli_path = None
+_worker_cli_module = None
+_worker_cli_error = None
+
+
+def init_inprocess_worker(cli_path):
+    """
+    Process pool initializer: import the CLI once for the worker's lifetime.
+    
+    A load failure is remembered rather than raised, so each file handed to
+    this worker can fall back to the subprocess path.
+    """
+    global _worker_cli_path, _worker_cli_module, _worker_cli_error
+    _worker_cli_path = cli_path
+    try:
+        cli_dir = str(Path(cli_path).resolve().parent)
+        if cli_dir not in sys.path:
+            sys.path.insert(0, cli_dir)
+        spec = importlib.util.spec_from_file_location("design_report_cli", cli_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _worker_cli_module = module
+    except BaseException as e:
+        _worker_cli_error = f"{type(e).__name__}: {e}"
+
+
+def _raise_timeout(signum, frame):
+    raise DesignReportTimeout()
+
+
+def run_design_report_inprocess(verilog_file, timeout=DEFAULT_TIMEOUT):
+    """
+    Run design_report inside a worker set up by init_inprocess_worker.
+    
+    Calls the CLI's main() with a design_report argv and captures its output,
+    so interpreter startup and imports are paid once per worker instead of
+    once per file. A CLI without main() is re-run as __main__ via runpy,
+    which still reuses the modules it has already imported. If the CLI could
+    not be imported, the file is run through the subprocess path instead.
+    
+    Args:
+        verilog_file: Path to the Verilog file
+        timeout: Per-file timeout in seconds (enforced where SIGALRM exists)
+    
+    Returns:
+        Tuple of (returncode, stdout, stderr)
+    """
+    if _worker_cli_module is None:
+        print(f"In-process load failed ({_worker_cli_error}), falling back to subprocess")
+        return run_design_report(verilog_file, _worker_cli_path, timeout)
+    
+    print(f"Running in-process: design_report {verilog_file}")
+    argv = [_worker_cli_path, "design_report", verilog_file]
+    stdout, stderr = io.StringIO(), io.StringIO()
+    saved_argv = sys.argv
+    use_alarm = hasattr(signal, "SIGALRM")
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    
+    returncode = 0
+    try:
+        sys.argv = argv
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                if callable(getattr(_worker_cli_module, "main", None)):
+                    _worker_cli_module.main()
+                else:
+                    runpy.run_path(_worker_cli_path, run_name="__main__")
+            except SystemExit as e:
+                if isinstance(e.code, int) or e.code is None:
+                    returncode = e.code or 0
+                else:
+                    print(e.code, file=sys.stderr)
+                    returncode = 1
+    except DesignReportTimeout:
+        return -1, stdout.getvalue(), f"Error: Command timed out after {timeout} seconds"
+    except Exception:
+        stderr.write(traceback.format_exc())
+        returncode = 1
+    finally:
+        sys.argv = saved_argv
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+    
+    return returncode, stdout.getvalue(), stderr.getvalue()
+
+
+def batch_process_files(file_list, cli_path="script/cli.py", output_dir=None,
+                        jobs=1, timeout=DEFAULT_TIMEOUT, use_cache=False, in_process=False,
+                        on_result=None):
     """
     Batch process multiple Verilog files.
     
     Args:
-        file_list: List of Verilog file paths
+        file_list: Verilog file paths (any iterable, consumed lazily)
         cli_path: Path to the CLI script
         output_dir: Optional directory to save reports
+        jobs: Number of design_report processes to run concurrently
+        timeout: Per-file timeout in seconds
+        use_cache: Reuse reports of unchanged files from output_dir/.report_cache
+            (requires output_dir)
+        in_process: Run design_report inside long-lived worker processes that
+            import the CLI once, instead of one interpreter per file
+        on_result: Optional callback(verilog_file, result) invoked as soon as
+            each file's result is known, e.g. to checkpoint progress
     
     Returns:
-        Dictionary with results for each file
+        Dictionary with results for each file, in file_list order
+    
+    Raises:
+        ValueError: use_cache is set without an output_dir to keep the cache in
     """
+    if use_cache and not output_dir:
+        raise ValueError("use_cache requires output_dir: the report cache is kept in the output directory")
+    
     results = {}
+    output_path = None
+    cache_dir = None
+    cache_keys = {}
     
     if output_dir:
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
+        if use_cache:
+            cache_dir = output_path / CACHE_DIR_NAME
+            cache_dir.mkdir(exist_ok=True)
+    
+    def finish(verilog_file, returncode, stdout, stderr):
+        result = record_result(verilog_file, returncode, stdout, stderr, output_path)
+        if cache_dir is not None:
+            result['cached'] = False
+            if result['success']:
+                cache_file = cache_dir / f"{cache_keys[verilog_file]}.txt"
+                tmp_file = cache_file.with_suffix('.tmp')
+                with open(tmp_file, 'w') as f:
+                    f.write(stdout)
+                os.replace(tmp_file, cache_file)
+        results[verilog_file] = result
+        if on_result is not None:
+            on_result(verilog_file, result)
     
-    for verilog_file in file_list:
+    fingerprint = cli_fingerprint(cli_path) if cache_dir is not None else None
+    
+    def reuse_cached(verilog_file):
+        """Record a cached report for verilog_file; False on a cache miss."""
+        if cache_dir is None:
+            return False
+        cache_keys[verilog_file] = report_cache_key(verilog_file, fingerprint)
+        cache_file = cache_dir / f"{cache_keys[verilog_file]}.txt"
+        if not cache_file.exists():
+            return False
+        print(f"Cache hit: {verilog_file}")
+        with open(cache_file) as f:
+            stdout = f.read()
+        result = record_result(verilog_file, 0, stdout, "", output_path)
+        result['cached'] = True
+        results[verilog_file] = result
+        if on_result is not None:
+            on_result(verilog_file, result)
+        return True
+    
+    # file_list may be a generator (e.g. chunks arriving from the splitter),
+    # so files are consumed lazily and kept in arrival order.
+    order = []
+    
+    if jobs <= 1 and not in_process:
+        for verilog_file in file_list:
+            order.append(verilog_file)
+            if reuse_cached(verilog_file):
+                continue
+            print(f"\n{'='*60}")
+            print(f"Processing: {verilog_file}")
+            print(f"{'='*60}")
+            
+            finish(verilog_file, *run_design_report(verilog_file, cli_path, timeout))
+        return {verilog_file: results[verilog_file] for verilog_file in order}
+    
+    if in_process:
+        print(f"Running in-process with {max(jobs, 1)} worker processes")
+        make_pool = lambda: ProcessPoolExecutor(max_workers=max(jobs, 1),
+                                                initializer=init_inprocess_worker,
+                                                initargs=(cli_path,))
+        task = lambda verilog_file: (run_design_report_inprocess, verilog_file, timeout)
+    else:
+        # Each worker thread only waits on its own subprocess, so a thread pool
+        # bounds the number of concurrent design_report processes.
+        print(f"Running with {jobs} parallel jobs")
+        make_pool = lambda: ThreadPoolExecutor(max_workers=jobs)
+        task = lambda verilog_file: (run_design_report, verilog_file, cli_path, timeout)
+    pool = make_pool()
+    
+    in_flight = {}
+    done_count = 0
+    
+    def collect(future):
+        nonlocal done_count
+        verilog_file = in_flight.pop(future)
+        done_count += 1
         print(f"\n{'='*60}")
-        print(f"Processing: {verilog_file}")
+        print(f"[{done_count}] Finished: {verilog_file}")
         print(f"{'='*60}")
         
-        returncode, stdout, stderr = run_design_report(verilog_file, cli_path)
-        
-        results[verilog_file] = {
-            'returncode': returncode,
-            'stdout': stdout,
-            'stderr': stderr,
-            'success': returncode == 0
-        }
+        try:
+            outcome = future.result()
+        except Exception as e:
+            # e.g. a worker process died; the subprocess path is the fallback
+            print(f"Worker failed ({type(e).__name__}: {e}), retrying via subprocess")
+            outcome = run_design_report(verilog_file, cli_path, timeout)
+        finish(verilog_file, *outcome)
+    
+    def submit(verilog_file):
+        """Queue verilog_file; replaces the pool if a worker death broke it."""
+        nonlocal pool
+        try:
+            return pool.submit(*task(verilog_file))
+        except BrokenProcessPool:
+            # Every in-flight future of a broken pool fails; collect() retries
+            # those via subprocess before a fresh pool takes the rest.
+            print("Worker pool broken, retrying in-flight files via subprocess and restarting it")
+            for future in list(in_flight):
+                collect(future)
+            pool.shutdown(wait=True)
+            pool = make_pool()
+            return pool.submit(*task(verilog_file))
+    
+    try:
+        for verilog_file in file_list:
+            order.append(verilog_file)
+            if reuse_cached(verilog_file):
+                continue
+            # Backpressure: at most 2*jobs files queued or running at once
+            while len(in_flight) >= 2 * max(jobs, 1):
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    collect(future)
+            in_flight[submit(verilog_file)] = verilog_file
         
-        if returncode == 0:
-            print(f"✓ Successfully processed {verilog_file}")
-            if output_dir:
-                # Save output to file
-                output_file = output_path / f"{Path(verilog_file).stem}_report.txt"
-                with open(output_file, 'w') as f:
-                    f.write(stdout)
-                print(f"  Report saved to: {output_file}")
-        else:
-            print(f"✗ Failed to process {verilog_file}")
-            if stderr:
-                print(f"  Error: {stderr}")
+        for future in as_completed(list(in_flight)):
+            collect(future)
+    finally:
+        pool.shutdown(wait=True)
     
-    return results
+    return {verilog_file: results[verilog_file] for verilog_file in order}
+
+
+def record_result(verilog_file, returncode, stdout, stderr, output_path=None):
+    """
+    Report the outcome of one design_report run and save its report.
+    
+    Args:
+        verilog_file: Path to the processed Verilog file
+        returncode, stdout, stderr: Output of run_design_report
+        output_path: Optional Path of the report directory
+    
+    Returns:
+        Result dictionary for the file
+    """
+    if returncode == 0:
+        print(f"✓ Successfully processed {verilog_file}")
+        if output_path:
+            # Save output to file
+            output_file = output_path / f"{Path(verilog_file).stem}_report.txt"
+            with open(output_file, 'w') as f:
+                f.write(stdout)
+            print(f"  Report saved to: {output_file}")
+    else:
+        print(f"✗ Failed to process {verilog_file}")
+        if stderr:
+            print(f"  Error: {stderr}")
+    
+    return {
+        'returncode': returncode,
+        'stdout': stdout,
+        'stderr': stderr,
+        'success': returncode == 0
+    }
 
 
 def print_summary(results):
@@ -98,6 +401,11 @@ def print_summary(results):
     print(f"Successful: {successful}")
     print(f"Failed: {failed}")
     
+    cached = [r['cached'] for r in results.values() if 'cached' in r]
+    if cached:
+        print(f"Cache hits: {sum(cached)}")
+        print(f"Cache misses: {len(cached) - sum(cached)}")
+    
     if failed > 0:
         print("\nFailed files:")
         for file, result in results.items():
@@ -109,16 +417,26 @@ def print_summary(results):
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python batch_design_report.py <file1.v> [file2.v ...] [--cli-path <path>] [--output-dir <dir>]")
+        print("Usage: python batch_design_report.py <file1.v> [file2.v ...] [--cli-path <path>] [--output-dir <dir>] [--jobs <n>] [--cache] [--in-process]")
         print("\nOptions:")
         print("  --cli-path <path>    Path to cli.py (default: script/cli.py)")
         print("  --output-dir <dir>   Directory to save reports")
+        print("  --jobs <n>           Number of files to process in parallel (default: 1)")
+        print("  --timeout <seconds>  Per-file timeout (default: 300)")
+        print("  --cache              Reuse reports of unchanged files (requires --output-dir);")
+        print("                       invalidated by changes to any .py file under cli.py's directory")
+        print(f"                       or to ${CLI_VERSION_ENV}")
+        print("  --in-process         Import cli.py once per worker instead of one interpreter per file")
         sys.exit(1)
     
     # Parse arguments
     files = []
     cli_path = "script/cli.py"
     output_dir = None
+    jobs = 1
+    timeout = DEFAULT_TIMEOUT
+    use_cache = False
+    in_process = False
     
     i = 1
     while i < len(sys.argv):
@@ -129,12 +447,28 @@ if __name__ == "__main__":
         elif arg == "--output-dir":
             output_dir = sys.argv[i + 1]
             i += 2
+        elif arg == "--jobs":
+            jobs = int(sys.argv[i + 1])
+            i += 2
+        elif arg == "--timeout":
+            timeout = int(sys.argv[i + 1])
+            i += 2
+        elif arg == "--cache":
+            use_cache = True
+            i += 1
+        elif arg == "--in-process":
+            in_process = True
+            i += 1
         elif not arg.startswith("--"):
             files.append(arg)
             i += 1
         else:
             i += 1
     
+    if use_cache and not output_dir:
+        print("Error: --cache requires --output-dir (the report cache is kept in the output directory)")
+        sys.exit(1)
+    
     # Validate files exist
     missing_files = [f for f in files if not os.path.exists(f)]
     if missing_files:
@@ -144,7 +478,7 @@ if __name__ == "__main__":
         sys.exit(1)
     
     # Run batch processing
-    results = batch_process_files(files, cli_path, output_dir)
+    results = batch_process_files(files, cli_path, output_dir, jobs, timeout, use_cache, in_process)
     print_summary(results)
     
     # Exit with error code if any files failed
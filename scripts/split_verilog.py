@@ -2,81 +2,420 @@
 """
 Split a Verilog file into smaller chunks based on module boundaries.
 """
+import json
 import re
 import sys
 import os
 from pathlib import Path
 
+# The shared Verilog lexer lives with the design-analysis scripts
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "20260204" / "scripts"))
+from verilog_lexer import sanitized_path
 
-def split_verilog_file(input_file, output_dir, max_lines=500):
+
+MODULE_START = re.compile(rb'\bmodule\s+(\w+)')
+# `module` at the end of a line, with its name on a following line
+MODULE_START_TAIL = re.compile(rb'\bmodule\s*$')
+MODULE_END = b'endmodule'
+# Module items a large module may be cut before, as whole keywords only
+CUT_KEYWORD = re.compile(r'\s*(?:always|always_ff|always_comb|always_latch|generate)\b')
+# Keywords that open or close a nested block, for tracking cut depth
+BLOCK_OPEN = frozenset(('begin', 'fork', 'generate'))
+BLOCK_KEYWORD = re.compile(r'\b(?:begin|end|fork|join|join_any|join_none|generate|endgenerate)\b')
+# Top-level declarations repeated at the start of every part of a cut module
+DECL_KEYWORD = re.compile(r'\s*(?:input|output|inout|parameter|localparam|wire|reg|logic|integer|'
+                          r'genvar|tri|wand|wor|supply0|supply1|real|time)\b')
+
+
+def split_verilog_file(input_file, output_dir, max_lines=500, pack_lines=None):
     """
     Split a Verilog file into smaller files.
-    
+
+    The file is streamed line by line: each module is written out as its
+    lines are read and closed as soon as its endmodule is seen, so memory
+    use does not grow with the file or module size. A manifest mapping
+    every chunk to its original line range is written next to the chunks.
+
     Args:
         input_file: Path to the input Verilog file
         output_dir: Directory to save the split files
         max_lines: Maximum number of lines per chunk (default: 500)
-    
+        pack_lines: If set, pack modules into chunks of about this many
+            lines instead of writing one file per module
+
     Returns:
         List of created file paths
     """
+    return [path for path, _ in iter_verilog_chunks(input_file, output_dir, max_lines, pack_lines)]
+
+
+def iter_verilog_chunks(input_file, output_dir, max_lines=500, pack_lines=None):
+    """
+    Split a Verilog file, yielding each chunk as soon as it is written.
+
+    Same arguments as split_verilog_file. The manifest is written once the
+    generator is exhausted.
+
+    Yields:
+        Tuples of (chunk file path, manifest entry)
+    """
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
-    
+
     input_path = Path(input_file)
     base_name = input_path.stem
-    
-    with open(input_file, 'r', encoding='utf-8', errors='ignore') as f:
-        content = f.read()
-    
+    manifest = []
+
     # Try to split by module boundaries
-    module_pattern = r'(module\s+\w+.*?endmodule)'
-    modules = re.findall(module_pattern, content, re.DOTALL)
-    
-    created_files = []
-    
-    if modules:
-        # Split by modules
-        for i, module in enumerate(modules, 1):
-            output_file = output_dir / f"{base_name}_module_{i}.v"
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(module)
-            created_files.append(str(output_file))
-            print(f"Created: {output_file}")
+    if pack_lines:
+        chunks = _split_packed(input_file, output_dir, base_name, pack_lines)
+        mode = "pack"
     else:
+        chunks = _split_by_modules(input_file, output_dir, base_name)
+        mode = "module"
+
+    for entry in chunks:
+        manifest.append(entry)
+        yield str(output_dir / entry["file"]), entry
+
+    if not manifest:
         # Fallback: split by line count
-        lines = content.split('\n')
-        num_chunks = (len(lines) + max_lines - 1) // max_lines
-        
-        for i in range(num_chunks):
-            start_idx = i * max_lines
-            end_idx = min((i + 1) * max_lines, len(lines))
-            chunk = '\n'.join(lines[start_idx:end_idx])
-            
-            output_file = output_dir / f"{base_name}_chunk_{i+1}.v"
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(chunk)
-            created_files.append(str(output_file))
-            print(f"Created: {output_file}")
-    
-    return created_files
+        mode = "lines"
+        for entry in _split_by_lines(input_file, output_dir, base_name, max_lines):
+            manifest.append(entry)
+            yield str(output_dir / entry["file"]), entry
+
+    manifest_file = output_dir / f"{base_name}_manifest.json"
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump({"source": str(input_path), "mode": mode, "chunks": manifest}, f, indent=2)
+    print(f"Manifest: {manifest_file}")
+
+
+def _iter_module_events(input_file):
+    """
+    Stream `module ... endmodule` spans as events.
+
+    Boundaries are searched in the lexer's sanitized mirror of the file, in
+    which comments, strings and attributes are blanked out with the same
+    byte offsets, so `module` in a comment or `endmodule` in a string is
+    ignored. The text of each fragment is taken from the original file.
+
+    Yields:
+        ("start", module_name, line_num, None) when a module begins,
+        ("text", fragment, line_num, code) for each piece of a module's text
+            (at most one physical line; fragments are at line starts
+            unless they directly follow the module keyword match); code is
+            the same fragment of the sanitized mirror,
+        ("end", None, line_num, None) after the fragment holding endmodule.
+        A module still open at end of file gets no "end" event.
+    """
+    inside = False
+    # Text held back from previous lines that may start a module
+    carry = b''
+    code_carry = b''
+    carry_line = 0
+
+    with open(input_file, 'rb') as f, open(sanitized_path(input_file), 'rb') as code_f:
+        for line_num, (line, code) in enumerate(zip(f, code_f), start=1):
+            start_line = line_num
+            if carry:
+                line = carry + line
+                code = code_carry + code
+                start_line = carry_line
+                carry = code_carry = b''
+            pos = 0
+            while pos < len(code):
+                if not inside:
+                    match = MODULE_START.search(code, pos)
+                    if not match:
+                        tail = MODULE_START_TAIL.search(code, pos)
+                        if tail:
+                            carry = line[tail.start():]
+                            code_carry = code[tail.start():]
+                            carry_line = start_line if tail.start() == 0 else line_num
+                        break
+                    inside = True
+                    yield "start", _decode(match.group(1)), start_line if pos == 0 else line_num, None
+                    pos = match.start()
+                    search_from = match.end()
+                else:
+                    search_from = pos
+
+                end = code.find(MODULE_END, search_from)
+                if end < 0:
+                    yield "text", _decode(line[pos:]), line_num, _decode(code[pos:])
+                    break
+
+                end += len(MODULE_END)
+                yield "text", _decode(line[pos:end]), line_num, _decode(code[pos:end])
+                yield "end", None, line_num, None
+                inside = False
+                pos = end
+
+
+def _decode(raw):
+    """Decode a fragment of the original file the way text mode would read it."""
+    return raw.decode('utf-8', errors='ignore').replace('\r\n', '\n')
+
+
+def _split_by_modules(input_file, output_dir, base_name):
+    """
+    Write each `module ... endmodule` span to its own file while streaming.
+
+    Yields:
+        Manifest entry of each chunk once its file is complete
+    """
+    count = 0
+    out = None
+    current = None
+
+    for event, value, line_num, _ in _iter_module_events(input_file):
+        if event == "start":
+            output_file = output_dir / f"{base_name}_module_{count + 1}.v"
+            out = open(output_file, 'w', encoding='utf-8')
+            current = {"file": output_file.name, "modules": [value], "line_range": [line_num, line_num]}
+        elif event == "text":
+            out.write(value)
+        else:
+            out.close()
+            out = None
+            current["line_range"][1] = line_num
+            count += 1
+            print(f"Created: {output_dir / current['file']}")
+            yield current
+
+    if out is not None:
+        # Unterminated module at end of file: not a complete module, drop it
+        out.close()
+        (output_dir / current["file"]).unlink()
+
+
+def _split_packed(input_file, output_dir, base_name, pack_lines):
+    """
+    Pack modules into chunks of roughly pack_lines lines each.
+
+    Consecutive small modules are packed together until the next one would
+    overflow the target. A module larger than the target is cut into parts
+    at lines starting with `always` or `generate` at block depth 0, so every
+    chunk carries a similar amount of work. A part is cut at the last such
+    boundary before it reaches the target; only when there is none (a
+    single block longer than the target) does it run on to the next one.
+    Header and declaration lines do not count towards the target.
+
+    Every part is a complete module: parts after the first repeat the
+    module header and the top-level port, parameter and net declarations
+    read so far, and every part but the last gets its own `endmodule`.
+    The number of repeated lines is recorded as "preamble_lines" in the
+    manifest entry, and line_range covers the part's own source lines.
+
+    Yields:
+        Manifest entry of each chunk once its file is complete
+    """
+    written = []           # entries written but not yet yielded
+    count = 0
+    pack = []              # texts of the modules in the current pack
+    pack_entry = None
+    pack_size = 0
+    module = []            # fragments of the current module (or part) being read
+    module_name = None
+    module_start = 0
+    module_lines = 0
+    last_line = 0
+    part = 0               # > 0 while a large module is being cut into parts
+    part_start = 0
+    depth = 0              # block nesting depth at the current position
+    header = []            # module header fragments, up to its terminating ';'
+    in_header = False
+    decls = []             # top-level declarations in earlier parts
+    pending_decls = []     # (fragment index, text) of declarations in `module`
+    in_decl = False
+    boundary = None        # (fragment index, lines before it, line number) of the last cut point
+
+    def write_chunk(text, entry):
+        nonlocal count
+        count += 1
+        output_file = output_dir / f"{base_name}_pack_{count}.v"
+        with open(output_file, 'w', encoding='utf-8') as out:
+            out.write(text)
+        entry["file"] = output_file.name
+        written.append(entry)
+        print(f"Created: {output_file}")
+
+    def flush_pack():
+        nonlocal pack, pack_entry, pack_size
+        if pack:
+            write_chunk('\n\n'.join(pack), pack_entry)
+        pack, pack_entry, pack_size = [], None, 0
+
+    def flush_part(index, end_line, last):
+        """Write module[:index] as the next part and keep the rest as the start of the following one"""
+        nonlocal module, pending_decls, part
+        part += 1
+        preamble = ''.join(header + decls) if part > 1 else ''
+        text = preamble + ''.join(module[:index])
+        if not last:
+            text += 'endmodule\n'
+        write_chunk(text, {
+            "file": None,
+            "modules": [module_name],
+            "line_range": [part_start, end_line],
+            "part": part,
+            "preamble_lines": preamble.count('\n'),
+        })
+        decls.extend(text for i, text in pending_decls if i < index)
+        pending_decls = [(i - index, text) for i, text in pending_decls if i >= index]
+        module = module[index:]
+
+    def cut(index, lines, line_num, end_line):
+        nonlocal module_lines, part_start
+        if part == 0:
+            # Large module: emit the pending pack first to keep source order
+            flush_pack()
+            part_start = module_start
+        flush_part(index, end_line, False)
+        module_lines -= lines
+        part_start = line_num
+
+    for event, value, line_num, code in _iter_module_events(input_file):
+        if event == "start":
+            module, module_name, module_start = [], value, line_num
+            module_lines, last_line, part, depth = 0, 0, 0, 0
+            header, in_header, decls, pending_decls, in_decl = [], True, [], [], False
+            boundary = None
+        elif event == "text":
+            starts_line = line_num != last_line
+            if starts_line and module_lines >= pack_lines and boundary:
+                # The part reached the target: cut at the last boundary before it
+                index, lines, boundary_line = boundary
+                cut(index, lines, boundary_line, boundary_line - 1)
+                boundary = None
+            if starts_line and depth <= 0 and module_lines and CUT_KEYWORD.match(code):
+                if module_lines >= pack_lines:
+                    cut(len(module), module_lines, line_num, last_line)
+                else:
+                    boundary = (len(module), module_lines, line_num)
+            preamble = True
+            if in_header:
+                header.append(value)
+                in_header = ';' not in code
+            elif depth <= 0 and (in_decl or (starts_line and DECL_KEYWORD.match(code))):
+                pending_decls.append((len(module), value))
+                in_decl = ';' not in code
+            else:
+                preamble = False
+            for keyword in BLOCK_KEYWORD.findall(code):
+                depth += 1 if keyword in BLOCK_OPEN else -1
+            module.append(value)
+            if starts_line:
+                # Header and declaration lines are repeated in every part: count only the rest
+                module_lines += not preamble
+                last_line = line_num
+        elif part:
+            flush_part(len(module), line_num, True)
+        else:
+            # Modules in a pack are separated by a blank line
+            size = line_num - module_start + 1 + (1 if pack else 0)
+            if pack and pack_size + size > pack_lines:
+                flush_pack()
+                size -= 1
+            if pack_entry is None:
+                pack_entry = {"file": None, "modules": [], "line_range": [module_start, line_num]}
+            pack.append(''.join(module))
+            pack_entry["modules"].append(module_name)
+            pack_entry["line_range"][1] = line_num
+            pack_size += size
+            module = []
+
+        yield from written
+        written.clear()
+
+    flush_pack()
+    yield from written
+
+
+def _iter_split_lines(f):
+    """Yield the pieces of content.split('\\n') without reading the whole file."""
+    piece = ''
+    for line in f:
+        if line.endswith('\n'):
+            yield line[:-1]
+            piece = ''
+        else:
+            piece = line
+    yield piece
+
+
+def _split_by_lines(input_file, output_dir, base_name, max_lines):
+    """
+    Write fixed-size chunks of max_lines lines while streaming.
+
+    Yields:
+        Manifest entry of each chunk once its file is complete
+    """
+    chunks = 0
+    entry = None
+    out = None
+    count = 0
+
+    with open(input_file, 'r', encoding='utf-8', errors='ignore') as f:
+        for line_num, piece in enumerate(_iter_split_lines(f), start=1):
+            if out is None:
+                chunks += 1
+                output_file = output_dir / f"{base_name}_chunk_{chunks}.v"
+                out = open(output_file, 'w', encoding='utf-8')
+                entry = {"file": output_file.name, "modules": [], "line_range": [line_num, line_num]}
+                count = 0
+            else:
+                out.write('\n')
+            out.write(piece)
+            count += 1
+            entry["line_range"][1] = line_num
+
+            if count == max_lines:
+                out.close()
+                out = None
+                print(f"Created: {output_dir / entry['file']}")
+                yield entry
+
+    if out is not None:
+        out.close()
+        print(f"Created: {output_dir / entry['file']}")
+        yield entry
+
+
+def _usage():
+    print("Usage: python split_verilog.py <input_file> <output_dir> [max_lines] [--pack <target_lines>]")
+    print("\nOptions:")
+    print("  --pack <target_lines>  Pack small modules together and cut large ones at")
+    print("                         always/generate boundaries, ~target_lines per chunk")
+    sys.exit(1)
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python split_verilog.py <input_file> <output_dir> [max_lines]")
-        sys.exit(1)
-    
-    input_file = sys.argv[1]
-    output_dir = sys.argv[2]
-    max_lines = int(sys.argv[3]) if len(sys.argv) > 3 else 500
-    
+    args = sys.argv[1:]
+    pack_lines = None
+    if "--pack" in args:
+        i = args.index("--pack")
+        value = args[i + 1] if i + 1 < len(args) else ""
+        if not value.isdecimal() or int(value) < 1:
+            print(f"Error: --pack needs a positive number of lines, got '{value}'")
+            _usage()
+        pack_lines = int(value)
+        del args[i:i + 2]
+
+    if len(args) < 2:
+        _usage()
+
+    input_file = args[0]
+    output_dir = args[1]
+    max_lines = int(args[2]) if len(args) > 2 else 500
+
     if not os.path.exists(input_file):
         print(f"Error: Input file '{input_file}' not found")
         sys.exit(1)
-    
-    created_files = split_verilog_file(input_file, output_dir, max_lines)
+
+    created_files = split_verilog_file(input_file, output_dir, max_lines, pack_lines)
     print(f"\nTotal files created: {len(created_files)}")
     print("\nCreated files:")
     for f in created_files:
-        print(f"  - {f}")
\ No newline at end of file
+        print(f"  - {f}")
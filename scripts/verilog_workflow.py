@@ -2,13 +2,193 @@
 """
 Complete workflow: Split Verilog file and generate design reports for each chunk.
 """
+import hashlib
+import json
 import sys
 import os
+import time
+from collections import Counter
 from pathlib import Path
 import subprocess
 
+SCRIPT_DIR = str(Path(__file__).resolve().parent)
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+import split_verilog
+import batch_design_report
 
-def run_workflow(input_file, cli_path="script/cli.py", max_lines=500, output_base_dir=None):
+
+CHECKPOINT_NAME = "workflow_checkpoint.json"
+CHECKPOINT_VERSION = 1
+CHECKPOINT_SAVE_INTERVAL = 2.0  # seconds between checkpoint writes
+
+
+def file_sha256(path):
+    """Hex SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class WorkflowCheckpoint:
+    """
+    Per-chunk progress of a workflow run, kept as a JSON manifest.
+    
+    Each chunk is recorded with its content hash and a state: "split" once
+    the splitter has written it, then "reported" or "failed" after
+    design_report. The manifest is rewritten atomically, at most every
+    CHECKPOINT_SAVE_INTERVAL seconds, so a run that dies loses only a few
+    seconds of progress. A --resume run reuses the split if every chunk is
+    unchanged on disk and only reports chunks that are not done yet.
+    """
+    
+    def __init__(self, output_dir, input_file, chunks_dir, reports_dir, max_lines, pack_lines, cli_path):
+        self.path = Path(output_dir) / CHECKPOINT_NAME
+        self.chunks_dir = Path(chunks_dir)
+        self.reports_dir = Path(reports_dir)
+        stat = os.stat(input_file)
+        self.source = {
+            "file": str(Path(input_file).resolve()),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+        self.split_settings = {"max_lines": max_lines, "pack_lines": pack_lines}
+        self.cli = batch_design_report.cli_fingerprint(cli_path)
+        self.split_complete = False
+        self.chunks = {}
+        # Chunks of the run being resumed while a new split is in progress
+        self.previous = {}
+        self._last_save = 0.0
+    
+    def load(self):
+        """
+        Pick up the state of a previous run.
+        
+        Returns:
+            True if a checkpoint for the same input and split settings was found
+        """
+        if not self.path.exists():
+            print(f"No checkpoint at {self.path}, starting from scratch")
+            return False
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: unreadable checkpoint {self.path} ({e}), starting from scratch")
+            return False
+        
+        if (data.get("version") != CHECKPOINT_VERSION or data.get("source") != self.source
+                or data.get("split_settings") != self.split_settings):
+            print("Input file or split settings changed since the checkpoint, starting from scratch")
+            return False
+        
+        chunks = data.get("chunks", {})
+        if data.get("cli") != self.cli:
+            print("CLI changed since the checkpoint, every chunk will be reported again")
+            for entry in chunks.values():
+                entry["state"] = "split"
+                entry.pop("error", None)
+        
+        self.chunks = chunks
+        self.split_complete = data.get("split_complete", False)
+        states = Counter(entry["state"] for entry in chunks.values())
+        print(f"Resuming from {self.path}: {states['reported']} reported, {states['failed']} failed, "
+              f"{states['split']} not yet reported"
+              + ("" if self.split_complete else " (split was interrupted)"))
+        return True
+    
+    def report_path(self, name):
+        return self.reports_dir / f"{Path(name).stem}_report.txt"
+    
+    def _is_done(self, name, entry):
+        return entry["state"] == "reported" and self.report_path(name).exists()
+    
+    def split_is_current(self):
+        """True if the recorded split finished and every chunk file is unchanged on disk."""
+        if not self.split_complete or not self.chunks:
+            return False
+        for name, entry in self.chunks.items():
+            chunk = self.chunks_dir / name
+            if not chunk.exists() or file_sha256(chunk) != entry["hash"]:
+                print(f"Chunk {name} is missing or modified, splitting again")
+                return False
+        return True
+    
+    def start_split(self):
+        """Drop the recorded chunk list before splitting again; finished reports stay reusable."""
+        self.previous, self.chunks = self.chunks, {}
+        self.split_complete = False
+    
+    def add_chunk(self, chunk_file, entry):
+        """
+        Record a chunk written by the splitter.
+        
+        Returns:
+            True if the chunk still needs a report
+        """
+        name = Path(chunk_file).name
+        record = {
+            "state": "split",
+            "hash": file_sha256(chunk_file),
+            "modules": entry.get("modules", []),
+            "line_range": entry.get("line_range"),
+        }
+        old = self.previous.get(name)
+        if old is not None and old["hash"] == record["hash"] and self._is_done(name, old):
+            record["state"] = "reported"
+        self.chunks[name] = record
+        self.save()
+        return record["state"] != "reported"
+    
+    def finish_split(self):
+        self.split_complete = True
+        self.previous = {}
+        self.save(force=True)
+    
+    def pending(self):
+        """Chunk files that still need a report, in split order."""
+        return [str(self.chunks_dir / name) for name, entry in self.chunks.items()
+                if not self._is_done(name, entry)]
+    
+    def record_report(self, chunk_file, result):
+        """batch_process_files callback: store the outcome of one chunk."""
+        entry = self.chunks[Path(chunk_file).name]
+        if result['success']:
+            entry["state"] = "reported"
+            entry.pop("error", None)
+        else:
+            entry["state"] = "failed"
+            entry["error"] = (result['stderr'] or f"exit code {result['returncode']}")[:500]
+        self.save()
+    
+    def all_reported(self):
+        return bool(self.chunks) and all(self._is_done(name, entry) for name, entry in self.chunks.items())
+    
+    def save(self, force=False):
+        """Atomically rewrite the manifest, unless it was written less than CHECKPOINT_SAVE_INTERVAL ago."""
+        now = time.monotonic()
+        if not force and now - self._last_save < CHECKPOINT_SAVE_INTERVAL:
+            return
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "source": self.source,
+            "split_settings": self.split_settings,
+            "cli": self.cli,
+            "split_complete": self.split_complete,
+            "chunks": self.chunks,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_file, self.path)
+        self._last_save = now
+
+
+def run_workflow(input_file, cli_path="script/cli.py", max_lines=500, output_base_dir=None, jobs=1,
+                 use_cache=True, in_process=False, pack_lines=None, pipeline=False, resume=False):
     """
     Complete workflow to split Verilog and generate reports.
     
@@ -17,6 +197,14 @@ def run_workflow(input_file, cli_path="script/cli.py", max_lines=500, output_bas
         cli_path: Path to the CLI script
         max_lines: Maximum lines per chunk
         output_base_dir: Base directory for all outputs
+        jobs: Number of design_report runs in parallel
+        use_cache: Reuse reports of chunks unchanged since a previous run
+        in_process: Import the CLI once per worker instead of per chunk
+        pack_lines: Pack modules into chunks of about this many lines
+        pipeline: Start reporting each chunk as soon as the splitter writes
+            it, instead of splitting the whole file first
+        resume: Continue from the checkpoint in output_base_dir, skipping
+            chunks that were already reported
     
     Returns:
         Dictionary with workflow results
@@ -40,16 +228,51 @@ def run_workflow(input_file, cli_path="script/cli.py", max_lines=500, output_bas
     print(f"Output directory: {output_base_dir}")
     print(f"CLI path: {cli_path}")
     print(f"Max lines per chunk: {max_lines}")
+    if pack_lines:
+        print(f"Pack target lines: {pack_lines}")
+    print(f"Parallel jobs: {jobs}")
+    print(f"Report cache: {'on' if use_cache else 'off'}")
+    print(f"Pipelined: {'yes' if pipeline else 'no'}")
+    print(f"Resume: {'yes' if resume else 'no'}")
     print(f"{'='*60}\n")
     
+    checkpoint = WorkflowCheckpoint(output_base_dir, input_file, chunks_dir, reports_dir,
+                                    max_lines, pack_lines, cli_path)
+    if resume:
+        checkpoint.load()
+    
+    try:
+        if pipeline:
+            return run_pipelined(input_file, chunks_dir, reports_dir, cli_path, max_lines,
+                                 jobs, use_cache, in_process, pack_lines, checkpoint)
+        return run_staged(input_file, chunks_dir, reports_dir, cli_path, max_lines,
+                          jobs, use_cache, in_process, pack_lines, checkpoint)
+    finally:
+        # Keep whatever progress was made, even if the run is interrupted
+        checkpoint.save(force=True)
+
+
+def run_staged(input_file, chunks_dir, reports_dir, cli_path, max_lines, jobs,
+               use_cache, in_process, pack_lines, checkpoint):
+    """
+    Split the whole file, then report the chunks that are not done yet.
+    
+    Returns:
+        Dictionary with workflow results
+    """
     # Step 1: Split the Verilog file
     print("STEP 1: Splitting Verilog file...")
     print("-" * 60)
     
-    script_dir = Path(__file__).parent
-    split_script = script_dir / "split_verilog.py"
+    if checkpoint.split_is_current():
+        print(f"Reusing {len(checkpoint.chunks)} chunks from the checkpoint\n")
+        return report_pending(chunks_dir, reports_dir, cli_path, jobs, use_cache, in_process, checkpoint)
+    
+    split_script = Path(__file__).parent / "split_verilog.py"
     
     split_cmd = ["python", str(split_script), input_file, str(chunks_dir), str(max_lines)]
+    if pack_lines:
+        split_cmd += ["--pack", str(pack_lines)]
     result = subprocess.run(split_cmd, capture_output=True, text=True)
     
     if result.returncode != 0:
@@ -58,40 +281,110 @@ def run_workflow(input_file, cli_path="script/cli.py", max_lines=500, output_bas
     
     print(result.stdout)
     
-    # Get list of created chunk files
-    chunk_files = sorted(chunks_dir.glob("*.v"))
+    # The splitter's manifest lists exactly the chunks of this run
+    manifest_file = chunks_dir / f"{Path(input_file).stem}_manifest.json"
+    with open(manifest_file, encoding='utf-8') as f:
+        manifest = json.load(f)
     
-    if not chunk_files:
+    checkpoint.start_split()
+    for entry in manifest["chunks"]:
+        checkpoint.add_chunk(chunks_dir / entry["file"], entry)
+    checkpoint.finish_split()
+    
+    if not checkpoint.chunks:
         print("Error: No chunk files were created")
         return {"success": False, "error": "No chunks created"}
     
-    print(f"\nCreated {len(chunk_files)} chunk files\n")
-    
-    # Step 2: Run design_report on each chunk
+    print(f"\nCreated {len(checkpoint.chunks)} chunk files\n")
+    return report_pending(chunks_dir, reports_dir, cli_path, jobs, use_cache, in_process, checkpoint)
+
+
+def report_pending(chunks_dir, reports_dir, cli_path, jobs, use_cache, in_process, checkpoint):
+    """Step 2 of the staged workflow: run design_report on chunks without a report."""
     print("\nSTEP 2: Generating design reports...")
     print("-" * 60)
     
-    batch_script = script_dir / "batch_design_report.py"
+    pending = checkpoint.pending()
+    skipped = len(checkpoint.chunks) - len(pending)
+    if skipped:
+        print(f"Skipping {skipped} chunks already reported")
     
-    batch_cmd = [
-        "python", str(batch_script),
-        *[str(f) for f in chunk_files],
-        "--cli-path", cli_path,
-        "--output-dir", str(reports_dir)
-    ]
+    if pending:
+        results = batch_design_report.batch_process_files(
+            pending, cli_path, str(reports_dir), jobs,
+            use_cache=use_cache, in_process=in_process, on_result=checkpoint.record_report
+        )
+        batch_design_report.print_summary(results)
     
-    result = subprocess.run(batch_cmd, capture_output=True, text=True)
-    print(result.stdout)
+    # Step 3: Summary
+    return print_workflow_summary(checkpoint.all_reported(), chunks_dir, reports_dir,
+                                  len(checkpoint.chunks), checkpoint)
+
+
+def run_pipelined(input_file, chunks_dir, reports_dir, cli_path, max_lines, jobs,
+                  use_cache, in_process, pack_lines, checkpoint):
+    """
+    Split and report in one pass.
     
-    if result.stderr:
-        print(f"Warnings/Errors:\n{result.stderr}")
+    The splitter runs in this process and yields each chunk as soon as its
+    file is closed; batch_process_files hands it straight to a report worker.
+    At most 2*jobs chunks are queued or running at once, so splitting pauses
+    when the workers fall behind. The chunk directory is never globbed and
+    the first reports finish while the file is still being split.
     
-    # Step 3: Summary
+    Returns:
+        Dictionary with workflow results
+    """
+    print("STEP 1+2: Splitting and generating reports (pipelined)...")
+    print("-" * 60)
+    
+    start = time.perf_counter()
+    if checkpoint.split_is_current():
+        print(f"Reusing {len(checkpoint.chunks)} chunks from the checkpoint")
+        chunk_files = checkpoint.pending()
+    else:
+        def split_chunks():
+            checkpoint.start_split()
+            for path, entry in split_verilog.iter_verilog_chunks(input_file, chunks_dir, max_lines, pack_lines):
+                if checkpoint.add_chunk(path, entry):
+                    yield path
+            checkpoint.finish_split()
+        chunk_files = split_chunks()
+    
+    results = batch_design_report.batch_process_files(
+        chunk_files, cli_path, str(reports_dir), jobs,
+        use_cache=use_cache, in_process=in_process, on_result=checkpoint.record_report
+    )
+    
+    if not checkpoint.chunks:
+        print("Error: No chunk files were created")
+        return {"success": False, "error": "No chunks created"}
+    
+    skipped = len(checkpoint.chunks) - len(results)
+    if skipped:
+        print(f"\nSkipped {skipped} chunks already reported")
+    if results:
+        batch_design_report.print_summary(results)
+    print(f"\nPipelined split + reports took {time.perf_counter() - start:.1f}s")
+    
+    return print_workflow_summary(checkpoint.all_reported(), chunks_dir, reports_dir,
+                                  len(checkpoint.chunks), checkpoint)
+
+
+def print_workflow_summary(success, chunks_dir, reports_dir, num_chunks, checkpoint):
+    """Print the final workflow summary and build the result dictionary."""
     print(f"\n{'='*60}")
     print("WORKFLOW COMPLETE")
     print(f"{'='*60}")
     print(f"Chunks directory: {chunks_dir}")
     print(f"Reports directory: {reports_dir}")
+    print(f"Checkpoint: {checkpoint.path}")
+    
+    failed = [name for name, entry in checkpoint.chunks.items() if entry["state"] == "failed"]
+    if failed:
+        print(f"\n{len(failed)} chunks failed; rerun with --resume to retry only those:")
+        for name in failed:
+            print(f"  - {name}")
     
     report_files = list(reports_dir.glob("*_report.txt"))
     print(f"\nGenerated {len(report_files)} reports:")
@@ -99,11 +392,12 @@ def run_workflow(input_file, cli_path="script/cli.py", max_lines=500, output_bas
         print(f"  - {report.name}")
     
     return {
-        "success": result.returncode == 0,
+        "success": success,
         "chunks_dir": str(chunks_dir),
         "reports_dir": str(reports_dir),
-        "num_chunks": len(chunk_files),
-        "num_reports": len(report_files)
+        "num_chunks": num_chunks,
+        "num_reports": len(report_files),
+        "checkpoint": str(checkpoint.path)
     }
 
 
@@ -114,6 +408,13 @@ if __name__ == "__main__":
         print("  --cli-path <path>       Path to cli.py (default: script/cli.py)")
         print("  --max-lines <number>    Max lines per chunk (default: 500)")
         print("  --output-dir <dir>      Base output directory")
+        print("  --jobs <number>         Parallel design_report runs (default: 1)")
+        print("  --no-cache              Re-run design_report on every chunk")
+        print("  --in-process            Import cli.py once per worker instead of per chunk")
+        print("  --pack-lines <number>   Pack modules into chunks of about this many lines")
+        print("  --pipeline              Report chunks while the file is still being split")
+        print("  --resume                Continue from workflow_checkpoint.json in the output directory,")
+        print("                          retrying only failed or missing chunks")
         print("\nExample:")
         print("  python verilog_workflow.py assets/top_1.v --cli-path script/cli.py")
         sys.exit(1)
@@ -122,6 +423,12 @@ if __name__ == "__main__":
     cli_path = "script/cli.py"
     max_lines = 500
     output_dir = None
+    jobs = 1
+    use_cache = True
+    in_process = False
+    pack_lines = None
+    pipeline = False
+    resume = False
     
     # Parse optional arguments
     i = 2
@@ -135,6 +442,24 @@ if __name__ == "__main__":
         elif sys.argv[i] == "--output-dir" and i + 1 < len(sys.argv):
             output_dir = sys.argv[i + 1]
             i += 2
+        elif sys.argv[i] == "--jobs" and i + 1 < len(sys.argv):
+            jobs = int(sys.argv[i + 1])
+            i += 2
+        elif sys.argv[i] == "--no-cache":
+            use_cache = False
+            i += 1
+        elif sys.argv[i] == "--in-process":
+            in_process = True
+            i += 1
+        elif sys.argv[i] == "--pack-lines" and i + 1 < len(sys.argv):
+            pack_lines = int(sys.argv[i + 1])
+            i += 2
+        elif sys.argv[i] == "--pipeline":
+            pipeline = True
+            i += 1
+        elif sys.argv[i] == "--resume":
+            resume = True
+            i += 1
         else:
             i += 1
     
@@ -142,7 +467,8 @@ if __name__ == "__main__":
         print(f"Error: Input file '{input_file}' not found")
         sys.exit(1)
     
-    result = run_workflow(input_file, cli_path, max_lines, output_dir)
+    result = run_workflow(input_file, cli_path, max_lines, output_dir, jobs, use_cache, in_process,
+                          pack_lines, pipeline, resume)
     
     if not result.get("success", False):
         sys.exit(1)